@@ -0,0 +1,161 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+# Interns belong to companies and students to schools, as on the dashboards
+COHORT_FILTERS = {
+    'company': "u.company_id = %s AND u.role = 'intern'",
+    'school': "u.school_id = %s AND u.role = 'student'",
+}
+
+# Monday..Friday; organizations can choose their own (organizations.expected_days)
+DEFAULT_EXPECTED_WEEKDAYS = (0, 1, 2, 3, 4)
+
+
+class Cohort:
+    """Dense users x days attendance matrices for one organization and date range"""
+
+    def __init__(self, user_ids, names, date_from, present, late):
+        self.user_ids = user_ids
+        self.names = names
+        self.date_from = date_from
+        self.present = present  # bool[users, days]
+        self.late = late        # bool[users, days]
+
+    @property
+    def days(self):
+        return self.present.shape[1]
+
+    def expected_mask(self, weekdays=DEFAULT_EXPECTED_WEEKDAYS, as_of=None):
+        """Boolean mask of the day columns attendance is expected on.
+
+        Only days before ``as_of`` (default today) count: a day that has not
+        finished yet cannot be an absence.
+        """
+        first_weekday = self.date_from.weekday()
+        column_weekdays = (first_weekday + np.arange(self.days)) % 7
+        elapsed = np.arange(self.days) < ((as_of or date.today()) - self.date_from).days
+        return np.isin(column_weekdays, weekdays) & elapsed
+
+
+def load_cohort(org_type, organization_id, date_from, date_to):
+    """Load an organization's roster and attendance into a Cohort.
+
+    The attendance arrives as three aggregated arrays in a single row, which
+    is far cheaper to turn into NumPy arrays than millions of row objects.
+    """
+    # Imported here so the matrix code stays usable without a database
+    from database import db
+
+    days = max(0, (date_to - date_from).days + 1)
+    roster = db.execute_query(f"""
+        SELECT u.id, u.full_name FROM users u
+        WHERE {COHORT_FILTERS[org_type]}
+        ORDER BY u.id
+    """, (organization_id,), fetch=True)
+    user_ids = np.array([row['id'] for row in roster], dtype=np.int64)
+    names = [row['full_name'] for row in roster]
+
+    present = np.zeros((len(user_ids), days), dtype=bool)
+    late = np.zeros((len(user_ids), days), dtype=bool)
+    if len(user_ids) == 0 or days <= 0:
+        return Cohort(user_ids, names, date_from, present, late)
+
+    result = db.execute_one(f"""
+        SELECT array_agg(a.user_id) AS user_ids,
+               array_agg(a.date - %s) AS day_offsets,
+               array_agg(a.is_late) AS late
+        FROM attendance a
+        JOIN users u ON a.user_id = u.id
+        WHERE {COHORT_FILTERS[org_type]} AND a.date BETWEEN %s AND %s
+    """, (date_from, organization_id, date_from, date_to))
+
+    if result and result['user_ids']:
+        attendance_ids = np.asarray(result['user_ids'], dtype=np.int64)
+        rows = np.searchsorted(user_ids, attendance_ids)
+        # Drop records of users who joined the cohort after the roster was read
+        known = (rows < len(user_ids)) & (user_ids[np.minimum(rows, len(user_ids) - 1)] == attendance_ids)
+        rows = rows[known]
+        columns = np.asarray(result['day_offsets'], dtype=np.int64)[known]
+        present[rows, columns] = True
+        late[rows, columns] = np.asarray(result['late'], dtype=bool)[known]
+
+    return Cohort(user_ids, names, date_from, present, late)
+
+
+def longest_streaks(matrix):
+    """Longest run of consecutive True values in each row, without a Python loop"""
+    if matrix.shape[1] == 0:
+        return np.zeros(matrix.shape[0], dtype=np.int64)
+    running = np.cumsum(matrix, axis=1)
+    # At every False cell remember the running total; the run length is the
+    # distance from the most recent False cell's total
+    reset = np.maximum.accumulate(np.where(matrix, 0, running), axis=1)
+    return (running - reset).max(axis=1)
+
+
+def compute_metrics(cohort, weekdays=DEFAULT_EXPECTED_WEEKDAYS, as_of=None):
+    """Vectorized per-student attendance metrics over the elapsed expected days"""
+    expected = cohort.expected_mask(weekdays, as_of)
+    present = cohort.present[:, expected]
+    late = cohort.late[:, expected]
+    expected_days = int(expected.sum())
+
+    attended = present.sum(axis=1)
+    late_days = late.sum(axis=1)
+    attendance_rate = attended / expected_days if expected_days else np.zeros(len(attended))
+    # Late rate is relative to the days a student actually turned up
+    late_rate = np.divide(late_days, attended, out=np.zeros(len(attended)), where=attended > 0)
+
+    return {
+        'expected_days': expected_days,
+        'attended': attended,
+        'late_days': late_days,
+        'days_absent': expected_days - attended,
+        'attendance_rate': attendance_rate,
+        'late_rate': late_rate,
+        'longest_streak': longest_streaks(present),
+    }
+
+
+def cohort_report(org_type, organization_id, date_from, date_to, weekdays=DEFAULT_EXPECTED_WEEKDAYS, as_of=None):
+    """Per-student metrics plus cohort averages, ready for JSON.
+
+    ``date_to`` is clamped to the day before ``as_of`` (the organization's
+    today), so future days and today's not-yet-clocked-in students are not
+    counted as absences.
+    """
+    as_of = as_of or date.today()
+    date_to = min(date_to, as_of - timedelta(days=1))
+    cohort = load_cohort(org_type, organization_id, date_from, date_to)
+    metrics = compute_metrics(cohort, weekdays, as_of)
+
+    students = [
+        {
+            'user_id': int(user_id),
+            'full_name': name,
+            'attended': int(attended),
+            'days_absent': int(absent),
+            'attendance_rate': round(float(rate), 4),
+            'late_rate': round(float(late_rate), 4),
+            'longest_streak': int(streak),
+        }
+        for user_id, name, attended, absent, rate, late_rate, streak in zip(
+            cohort.user_ids, cohort.names, metrics['attended'], metrics['days_absent'],
+            metrics['attendance_rate'], metrics['late_rate'], metrics['longest_streak']
+        )
+    ]
+
+    count = len(students)
+    return {
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'expected_days': metrics['expected_days'],
+        'students': students,
+        'cohort': {
+            'size': count,
+            'mean_attendance_rate': round(float(metrics['attendance_rate'].mean()), 4) if count else 0.0,
+            'mean_late_rate': round(float(metrics['late_rate'].mean()), 4) if count else 0.0,
+            'mean_days_absent': round(float(metrics['days_absent'].mean()), 2) if count else 0.0,
+        },
+    }
@@ -1,15 +1,31 @@
 import os
+import hmac
+import hashlib
 import pytz
 from datetime import datetime, timedelta
 from functools import wraps
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, stream_with_context, g
 from flask_mail import Mail
 from dotenv import load_dotenv
 
 from database import db
+from connection_pool import PoolExhaustedError
+from password_hashing import HashingBusyError
 from auth_utils import AuthUtils, UserManager
+from user_cache import user_cache, invalidate_user
+from attendance_manager import AttendanceManager
+from organizations import organizations, organization_id_of
+from attendance_export import export_attendance, export_pool_stats, EXPORT_FORMATS
+from analytics import cohort_report
+from partitioning import start_maintenance as start_partition_maintenance
 from email_service import EmailService, mail
+from email_outbox import start_email_workers
+from live_events import event_hub, SubscriberLimitError
+from token_auth import token_auth, revocations, TokenError
+from session_store import session_store, DatabaseSessionInterface
+from roster_import import read_roster, roster_jobs, RosterError, ROSTER_ROLES
+from metrics import metrics
 
 load_dotenv()
 
@@ -26,15 +42,121 @@ app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 app.config['BASE_URL'] = os.getenv('BASE_URL', 'http://localhost:5001')
 
+# Kiosk / card reader uploads
+app.config['KIOSK_API_KEY'] = os.getenv('KIOSK_API_KEY')
+app.config['BULK_CLOCK_IN_MAX_RECORDS'] = int(os.getenv('BULK_CLOCK_IN_MAX_RECORDS', 100000))
+
+# Operations endpoints (/api/admin/...), disabled unless a key is set
+app.config['ADMIN_API_KEY'] = os.getenv('ADMIN_API_KEY')
+
+# /metrics is open to loopback scrapers; others need the admin key unless this is set
+app.config['METRICS_ALLOW_REMOTE'] = os.getenv('METRICS_ALLOW_REMOTE', 'False').lower() == 'true'
+
+# One pooled connection per request, shared by every query and db.transaction() in it
+db.init_app(app)
+
 # Initialize mail
 mail.init_app(app)
 
-TIMEZONE = pytz.timezone('Africa/Lagos')
+# Server-side sessions in user_sessions; the cookie only carries a signed token
+app.session_interface = DatabaseSessionInterface(session_store)
+
+# Bearer tokens for API clients, signed with JWT_SECRET_KEY
+token_auth.init_app(app)
+
+# Query latency per fingerprint, per-route timing and DB calls per request (GET /metrics)
+db.add_query_hook(metrics.observe_query)
+metrics.instrument_app(app)
+metrics.add_gauges('db_pool', db.pool_stats)
+metrics.add_gauges('db_routing', db.routing_stats)
+metrics.add_gauges('export_pool', export_pool_stats)
+metrics.add_gauges('user_cache', user_cache.stats)
+metrics.add_gauges('live_events', event_hub.stats)
+metrics.add_gauges('token_revocations', revocations.stats)
+metrics.add_gauges('sessions', session_store.stats)
+metrics.add_gauges('organizations', organizations.stats)
+
+email_worker = None
+partition_maintenance = None
+_background_pid = None
+
+def start_background_services():
+    """Start this process's background threads, once.
+    
+    Threads do not survive fork(), so servers call this in each worker
+    after it forks (see gunicorn.conf.py), never at import.
+    """
+    global email_worker, partition_maintenance, _background_pid
+    if _background_pid == os.getpid():
+        return
+    _background_pid = os.getpid()
+    
+    # Batched session expiry writes and the expired-session sweeper
+    session_store.start()
+    
+    # Drain the email outbox in this process unless a dedicated `python email_outbox.py` runs it
+    if os.getenv('EMAIL_OUTBOX_IN_APP', 'True').lower() == 'true':
+        email_worker = start_email_workers(app)
+    
+    # Keep upcoming attendance partitions created (and expired ones detached) while the app runs
+    if os.getenv('ATTENDANCE_PARTITION_MAINTENANCE', 'True').lower() == 'true':
+        partition_maintenance = start_partition_maintenance()
+
+# --- Error Handlers ---
+@app.errorhandler(PoolExhaustedError)
+@app.errorhandler(HashingBusyError)
+@app.errorhandler(SubscriberLimitError)
+def handle_service_busy(e):
+    # Routes re-raise these so clients get a retryable 503 instead of a 500
+    response = jsonify({"success": False, "message": "Server is busy, please try again shortly"})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+def not_modified(*parts):
+    """Build an ETag from ``parts``; returns (etag, 304 response or None).
+    
+    Polling endpoints compute the ETag from cheap version data before running
+    their real queries, so an unchanged repeat poll is answered without them.
+    """
+    etag = hashlib.sha1(repr(parts).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return etag, response
+    return etag, None
+
+def with_etag(response, etag):
+    # no-cache: the browser keeps the body but revalidates on every poll
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 # --- Decorators ---
+def _token_error(message):
+    response = jsonify({"success": False, "message": message})
+    response.status_code = 401
+    response.headers['WWW-Authenticate'] = 'Bearer'
+    return response
+
+def _bearer_token():
+    header = request.headers.get('Authorization', '')
+    if header[:7].lower() == 'bearer ':
+        return header[7:].strip()
+    return None
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        token = _bearer_token()
+        if token is not None:
+            # API clients: the signed claims are enough, no database lookup
+            try:
+                g.token_claims = token_auth.decode(token)
+            except TokenError as e:
+                return _token_error(str(e))
+            return f(*args, **kwargs)
         if "user_id" not in session:
             return redirect(url_for('login_page'))
         return f(*args, **kwargs)
@@ -43,6 +165,11 @@ def login_required(f):
 def email_verified_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        claims = g.get('token_claims')
+        if claims is not None:
+            if not claims.get('email_verified'):
+                return jsonify({"success": False, "message": "Email verification required"}), 403
+            return f(*args, **kwargs)
         if "user_id" not in session:
             return redirect(url_for('login_page'))
         
@@ -52,6 +179,38 @@ def email_verified_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def current_user_id():
+    """The signed-in user's id, from the bearer token or the session"""
+    claims = g.get('token_claims')
+    return claims['user_id'] if claims is not None else session['user_id']
+
+def current_user():
+    """The signed-in user: token claims for API clients, else the (cached) user row"""
+    claims = g.get('token_claims')
+    if claims is not None:
+        return token_auth.user_from_claims(claims)
+    return UserManager.get_user_by_id(session['user_id'])
+
+def kiosk_key_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = app.config['KIOSK_API_KEY']
+        provided = request.headers.get('X-Kiosk-Key', '')
+        if not expected or not hmac.compare_digest(provided, expected):
+            return jsonify({"success": False, "message": "Invalid kiosk key"}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+def admin_key_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = app.config['ADMIN_API_KEY']
+        provided = request.headers.get('X-Admin-Key', '')
+        if not expected or not hmac.compare_digest(provided, expected):
+            return jsonify({"success": False, "message": "Invalid admin key"}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
 # --- Frontend Routes ---
 @app.route('/')
 def index():
@@ -108,27 +267,23 @@ def register():
             'matricNumber': data.get('matricNumber')
         }
         
-        user_id, verification_code = UserManager.create_user(
-            email, password, role, full_name, **user_data
-        )
-        
-        # Send verification email
-        email_sent = EmailService.send_verification_email(email, full_name, verification_code)
+        # The account and its verification email are created together or not at all
+        with db.transaction():
+            user_id, verification_code = UserManager.create_user(
+                email, password, role, full_name, **user_data
+            )
+            if not EmailService.send_verification_email(email, full_name, verification_code):
+                raise RuntimeError("verification email could not be queued")
         
-        if email_sent:
-            session['user_id'] = user_id
-            return jsonify({
-                "success": True, 
-                "message": "Registration successful! Please check your email for verification code.",
-                "requires_verification": True
-            }), 201
-        else:
-            return jsonify({
-                "success": True, 
-                "message": "Registration successful! However, verification email could not be sent. Please contact support.",
-                "requires_verification": True
-            }), 201
+        session['user_id'] = user_id
+        return jsonify({
+            "success": True, 
+            "message": "Registration successful! Please check your email for verification code.",
+            "requires_verification": True
+        }), 201
             
+    except (PoolExhaustedError, HashingBusyError):
+        raise
     except Exception as e:
         return jsonify({"success": False, "message": f"Registration failed: {str(e)}"}), 500
 
@@ -150,6 +305,8 @@ def verify_email():
         else:
             return jsonify({"success": False, "message": "Invalid verification code"}), 400
             
+    except (PoolExhaustedError, HashingBusyError):
+        raise
     except Exception as e:
         return jsonify({"success": False, "message": f"Verification failed: {str(e)}"}), 500
 
@@ -166,21 +323,22 @@ def resend_verification():
         if user['email_verified']:
             return jsonify({"success": False, "message": "Email already verified"}), 400
         
-        # Generate new verification code
+        # The new code only replaces the old one if its email is queued
         verification_code = AuthUtils.generate_verification_code()
-        query = "UPDATE users SET verification_code = %s WHERE id = %s"
-        db.execute_query(query, (verification_code, user['id']))
-        
-        # Send email
-        email_sent = EmailService.send_verification_email(
-            user['email'], user['full_name'], verification_code
-        )
-        
-        if email_sent:
-            return jsonify({"success": True, "message": "Verification code sent!"})
-        else:
-            return jsonify({"success": False, "message": "Failed to send email"}), 500
+        with db.transaction():
+            query = "UPDATE users SET verification_code = %s WHERE id = %s"
+            db.execute_query(query, (verification_code, user['id']))
+            email_sent = EmailService.send_verification_email(
+                user['email'], user['full_name'], verification_code
+            )
+            if not email_sent:
+                raise RuntimeError("verification email could not be queued")
+        invalidate_user(user['id'])
+        
+        return jsonify({"success": True, "message": "Verification code sent!"})
             
+    except (PoolExhaustedError, HashingBusyError):
+        raise
     except Exception as e:
         return jsonify({"success": False, "message": f"Failed to resend: {str(e)}"}), 500
 
@@ -195,6 +353,10 @@ def login():
         if not user or not AuthUtils.verify_password(password, user['password_hash']):
             return jsonify({"success": False, "message": "Invalid email or password"}), 401
         
+        # Upgrade hashes made with an older cost factor while we have the plaintext
+        if AuthUtils.password_needs_rehash(user['password_hash']):
+            UserManager.update_password_hash(user['id'], AuthUtils.hash_password(password))
+        
         session['user_id'] = user['id']
         
         if not user['email_verified']:
@@ -206,9 +368,69 @@ def login():
         
         return jsonify({"success": True, "message": "Login successful"})
         
+    except (PoolExhaustedError, HashingBusyError):
+        raise
     except Exception as e:
         return jsonify({"success": False, "message": f"Login failed: {str(e)}"}), 500
 
+@app.route('/api/token', methods=['POST'])
+def issue_token():
+    try:
+        data = request.get_json()
+        email = data['email'].lower().strip()
+        password = data['password']
+        
+        user = UserManager.get_user_by_email(email)
+        if not user or not AuthUtils.verify_password(password, user['password_hash']):
+            return jsonify({"success": False, "message": "Invalid email or password"}), 401
+        
+        if AuthUtils.password_needs_rehash(user['password_hash']):
+            UserManager.update_password_hash(user['id'], AuthUtils.hash_password(password))
+        
+        return jsonify({"success": True, **token_auth.issue(user)})
+        
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Login failed: {str(e)}"}), 500
+
+@app.route('/api/token/refresh', methods=['POST'])
+def refresh_token():
+    try:
+        data = request.get_json()
+        # Re-read the user so role and verification changes reach the new access token
+        tokens = token_auth.refresh(data['refresh_token'], UserManager._load_user_by_id)
+        return jsonify({"success": True, **tokens})
+        
+    except TokenError as e:
+        return _token_error(str(e))
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Refresh failed: {str(e)}"}), 500
+
+@app.route('/api/token/revoke', methods=['POST'])
+@login_required
+def revoke_token():
+    try:
+        claims = g.get('token_claims')
+        if claims is None:
+            return jsonify({"success": False, "message": "Bearer token required"}), 400
+        
+        token_auth.revoke(claims)
+        data = request.get_json(silent=True) or {}
+        if data.get('refresh_token'):
+            try:
+                token_auth.revoke(token_auth.decode(data['refresh_token'], 'refresh'))
+            except TokenError:
+                pass  # already expired or revoked
+        return jsonify({"success": True})
+        
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Revoke failed: {str(e)}"}), 500
+
 @app.route('/api/forgot-password', methods=['POST'])
 def forgot_password():
     try:
@@ -229,6 +451,8 @@ def forgot_password():
             "message": "If the email exists, a password reset link has been sent"
         })
         
+    except (PoolExhaustedError, HashingBusyError):
+        raise
     except Exception as e:
         return jsonify({"success": False, "message": "Failed to process request"}), 500
 
@@ -247,6 +471,8 @@ def reset_password():
         else:
             return jsonify({"success": False, "message": "Invalid or expired reset token"}), 400
             
+    except (PoolExhaustedError, HashingBusyError):
+        raise
     except Exception as e:
         return jsonify({"success": False, "message": f"Reset failed: {str(e)}"}), 500
 
@@ -255,14 +481,56 @@ def logout():
     session.clear()
     return jsonify({"success": True})
 
+@app.route('/api/sessions')
+@login_required
+def list_sessions():
+    try:
+        current = getattr(session, 'session_id', None)
+        sessions = [
+            {
+                "id": row['id'],
+                "created_at": row['created_at'].isoformat() if row['created_at'] else None,
+                "last_seen_at": row['last_seen_at'].isoformat() if row['last_seen_at'] else None,
+                "expires_at": row['expires_at'].isoformat(),
+                "current": row['id'] == current,
+            }
+            for row in session_store.active_sessions(current_user_id())
+        ]
+        return jsonify({"success": True, "sessions": sessions})
+        
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Failed to list sessions: {str(e)}"}), 500
+
+@app.route('/api/sessions/<int:session_id>', methods=['DELETE'])
+@app.route('/api/sessions', methods=['DELETE'], defaults={'session_id': None})
+@login_required
+def revoke_sessions(session_id):
+    try:
+        revoked = session_store.revoke(current_user_id(), session_id)
+        if session_id is not None and not revoked:
+            return jsonify({"success": False, "message": "Session not found"}), 404
+        return jsonify({"success": True, "revoked": revoked})
+        
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Failed to revoke sessions: {str(e)}"}), 500
+
 @app.route('/api/session_data')
 @login_required
 def get_session_data():
-    user = UserManager.get_user_by_id(session['user_id'])
+    user = UserManager.get_user_by_id(current_user_id())
     if not user:
         session.clear()
         return jsonify({"error": "User not found"}), 404
     
+    # The row comes from the user cache; updated_at moves on every change
+    etag, cached = not_modified('session', user['id'], user.get('updated_at'))
+    if cached:
+        return cached
+    
     # Remove sensitive data
     user_data = dict(user)
     user_data.pop('password_hash', None)
@@ -270,33 +538,23 @@ def get_session_data():
     user_data.pop('reset_token', None)
     user_data.pop('reset_token_expires', None)
     
-    return jsonify(user_data)
+    return with_etag(jsonify(user_data), etag)
 
 @app.route('/api/clock_in', methods=['POST'])
 @login_required
 @email_verified_required
 def clock_in():
     try:
-        user_id = session['user_id']
-        now = datetime.now(TIMEZONE)
-        today_str = now.strftime('%Y-%m-%d')
-        
-        # Check if already clocked in today
-        query = "SELECT id FROM attendance WHERE user_id = %s AND date = %s"
-        existing = db.execute_one(query, (user_id, today_str))
-        
-        if existing:
+        user = current_user()
+        # The organization's time zone decides the day; its cutoff decides lateness
+        settings = organizations.for_user(user)
+        now = organizations.now(settings)
+        
+        # Single round trip: the UNIQUE(user_id, date) constraint settles concurrent clock-ins
+        created, record = AttendanceManager.clock_in(user['id'], now, settings['late_cutoff'])
+        if not created:
             return jsonify({"success": False, "message": "You have already clocked in today"}), 409
-        
-        # Determine if late (after 9:00 AM)
-        is_late = now.time() > datetime.strptime("09:00:00", "%H:%M:%S").time()
-        
-        # Insert attendance record
-        query = """
-        INSERT INTO attendance (user_id, date, clock_in_time, is_late)
-        VALUES (%s, %s, %s, %s)
-        """
-        db.execute_query(query, (user_id, today_str, now, is_late))
+        is_late = record['is_late']
         
         return jsonify({
             "success": True,
@@ -305,84 +563,368 @@ def clock_in():
             "is_late": is_late
         })
         
+    except (PoolExhaustedError, HashingBusyError):
+        raise
     except Exception as e:
         return jsonify({"success": False, "message": f"Clock-in failed: {str(e)}"}), 500
 
+@app.route('/api/attendance/bulk', methods=['POST'])
+@kiosk_key_required
+def bulk_clock_in():
+    try:
+        data = request.get_json()
+        records = data.get('records') if isinstance(data, dict) else None
+        if not isinstance(records, list) or not records:
+            return jsonify({"success": False, "message": "Request body needs a non-empty 'records' list"}), 400
+        
+        max_records = app.config['BULK_CLOCK_IN_MAX_RECORDS']
+        if len(records) > max_records:
+            return jsonify({"success": False, "message": f"At most {max_records} records per request"}), 413
+        
+        results = AttendanceManager.bulk_clock_in(records)
+        
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        
+        return jsonify({"success": True, "summary": summary, "results": results})
+        
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Bulk clock-in failed: {str(e)}"}), 500
+
+@app.route('/api/attendance/history')
+@login_required
+@email_verified_required
+def attendance_history():
+    try:
+        try:
+            date_from = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else None
+            date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else None
+            limit = int(request.args.get('limit', 30))
+            records, next_cursor = AttendanceManager.get_history(
+                current_user_id(),
+                cursor=request.args.get('cursor'),
+                date_from=date_from,
+                date_to=date_to,
+                limit=limit
+            )
+        except ValueError as e:
+            return jsonify({"success": False, "message": f"Invalid parameters: {str(e)}"}), 400
+        
+        return jsonify({"records": records, "next_cursor": next_cursor})
+        
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"error": f"Failed to load attendance history: {str(e)}"}), 500
+
+@app.route('/api/attendance/absent')
+@login_required
+@email_verified_required
+def attendance_absentees():
+    try:
+        user = current_user()
+        if user['role'] == 'supervisor':
+            org_type, organization_id = 'company', user['company_id']
+        elif user['role'] == 'lecturer':
+            org_type, organization_id = 'school', user['school_id']
+        else:
+            return jsonify({"success": False, "message": "Only supervisors and lecturers can see who is absent"}), 403
+        settings = organizations.get(organization_id)
+        today = organizations.now(settings).date()
+        
+        try:
+            day = datetime.strptime(request.args['date'], '%Y-%m-%d').date() if request.args.get('date') else today
+            if day > today:
+                raise ValueError("date is in the future")
+            sort = request.args.get('sort', 'name')
+            limit = int(request.args.get('limit', 50))
+            cursor = request.args.get('cursor')
+            # Validates sort and cursor before the ETag check can skip the query
+            AttendanceManager.absentee_query(org_type, organization_id, day, sort, cursor)
+        except ValueError as e:
+            return jsonify({"success": False, "message": f"Invalid parameters: {str(e)}"}), 400
+        
+        # Absentees only change when attendance or membership does
+        version = AttendanceManager.get_attendance_version(organization_id)
+        etag, cached = not_modified('absent', organization_id, day, version, sort, limit, cursor)
+        if cached:
+            return cached
+        
+        records, next_cursor = AttendanceManager.get_absentees(org_type, organization_id, day, sort, cursor, limit)
+        # The total comes from the rollups, not from counting the anti-join
+        summary = AttendanceManager.get_daily_summary(organization_id, day)
+        return with_etag(jsonify({
+            "date": day.isoformat(),
+            "expected_day": day.weekday() in settings['expected_days'],
+            "absent_total": max(0, summary['total'] - summary['present']),
+            "records": records,
+            "next_cursor": next_cursor
+        }), etag)
+        
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"error": f"Failed to load absentees: {str(e)}"}), 500
+
+@app.route('/api/attendance/export')
+@login_required
+@email_verified_required
+def attendance_export():
+    user = current_user()
+    if user['role'] == 'supervisor':
+        org_type, organization_id = 'company', user['company_id']
+    elif user['role'] == 'lecturer':
+        org_type, organization_id = 'school', user['school_id']
+    else:
+        return jsonify({"success": False, "message": "Only supervisors and lecturers can export attendance"}), 403
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"success": False, "message": "Format must be csv or ndjson"}), 400
+    try:
+        date_from = datetime.strptime(request.args['from'], '%Y-%m-%d').date()
+        date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return jsonify({"success": False, "message": "from and to dates (YYYY-MM-DD) are required"}), 400
+    
+    try:
+        # The export connection is checked out here, before the headers go out,
+        # so a busy export pool answers 503 instead of truncating the download
+        chunks, mimetype, close = export_attendance(org_type, organization_id, date_from, date_to, export_format)
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Export failed: {str(e)}"}), 500
+    
+    # Streamed straight from a server-side cursor; nothing is buffered in full
+    filename = f"attendance_{date_from}_{date_to}.{export_format}"
+    response = Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+    response.call_on_close(close)
+    return response
+
+@app.route('/api/roster/import', methods=['POST'])
+@login_required
+@email_verified_required
+def roster_import():
+    user = current_user()
+    if user['role'] == 'supervisor':
+        org_type, org_name = 'company', user['company']
+    elif user['role'] == 'lecturer':
+        org_type, org_name = 'school', user['school']
+    else:
+        return jsonify({"success": False, "message": "Only supervisors and lecturers can import rosters"}), 403
+    if not org_name:
+        return jsonify({"success": False, "message": "Your account has no company or school to import into"}), 400
+    
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({"success": False, "message": "Upload the roster as a CSV or XLSX 'file'"}), 400
+    try:
+        rows = read_roster(upload.stream, upload.filename)
+    except (RosterError, UnicodeDecodeError) as e:
+        return jsonify({"success": False, "message": f"Invalid roster: {str(e)}"}), 400
+    
+    # Hashing, COPY and invitations run in the background; poll the job for progress
+    job_id = roster_jobs.start(
+        user['id'], rows, org_type, org_name, app.config['BASE_URL'], sender=app.config['MAIL_USERNAME']
+    )
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "rows": len(rows),
+        "role": ROSTER_ROLES[org_type],
+        "status_url": url_for('roster_import_status', job_id=job_id)
+    }), 202
+
+@app.route('/api/roster/import/<job_id>')
+@login_required
+@email_verified_required
+def roster_import_status(job_id):
+    try:
+        job = roster_jobs.get(job_id, current_user_id())
+        if job is None:
+            return jsonify({"success": False, "message": "Import not found"}), 404
+        return jsonify(job)
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Failed to get import status: {str(e)}"}), 500
+
+@app.route('/api/analytics/cohort')
+@login_required
+@email_verified_required
+def cohort_analytics():
+    try:
+        user = current_user()
+        if user['role'] == 'supervisor':
+            org_type, organization_id = 'company', user['company_id']
+        elif user['role'] == 'lecturer':
+            org_type, organization_id = 'school', user['school_id']
+        else:
+            return jsonify({"success": False, "message": "Only supervisors and lecturers can view cohort analytics"}), 403
+        settings = organizations.get(organization_id)
+        
+        try:
+            today = organizations.now(settings).date()
+            date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else today - timedelta(days=1)
+            date_from = (datetime.strptime(request.args['from'], '%Y-%m-%d').date()
+                         if request.args.get('from') else date_to - timedelta(days=119))
+        except ValueError:
+            return jsonify({"success": False, "message": "Dates must be YYYY-MM-DD"}), 400
+        if date_from > date_to or (date_to - date_from).days > 366:
+            return jsonify({"success": False, "message": "Date range must be between 1 and 366 days"}), 400
+        
+        return jsonify(cohort_report(org_type, organization_id, date_from, date_to,
+                                     weekdays=settings['expected_days'], as_of=today))
+        
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"error": f"Failed to compute analytics: {str(e)}"}), 500
+
+@app.route('/api/dashboard/stream')
+@login_required
+@email_verified_required
+def dashboard_stream():
+    user = current_user()
+    if user['role'] not in ('supervisor', 'lecturer'):
+        return jsonify({"success": False, "message": "Only supervisors and lecturers can follow live attendance"}), 403
+    
+    # Clock-ins arrive from the process-wide LISTEN thread; the stream itself runs no queries
+    subscription = event_hub.subscribe(organization_id_of(user))
+    response = Response(
+        event_hub.stream(subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Also covers clients that disconnect before the stream starts
+    response.call_on_close(lambda: event_hub.unsubscribe(subscription))
+    return response
+
 @app.route('/api/dashboard_data')
 @login_required
 @email_verified_required
 def get_dashboard_data():
     try:
-        user = UserManager.get_user_by_id(session['user_id'])
+        user = current_user()
         role = user['role']
-        today_str = datetime.now(TIMEZONE).strftime('%Y-%m-%d')
+        organization_id = organization_id_of(user)
+        today_str = organizations.now(organizations.get(organization_id)).strftime('%Y-%m-%d')
         
         if role in ['intern', 'student']:
-            # Get personal attendance records
-            query = """
-            SELECT date, clock_in_time, is_late 
-            FROM attendance 
-            WHERE user_id = %s 
-            ORDER BY date DESC 
-            LIMIT 30
-            """
-            records = db.execute_query(query, (user['id'],), fetch=True)
-            return jsonify({"type": "personal", "records": records})
-        
-        elif role == 'supervisor':
-            # Get company attendance data
-            company = user['company']
-            
-            # Get today's attendance for company
-            query = """
-            SELECT u.full_name, a.clock_in_time, a.is_late
-            FROM attendance a
-            JOIN users u ON a.user_id = u.id
-            WHERE a.date = %s AND u.company = %s AND u.role = 'intern'
-            ORDER BY a.clock_in_time
-            """
-            present = db.execute_query(query, (today_str, company), fetch=True)
-            
-            # Get total intern count for company
-            query = "SELECT COUNT(*) as count FROM users WHERE role = 'intern' AND company = %s"
-            total_result = db.execute_one(query, (company,))
-            total_count = total_result['count'] if total_result else 0
+            etag = None
+            if organization_id:
+                # The user's own clock-ins bump their organization's attendance version
+                version = AttendanceManager.get_attendance_version(organization_id)
+                etag, cached = not_modified('personal', user['id'], version)
+                if cached:
+                    return cached
             
-            return jsonify({
-                "type": "management",
-                "present": present,
-                "all_interns_count": total_count
-            })
+            # Get the first page of personal attendance records; older pages via /api/attendance/history
+            records, next_cursor = AttendanceManager.get_history(user['id'], limit=30)
+            response = jsonify({"type": "personal", "records": records, "next_cursor": next_cursor})
+            return with_etag(response, etag) if etag else response
         
-        elif role == 'lecturer':
-            # Get school attendance data
-            school = user['school']
+        elif role in ['supervisor', 'lecturer']:
+            org_type = 'company' if role == 'supervisor' else 'school'
             
-            # Get today's attendance for school
-            query = """
-            SELECT u.full_name, a.clock_in_time, a.is_late
-            FROM attendance a
-            JOIN users u ON a.user_id = u.id
-            WHERE a.date = %s AND u.school = %s AND u.role = 'student'
-            ORDER BY a.clock_in_time
-            """
-            present = db.execute_query(query, (today_str, school), fetch=True)
+            # Unchanged since the last poll: one primary-key lookup, no attendance or rollup reads
+            version = AttendanceManager.get_attendance_version(organization_id)
+            etag, cached = not_modified('management', organization_id, today_str, version)
+            if cached:
+                return cached
             
-            # Get total student count for school
-            query = "SELECT COUNT(*) as count FROM users WHERE role = 'student' AND school = %s"
-            total_result = db.execute_one(query, (school,))
-            total_count = total_result['count'] if total_result else 0
+            # Counts are one rollup lookup; the present list is only re-queried after a clock-in
+            summary = AttendanceManager.get_daily_summary(organization_id, today_str)
+            present = AttendanceManager.get_present_list(org_type, organization_id, today_str, summary)
             
-            return jsonify({
+            return with_etag(jsonify({
                 "type": "management",
+                "date": today_str,
                 "present": present,
-                "all_interns_count": total_count
-            })
+                "summary": summary,
+                "all_interns_count": summary['total']
+            }), etag)
         
         return jsonify({"message": "Role not supported"}), 400
         
+    except (PoolExhaustedError, HashingBusyError):
+        raise
     except Exception as e:
         return jsonify({"error": f"Failed to load dashboard data: {str(e)}"}), 500
 
+@app.route('/api/admin/stats')
+@admin_key_required
+def admin_stats():
+    # In-process counters only; no database round trip
+    return jsonify({
+        "user_cache": user_cache.stats(),
+        "db_pool": db.pool_stats(),
+        "db_routing": db.routing_stats(),
+        "db_replicas": db.replica_status(),
+        "live_events": event_hub.stats(),
+        "organizations": organizations.stats()
+    })
+
+@app.route('/api/admin/organizations/<int:organization_id>/settings', methods=['PUT'])
+@admin_key_required
+def update_organization_settings(organization_id):
+    try:
+        data = request.get_json() or {}
+        settings = {}
+        try:
+            if 'late_cutoff' in data:
+                settings['late_cutoff'] = (datetime.strptime(data['late_cutoff'], '%H:%M').time()
+                                           if data['late_cutoff'] else None)
+            if 'timezone' in data:
+                settings['timezone'] = data['timezone'] or None
+            if 'expected_days' in data:
+                days = data['expected_days']
+                if days is not None and not all(isinstance(day, int) and 0 <= day <= 6 for day in days):
+                    raise ValueError("expected_days are weekday numbers, Monday = 0")
+                settings['expected_days'] = sorted(set(days)) if days is not None else None
+            organizations.update(organization_id, **settings)
+        except (ValueError, TypeError, pytz.UnknownTimeZoneError) as e:
+            return jsonify({"success": False, "message": f"Invalid settings: {str(e)}"}), 400
+        
+        current = organizations.get(organization_id)
+        if current['id'] is None:
+            return jsonify({"success": False, "message": "Organization not found"}), 404
+        return jsonify({
+            "success": True,
+            "organization": {
+                "id": current['id'],
+                "type": current['org_type'],
+                "name": current['name'],
+                "late_cutoff": current['late_cutoff'].strftime('%H:%M'),
+                "timezone": current['timezone'].zone,
+                "expected_days": list(current['expected_days']),
+            }
+        })
+        
+    except (PoolExhaustedError, HashingBusyError):
+        raise
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Failed to update settings: {str(e)}"}), 500
+
+@app.route('/metrics')
+def prometheus_metrics():
+    if not (app.config['METRICS_ALLOW_REMOTE'] or request.remote_addr in ('127.0.0.1', '::1')):
+        expected = app.config['ADMIN_API_KEY']
+        provided = request.headers.get('X-Admin-Key', '')
+        if not expected or not hmac.compare_digest(provided, expected):
+            return jsonify({"success": False, "message": "Metrics are only served to local scrapers"}), 403
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    # Development server; in production run `gunicorn -c gunicorn.conf.py wsgi:app`
+    start_background_services()
+    app.run(port=int(os.getenv('PORT', 5001)), debug=os.getenv('FLASK_DEBUG', 'False').lower() == 'true',
+            use_reloader=False, threaded=True)
\ No newline at end of file
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Attendance export for ChronoTrack
+Streams an organization's attendance over a date range as CSV or NDJSON.
+Rows are read through a server-side named cursor in chunks, so memory use
+stays flat no matter how large the range is. Exports run on their own small
+connection pool so a slow download never holds an application connection.
+
+Usage: python attendance_export.py (--company NAME | --school NAME) --from YYYY-MM-DD --to YYYY-MM-DD [--format csv|ndjson] [--output FILE]
+"""
+
+import io
+import os
+import csv
+import sys
+import json
+import argparse
+import threading
+
+import psycopg2.extras
+from dotenv import load_dotenv
+
+from connection_pool import ConnectionPool
+
+load_dotenv()
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 5000))
+EXPORT_POOL_MAX = int(os.getenv('EXPORT_POOL_MAX', 2))  # concurrent exports; more get a 503
+EXPORT_POOL_TIMEOUT = float(os.getenv('EXPORT_POOL_TIMEOUT', 1))
+
+_export_pool = None
+_export_pool_pid = None  # a forked worker builds its own pool instead of sharing the parent's sockets
+_inherited_pools = []  # never closed in the child, which would end the parent's sessions
+_export_pool_lock = threading.Lock()
+
+EXPORT_COLUMNS = ['date', 'full_name', 'email', 'matric_number', 'clock_in_time', 'clock_out_time', 'is_late']
+
+# Interns belong to companies and students to schools, as on the dashboards
+ORGANIZATION_FILTERS = {
+    'company': "u.company_id = %s AND u.role = 'intern'",
+    'school': "u.school_id = %s AND u.role = 'student'",
+}
+
+
+def get_export_pool():
+    """Connection pool reserved for exports, created on first use in each process"""
+    global _export_pool, _export_pool_pid
+    if _export_pool_pid != os.getpid():
+        with _export_pool_lock:
+            if _export_pool_pid != os.getpid():
+                if _export_pool is not None:
+                    _inherited_pools.append(_export_pool)
+                _export_pool = ConnectionPool(
+                    0, EXPORT_POOL_MAX,
+                    timeout=EXPORT_POOL_TIMEOUT,
+                    retry_after=int(os.getenv('DB_POOL_RETRY_AFTER', 1)),
+                    host=os.getenv('DB_HOST', 'localhost'),
+                    database=os.getenv('DB_NAME', 'attendance_db'),
+                    user=os.getenv('DB_USER', 'postgres'),
+                    password=os.getenv('DB_PASSWORD', 'password'),
+                    port=os.getenv('DB_PORT', '5432')
+                )
+                _export_pool_pid = os.getpid()
+    return _export_pool
+
+
+def export_pool_stats():
+    """Usage counters of the export pool, empty until the first export"""
+    return _export_pool.stats() if _export_pool_pid == os.getpid() else {}
+
+
+def open_export(org_type, organization_id, date_from, date_to, chunk_size=EXPORT_CHUNK_SIZE):
+    """Check out an export connection and open the named cursor.
+
+    Runs before any response bytes are sent, so a busy export pool raises
+    PoolExhaustedError (a 503) instead of truncating a download. Returns
+    (cursor, close); close() must be called exactly when the export ends.
+    """
+    query = f"""
+    SELECT a.date, u.full_name, u.email, u.matric_number,
+           a.clock_in_time, a.clock_out_time, a.is_late
+    FROM attendance a
+    JOIN users u ON a.user_id = u.id
+    WHERE {ORGANIZATION_FILTERS[org_type]} AND a.date BETWEEN %s AND %s
+    ORDER BY a.date, a.clock_in_time
+    """
+    pool = get_export_pool()
+    conn = pool.getconn()
+    closed = []
+
+    def close():
+        if not closed:
+            closed.append(True)
+            # putconn rolls back the export transaction and restores autocommit
+            pool.putconn(conn)
+
+    try:
+        # Named cursors live inside a transaction
+        conn.autocommit = False
+        cursor = conn.cursor(name='attendance_export', cursor_factory=psycopg2.extras.DictCursor)
+        cursor.itersize = chunk_size
+        cursor.execute(query, (organization_id, date_from, date_to))
+    except Exception:
+        close()
+        raise
+    return cursor, close
+
+
+def stream_attendance(cursor, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield attendance rows from an open export cursor, fetched chunk by chunk"""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for row in rows:
+            yield row
+
+
+def _format_value(value):
+    # Dates and timestamps as ISO 8601 in both formats
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def export_csv(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield CSV text in chunks of roughly ``chunk_size`` rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in rows:
+        writer.writerow([_format_value(row[column]) for column in EXPORT_COLUMNS])
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def export_ndjson(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield newline-delimited JSON in chunks of roughly ``chunk_size`` rows"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: _format_value(row[column]) for column in EXPORT_COLUMNS}))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (export_csv, 'text/csv'),
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+}
+
+
+def export_attendance(org_type, organization_id, date_from, date_to, export_format='csv'):
+    """Return (chunk generator, mimetype, close) for an organization's attendance export"""
+    formatter, mimetype = EXPORT_FORMATS[export_format]
+    cursor, close = open_export(org_type, organization_id, date_from, date_to)
+    return formatter(stream_attendance(cursor)), mimetype, close
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export attendance for a company or school")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--company')
+    group.add_argument('--school')
+    parser.add_argument('--from', dest='date_from', required=True)
+    parser.add_argument('--to', dest='date_to', required=True)
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--output', help="File to write (default: stdout)")
+    args = parser.parse_args()
+
+    # Imported here so the app's export path does not need the main pool
+    from organizations import OrganizationSettings
+
+    org_type, org_name = ('company', args.company) if args.company else ('school', args.school)
+    organization_id = OrganizationSettings.find(org_type, org_name)
+    if organization_id is None:
+        sys.exit(f"No {org_type} named {org_name!r}")
+    chunks, _, close = export_attendance(org_type, organization_id, args.date_from, args.date_to, args.format)
+
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        close()
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+import io
+import os
+import json
+import base64
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import psycopg2.extras
+import pytz
+
+from database import db
+from organizations import organizations, DEFAULT_LATE_CUTOFF
+
+# Bulk batches at least this large are loaded with COPY instead of a multi-row INSERT
+BULK_COPY_THRESHOLD = int(os.getenv('BULK_COPY_THRESHOLD', 1000))
+
+# Bulk timestamps outside this window are rejected: a kiosk with a wrong clock
+# would otherwise write a future day's row and block the user's real clock-in
+BULK_MAX_CLOCK_SKEW = timedelta(seconds=int(os.getenv('BULK_MAX_CLOCK_SKEW', 300)))
+BULK_MAX_BACKDATE = timedelta(days=int(os.getenv('BULK_MAX_BACKDATE_DAYS', 7)))
+
+# Today's present lists for management dashboards, reused until the rollup counts move
+PRESENT_LIST_CACHE_SIZE = int(os.getenv('PRESENT_LIST_CACHE_SIZE', 1024))
+
+PRESENT_LIST_FILTERS = {
+    'company': "u.company_id = %s AND u.role = 'intern'",
+    'school': "u.school_id = %s AND u.role = 'student'",
+}
+
+# Hot statements, prepared once per pooled connection (see Database.register)
+CLOCK_IN = db.register('clock_in', """
+WITH inserted AS (
+    INSERT INTO attendance (user_id, date, clock_in_time, is_late)
+    VALUES (%(user_id)s, %(date)s, %(clock_in_time)s, %(is_late)s)
+    ON CONFLICT (user_id, date) DO NOTHING
+    RETURNING clock_in_time, is_late
+)
+SELECT TRUE AS created, clock_in_time, is_late FROM inserted
+UNION ALL
+SELECT FALSE AS created, clock_in_time, is_late FROM attendance
+WHERE user_id = %(user_id)s AND date = %(date)s
+  AND NOT EXISTS (SELECT 1 FROM inserted)
+""")
+
+DAILY_SUMMARY = db.register('daily_summary', """
+SELECT c.members AS total,
+       COALESCE(r.present, 0) AS present,
+       COALESCE(r.late, 0) AS late
+FROM organization_member_counts c
+LEFT JOIN attendance_daily_rollup r
+  ON r.organization_id = c.organization_id AND r.date = %s
+WHERE c.organization_id = %s
+""")
+
+ATTENDANCE_VERSION = db.register('attendance_version', """
+SELECT attendance_version, members
+FROM organization_member_counts
+WHERE organization_id = %s
+""")
+
+PRESENT_LISTS = {
+    org_type: db.register(f'present_list_{org_type}', f"""
+    SELECT u.full_name, a.clock_in_time, a.is_late
+    FROM attendance a
+    JOIN users u ON a.user_id = u.id
+    WHERE a.date = %s AND {condition}
+    ORDER BY a.clock_in_time
+    """)
+    for org_type, condition in PRESENT_LIST_FILTERS.items()
+}
+
+_present_lists = OrderedDict()
+_present_lists_lock = threading.Lock()
+
+HISTORY_DEFAULT_PAGE_SIZE = 30
+HISTORY_MAX_PAGE_SIZE = 100
+
+# Absentee sort keys -> (column, direction); each walks idx_users_{company,school}_{name,email}
+ABSENTEE_SORTS = {
+    'name': ('full_name', 'ASC'),
+    '-name': ('full_name', 'DESC'),
+    'email': ('email', 'ASC'),
+    '-email': ('email', 'DESC'),
+}
+ABSENTEE_DEFAULT_PAGE_SIZE = 50
+ABSENTEE_MAX_PAGE_SIZE = 500
+
+class AttendanceManager:
+    @staticmethod
+    def is_late(clock_in_time, late_cutoff=DEFAULT_LATE_CUTOFF):
+        """Check if a clock-in time is after the late cutoff"""
+        return clock_in_time.time() > late_cutoff
+    
+    @staticmethod
+    def clock_in(user_id, now, late_cutoff=DEFAULT_LATE_CUTOFF):
+        """Record today's clock-in in one atomic statement.
+        
+        ``now`` is in the organization's time zone, which decides the day.
+        Returns (created, record). When the user already clocked in today,
+        created is False and record holds the existing clock-in (or None if
+        that row was committed by a concurrent request after this statement
+        started and is not yet visible to it).
+        """
+        params = {
+            'user_id': user_id,
+            'date': now.date(),
+            'clock_in_time': now,
+            'is_late': AttendanceManager.is_late(now, late_cutoff),
+        }
+        record = db.execute_prepared_one(CLOCK_IN, params)
+        created = bool(record and record['created'])
+        return created, record
+    
+    @staticmethod
+    def _parse_timestamp(timestamp):
+        """Parse an ISO 8601 timestamp; naive ones are placed in the user's time zone later"""
+        return datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+    
+    @staticmethod
+    def _parse_clock_in(parsed, timezone, now=None):
+        """Move a parsed timestamp into the attendance timezone, rejecting implausible times"""
+        if parsed.tzinfo is None:
+            parsed = timezone.localize(parsed)
+        else:
+            parsed = parsed.astimezone(timezone)
+        now = now or datetime.now(timezone)
+        if parsed > now + BULK_MAX_CLOCK_SKEW:
+            raise ValueError("Timestamp is in the future")
+        if parsed < now - BULK_MAX_BACKDATE:
+            raise ValueError("Timestamp is too far in the past")
+        return parsed
+    
+    @staticmethod
+    def _identify(record):
+        """Return the (kind, value) user identifier of a bulk record, or None"""
+        if record.get('user_id') is not None:
+            return ('user_id', int(record['user_id']))
+        if record.get('email'):
+            return ('email', str(record['email']).lower().strip())
+        if record.get('matric_number'):
+            return ('matric_number', str(record['matric_number']).strip())
+        return None
+    
+    @staticmethod
+    def _resolve_users(identifiers):
+        """Map (kind, value) user identifiers to user ids in one query"""
+        values = {'user_id': set(), 'email': set(), 'matric_number': set()}
+        for kind, value in identifiers:
+            values[kind].add(value)
+        
+        query = """
+        SELECT id, email, matric_number,
+               CASE role WHEN 'intern' THEN company_id WHEN 'student' THEN school_id END AS organization_id
+        FROM users
+        WHERE id = ANY(%s) OR email = ANY(%s) OR matric_number = ANY(%s)
+        """
+        params = (list(values['user_id']), list(values['email']), list(values['matric_number']))
+        rows = db.execute_query(query, params, fetch=True)
+        
+        resolved = {}
+        for row in rows:
+            user = (row['id'], row['organization_id'])
+            resolved[('user_id', row['id'])] = user
+            resolved[('email', row['email'])] = user
+            if row['matric_number']:
+                resolved[('matric_number', row['matric_number'])] = user
+        return resolved
+    
+    @staticmethod
+    def bulk_clock_in(records):
+        """Validate and write a batch of clock-ins.
+        
+        Each record names its user by user_id, email or matric_number and
+        carries an ISO 8601 timestamp. Users are resolved in one query,
+        timestamps without an offset are read in each user's organization
+        time zone, lateness uses the organization's cutoff, and rows are
+        written with a multi-row INSERT (or COPY through a staging table for
+        large batches). Returns one result dict per record, in input order,
+        with status created, duplicate, unknown_user or invalid. Timestamps
+        more than BULK_MAX_CLOCK_SKEW ahead or BULK_MAX_BACKDATE behind now
+        are invalid.
+        """
+        results = [None] * len(records)
+        identifiers = {}
+        for index, record in enumerate(records):
+            try:
+                identifier = AttendanceManager._identify(record)
+                timestamp = AttendanceManager._parse_timestamp(record.get('timestamp'))
+            except (AttributeError, TypeError, ValueError):
+                identifier = timestamp = None
+            if identifier is None or timestamp is None:
+                results[index] = {'index': index, 'status': 'invalid',
+                                  'message': 'Each record needs a user identifier and an ISO 8601 timestamp'}
+                continue
+            identifiers[index] = (identifier, timestamp)
+        
+        resolved = AttendanceManager._resolve_users({ident for ident, _ in identifiers.values()})
+        
+        # Keep the earliest tap per user and day; later taps in the batch are duplicates
+        now = datetime.now(pytz.utc)
+        clock_ins = {}
+        earliest = {}
+        for index, (identifier, timestamp) in identifiers.items():
+            user = resolved.get(identifier)
+            if user is None:
+                results[index] = {'index': index, 'status': 'unknown_user', 'message': 'User not found'}
+                continue
+            user_id, organization_id = user
+            settings = organizations.get(organization_id)
+            try:
+                clock_in_time = AttendanceManager._parse_clock_in(timestamp, settings['timezone'], now)
+            except ValueError as e:
+                results[index] = {'index': index, 'status': 'invalid', 'message': str(e)}
+                continue
+            clock_ins[index] = (clock_in_time, settings['late_cutoff'])
+            key = (user_id, clock_in_time.date())
+            current = earliest.get(key)
+            if current is None or clock_in_time < clock_ins[current][0]:
+                if current is not None:
+                    results[current] = {'index': current, 'status': 'duplicate'}
+                earliest[key] = index
+            else:
+                results[index] = {'index': index, 'status': 'duplicate'}
+        
+        # Lateness for the whole batch in one pass
+        keys = list(earliest.items())
+        rows = [
+            (user_id, day, clock_ins[index][0], clock_ins[index][0].time() > clock_ins[index][1])
+            for (user_id, day), index in keys
+        ]
+        created = AttendanceManager._insert_clock_ins(rows) if rows else set()
+        
+        for ((user_id, day), index), row in zip(keys, rows):
+            if (user_id, day) in created:
+                results[index] = {
+                    'index': index,
+                    'status': 'created',
+                    'user_id': user_id,
+                    'date': day.isoformat(),
+                    'is_late': row[3],
+                }
+            else:
+                results[index] = {'index': index, 'status': 'duplicate', 'user_id': user_id}
+        return results
+    
+    @staticmethod
+    def _insert_clock_ins(rows):
+        """Insert (user_id, date, clock_in_time, is_late) rows, returning the (user_id, date) keys created"""
+        def insert(cursor):
+            if len(rows) < BULK_COPY_THRESHOLD:
+                return psycopg2.extras.execute_values(cursor, """
+                    INSERT INTO attendance (user_id, date, clock_in_time, is_late)
+                    VALUES %s
+                    ON CONFLICT (user_id, date) DO NOTHING
+                    RETURNING user_id, date
+                """, rows, page_size=len(rows), fetch=True)
+            # COPY is the fastest way in; ON CONFLICT needs a staging table to apply it
+            cursor.execute("""
+                CREATE TEMP TABLE attendance_staging (
+                    user_id INTEGER, date DATE, clock_in_time TIMESTAMPTZ, is_late BOOLEAN
+                ) ON COMMIT DROP
+            """)
+            buffer = io.StringIO()
+            for user_id, day, clock_in_time, is_late in rows:
+                buffer.write(f"{user_id}\t{day.isoformat()}\t{clock_in_time.isoformat()}\t{'t' if is_late else 'f'}\n")
+            buffer.seek(0)
+            cursor.copy_expert("COPY attendance_staging FROM STDIN", buffer)
+            cursor.execute("""
+                INSERT INTO attendance (user_id, date, clock_in_time, is_late)
+                SELECT user_id, date, clock_in_time, is_late FROM attendance_staging
+                ON CONFLICT (user_id, date) DO NOTHING
+                RETURNING user_id, date
+            """)
+            return cursor.fetchall()
+        
+        # Inside a caller's db.transaction() this commits or rolls back with it
+        with db.transaction():
+            created = db.execute_cursor("INSERT INTO attendance (bulk clock-in)", insert)
+        return {(row['user_id'], row['date']) for row in created}
+    
+    @staticmethod
+    def get_daily_summary(organization_id, date):
+        """Read an organization's present/late/total counts for a day from the rollups"""
+        row = db.execute_prepared_one(DAILY_SUMMARY, (date, organization_id))
+        if not row:
+            return {'total': 0, 'present': 0, 'late': 0, 'on_time': 0}
+        summary = dict(row)
+        summary['on_time'] = summary['present'] - summary['late']
+        return summary
+    
+    @staticmethod
+    def get_attendance_version(organization_id):
+        """An organization's attendance version and member count.
+        
+        The rollup trigger bumps the version on every statement that changes
+        the organization's attendance, so together with the member count it
+        identifies the dashboard's content without reading any attendance.
+        """
+        row = db.execute_prepared_one(ATTENDANCE_VERSION, (organization_id,))
+        if not row:
+            return (0, 0)
+        return (row['attendance_version'], row['members'])
+    
+    @staticmethod
+    def get_present_list(org_type, organization_id, date, summary):
+        """Who clocked in for an organization on a day, ordered by clock-in time.
+        
+        The list only changes when the rollup's present/late counts do, so it
+        is cached per organization and day under those counts and the join
+        over attendance and users runs only after someone clocks in.
+        """
+        key = (organization_id, str(date))
+        version = (summary['present'], summary['late'])
+        with _present_lists_lock:
+            cached = _present_lists.get(key)
+            if cached and cached[0] == version:
+                _present_lists.move_to_end(key)
+                return cached[1]
+        
+        if summary['present'] == 0:
+            present = []
+        else:
+            present = db.execute_prepared(PRESENT_LISTS[org_type], (date, organization_id), fetch=True)
+        
+        with _present_lists_lock:
+            _present_lists[key] = (version, present)
+            _present_lists.move_to_end(key)
+            while len(_present_lists) > PRESENT_LIST_CACHE_SIZE:
+                _present_lists.popitem(last=False)
+        return present
+    
+    @staticmethod
+    def _encode_cursor(payload):
+        data = json.dumps(payload).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(token):
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    
+    @staticmethod
+    def encode_history_cursor(last_date):
+        """Opaque page token pointing just past ``last_date``"""
+        return AttendanceManager._encode_cursor({'d': last_date.isoformat()})
+    
+    @staticmethod
+    def decode_history_cursor(token):
+        """Turn a page token back into the last date already returned"""
+        try:
+            return date.fromisoformat(AttendanceManager._decode_cursor(token)['d'])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+    
+    @staticmethod
+    def history_query(user_id, cursor=None, date_from=None, date_to=None, limit=HISTORY_DEFAULT_PAGE_SIZE):
+        """Build the (query, params) for one history page; fetches limit + 1 rows"""
+        conditions = ["user_id = %s"]
+        params = [user_id]
+        if cursor:
+            conditions.append("date < %s")
+            params.append(AttendanceManager.decode_history_cursor(cursor))
+        if date_from:
+            conditions.append("date >= %s")
+            params.append(date_from)
+        if date_to:
+            conditions.append("date <= %s")
+            params.append(date_to)
+        params.append(limit + 1)  # one extra row tells us whether another page exists
+        
+        query = f"""
+        SELECT date, clock_in_time, is_late
+        FROM attendance
+        WHERE {' AND '.join(conditions)}
+        ORDER BY date DESC
+        LIMIT %s
+        """
+        return query, tuple(params)
+    
+    @staticmethod
+    def get_history(user_id, cursor=None, date_from=None, date_to=None, limit=HISTORY_DEFAULT_PAGE_SIZE):
+        """Keyset-paginated attendance history, newest first.
+        
+        Each page seeks into idx_attendance_user_date at (user_id, date), so
+        page N costs the same as page 1. Returns (records, next_cursor);
+        next_cursor is None on the last page.
+        """
+        limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+        query, params = AttendanceManager.history_query(user_id, cursor, date_from, date_to, limit)
+        records = db.execute_query(query, params, fetch=True)
+        
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = AttendanceManager.encode_history_cursor(records[-1]['date'])
+        return records, next_cursor
+    
+    @staticmethod
+    def encode_absentee_cursor(sort, record):
+        """Opaque page token pointing just past ``record`` in ``sort`` order"""
+        column, _ = ABSENTEE_SORTS[sort]
+        return AttendanceManager._encode_cursor({'s': sort, 'v': record[column], 'i': record['id']})
+    
+    @staticmethod
+    def decode_absentee_cursor(sort, token):
+        """The (sort value, user id) of the last absentee already returned"""
+        try:
+            payload = AttendanceManager._decode_cursor(token)
+            if payload['s'] != sort or not isinstance(payload['v'], str) or not isinstance(payload['i'], int):
+                raise ValueError
+            return payload['v'], payload['i']
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+    
+    @staticmethod
+    def absentee_query(org_type, organization_id, day, sort='name', cursor=None, limit=ABSENTEE_DEFAULT_PAGE_SIZE):
+        """Build the (query, params) for one absentee page; fetches limit + 1 rows"""
+        if sort not in ABSENTEE_SORTS:
+            raise ValueError(f"sort must be one of {', '.join(ABSENTEE_SORTS)}")
+        column, direction = ABSENTEE_SORTS[sort]
+        conditions = [PRESENT_LIST_FILTERS[org_type]]
+        params = [organization_id]
+        if cursor:
+            # Row comparison keeps the keyset seek inside the (org, role, column, id) index
+            conditions.append(f"(u.{column}, u.id) {'>' if direction == 'ASC' else '<'} (%s, %s)")
+            params.extend(AttendanceManager.decode_absentee_cursor(sort, cursor))
+        params.extend([day, limit + 1])
+        
+        query = f"""
+        SELECT u.id, u.full_name, u.email, u.matric_number
+        FROM users u
+        WHERE {' AND '.join(conditions)}
+          AND NOT EXISTS (
+              SELECT 1 FROM attendance a WHERE a.user_id = u.id AND a.date = %s
+          )
+        ORDER BY u.{column} {direction}, u.id {direction}
+        LIMIT %s
+        """
+        return query, tuple(params)
+    
+    @staticmethod
+    def get_absentees(org_type, organization_id, day, sort='name', cursor=None, limit=ABSENTEE_DEFAULT_PAGE_SIZE):
+        """Members of an organization with no clock-in on ``day``, one page at a time.
+        
+        The anti-join runs in the database: members are read in sort order
+        from the organization's (role, column, id) index and each is probed
+        against attendance's (user_id, date) key, stopping once the page is
+        full. A page costs about limit / absence-rate probes, however large
+        the organization. Returns (records, next_cursor).
+        """
+        limit = max(1, min(limit, ABSENTEE_MAX_PAGE_SIZE))
+        query, params = AttendanceManager.absentee_query(org_type, organization_id, day, sort, cursor, limit)
+        records = db.execute_query(query, params, fetch=True)
+        
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = AttendanceManager.encode_absentee_cursor(sort, records[-1])
+        return records, next_cursor
@@ -1,22 +1,39 @@
-import bcrypt
 import jwt
 import secrets
 import string
 from datetime import datetime, timedelta
 from flask import current_app
 from database import db
+from user_cache import get_user, invalidate_user
+from password_hashing import password_hasher
+from token_auth import revocations
+from session_store import session_store
+
+# Hot lookups, prepared once per pooled connection. Both read the primary: the
+# request after a registration, verification or password reset must see it,
+# and read-your-writes stickiness ends with the request that wrote
+# (the user cache keeps most of these lookups off the database anyway)
+USER_BY_ID = db.register('user_by_id', "SELECT * FROM users WHERE id = %s", primary=True)
+USER_BY_EMAIL = db.register('user_by_email', "SELECT * FROM users WHERE email = %s", primary=True)
 
 class AuthUtils:
     @staticmethod
     def hash_password(password):
-        """Hash password using bcrypt"""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hash password using bcrypt on the hashing worker pool"""
+        # Don't hold the request's idle connection through the hash
+        db.release_connection()
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(password, hashed):
-        """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+        """Verify password against hash on the hashing worker pool"""
+        db.release_connection()
+        return password_hasher.verify(password, hashed)
+    
+    @staticmethod
+    def password_needs_rehash(hashed):
+        """Check if a hash was made with a different cost factor than BCRYPT_ROUNDS"""
+        return password_hasher.needs_rehash(hashed)
     
     @staticmethod
     def generate_token(user_id, expires_in_hours=24):
@@ -77,14 +94,23 @@ class UserManager:
     @staticmethod
     def get_user_by_email(email):
         """Get user by email"""
-        query = "SELECT * FROM users WHERE email = %s"
-        return db.execute_one(query, (email,))
+        return db.execute_prepared_one(USER_BY_EMAIL, (email,))
     
     @staticmethod
     def get_user_by_id(user_id):
-        """Get user by ID"""
-        query = "SELECT * FROM users WHERE id = %s"
-        return db.execute_one(query, (user_id,))
+        """Get user by ID, served from the request memo and process cache when possible"""
+        return get_user(user_id, UserManager._load_user_by_id)
+    
+    @staticmethod
+    def _load_user_by_id(user_id):
+        return db.execute_prepared_one(USER_BY_ID, (user_id,))
+    
+    @staticmethod
+    def update_password_hash(user_id, password_hash):
+        """Replace a user's stored password hash"""
+        query = "UPDATE users SET password_hash = %s WHERE id = %s"
+        db.execute_query(query, (password_hash, user_id))
+        invalidate_user(user_id)
     
     @staticmethod
     def verify_user_email(email, verification_code):
@@ -96,6 +122,8 @@ class UserManager:
         RETURNING id
         """
         result = db.execute_one(query, (email, verification_code))
+        if result:
+            invalidate_user(result['id'])
         return result is not None
     
     @staticmethod
@@ -111,6 +139,8 @@ class UserManager:
         RETURNING id
         """
         result = db.execute_one(query, (reset_token, expires_at, email))
+        if result:
+            invalidate_user(result['id'])
         return reset_token if result else None
     
     @staticmethod
@@ -118,11 +148,17 @@ class UserManager:
         """Reset password using token"""
         hashed_password = AuthUtils.hash_password(new_password)
         
+        # The token arrived by email, which also proves the address (roster invitations)
         query = """
         UPDATE users 
-        SET password_hash = %s, reset_token = NULL, reset_token_expires = NULL 
+        SET password_hash = %s, reset_token = NULL, reset_token_expires = NULL, email_verified = TRUE 
         WHERE reset_token = %s AND reset_token_expires > %s
         RETURNING id
         """
         result = db.execute_one(query, (hashed_password, reset_token, datetime.utcnow()))
+        if result:
+            invalidate_user(result['id'])
+            # API tokens issued before the reset stop working everywhere
+            revocations.revoke_user(result['id'])
+            session_store.revoke(result['id'])
         return result is not None
\ No newline at end of file
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Authorization overhead benchmark
+Times a protected no-op endpoint through the Flask test client with three
+kinds of caller: a session cookie with the user row evicted from the user
+cache before every request (a database read per request), a session cookie
+with a warm cache, and a bearer access token (signature check, claims and
+an in-memory revocation lookup, no database). Queries per request are
+counted with a query hook.
+Requires a database initialized with init_db.py
+
+Usage: python benchmarks/bench_auth.py [requests]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+from bench_utils import ROOT, summarize, print_summary, save_results
+
+from database import db
+from auth_utils import UserManager
+from user_cache import invalidate_user
+import app as app_module
+
+
+@app_module.app.route('/bench/protected')
+@app_module.login_required
+@app_module.email_verified_required
+def bench_protected():
+    user = app_module.current_user()
+    return {'role': user['role']}
+
+
+def run(client, requests, headers=None, before=None):
+    queries = []
+    hook = lambda query, seconds, rows, error: queries.append(query)
+    db.add_query_hook(hook)
+    latencies = []
+    try:
+        for _ in range(requests):
+            if before:
+                before()
+            started = time.perf_counter()
+            response = client.get('/bench/protected', headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+    finally:
+        db.query_hooks.remove(hook)
+    summary = summarize(latencies)
+    summary['queries_per_request'] = round(len(queries) / requests, 2)
+    return summary
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    email = f"bench-auth-{datetime.now().timestamp()}@chronotrack.test"
+    user_id, _ = UserManager.create_user(email, 'bench-password', 'supervisor', 'Bench Supervisor',
+                                         company='Bench Auth Co')
+    db.execute_query("UPDATE users SET email_verified = TRUE WHERE id = %s", (user_id,))
+    invalidate_user(user_id)
+
+    try:
+        client = app_module.app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        results = {'requests': requests}
+        results['session_cold_cache'] = run(client, requests, before=lambda: invalidate_user(user_id))
+        results['session_warm_cache'] = run(client, requests)
+
+        token = app_module.token_auth.issue(UserManager.get_user_by_id(user_id))['access_token']
+        bearer = app_module.app.test_client()
+        results['bearer_token'] = run(bearer, requests, headers={'Authorization': f'Bearer {token}'})
+
+        for label in ('session_cold_cache', 'session_warm_cache', 'bearer_token'):
+            print_summary(label.replace('_', ' '), results[label])
+        print(f"\n⚡ bearer p50 {results['bearer_token']['p50_ms']}ms vs "
+              f"session (cold cache) p50 {results['session_cold_cache']['p50_ms']}ms")
+        save_results(os.path.join(ROOT, 'benchmarks', 'bench_auth.json'), results)
+    finally:
+        db.execute_query("DELETE FROM users WHERE id = %s", (user_id,))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Bulk clock-in ingestion benchmark
+Seeds users, then measures AttendanceManager.bulk_clock_in throughput for
+batches of 10k and 100k badge taps (validation, lateness and COPY included).
+Requires a database initialized with init_db.py
+
+Usage: python benchmarks/bench_bulk_clock_in.py [batch sizes...]
+"""
+
+import sys
+import random
+from datetime import datetime, timedelta
+
+import pytz
+
+from bench_utils import timed
+
+from database import db
+from attendance_manager import AttendanceManager
+
+TIMEZONE = pytz.timezone('Africa/Lagos')
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    tag = f"bench-bulk-{int(datetime.now().timestamp())}"
+    
+    rows = db.execute_query("""
+        INSERT INTO users (email, password_hash, role, full_name, matric_number, email_verified)
+        SELECT %s || '-' || g || '@chronotrack.test', 'x', 'student', 'Bench Student',
+               %s || '/' || g, TRUE
+        FROM generate_series(1, %s) g
+        RETURNING id, email, matric_number
+    """, (tag, tag, max(sizes)), fetch=True)
+    print(f"👥 Seeded {len(rows)} users")
+    
+    try:
+        for offset, size in enumerate(sizes, start=1):
+            day = (datetime.now(TIMEZONE) - timedelta(days=offset)).replace(hour=8, minute=0, second=0)
+            records = []
+            for row in random.sample(rows, size):
+                tap = day + timedelta(seconds=random.randint(0, 7200))
+                # Mix identifier kinds the way different terminals send them
+                key = random.choice(('user_id', 'email', 'matric_number'))
+                records.append({key: row['id' if key == 'user_id' else key], 'timestamp': tap.isoformat()})
+            
+            results, elapsed = timed(AttendanceManager.bulk_clock_in, records)
+            created = sum(1 for r in results if r['status'] == 'created')
+            print(f"\n📊 {size} records: {elapsed:.2f}s, {size / elapsed:,.0f} records/sec, {created} created")
+            
+            _, elapsed = timed(AttendanceManager.bulk_clock_in, records)
+            print(f"   Re-upload of the same batch (all duplicates): {elapsed:.2f}s, {size / elapsed:,.0f} records/sec")
+    finally:
+        db.execute_query("DELETE FROM users WHERE email LIKE %s", (tag + '-%',))
+
+
+if __name__ == "__main__":
+    main()
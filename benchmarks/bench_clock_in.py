@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Clock-in latency benchmark
+Compares the old SELECT-then-INSERT clock-in (two pool checkouts, two round
+trips) with the single-statement AttendanceManager.clock_in.
+Requires a database initialized with init_db.py
+
+Usage: python benchmarks/bench_clock_in.py [users]
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+import pytz
+
+from bench_utils import summarize, timed, print_summary
+
+from database import db
+from attendance_manager import AttendanceManager
+
+
+def legacy_clock_in(user_id, now):
+    today_str = now.strftime('%Y-%m-%d')
+    existing = db.execute_one(
+        "SELECT id FROM attendance WHERE user_id = %s AND date = %s", (user_id, today_str)
+    )
+    if existing:
+        return False
+    is_late = now.time() > datetime.strptime("09:00:00", "%H:%M:%S").time()
+    db.execute_query(
+        "INSERT INTO attendance (user_id, date, clock_in_time, is_late) VALUES (%s, %s, %s, %s)",
+        (user_id, today_str, now, is_late)
+    )
+    return True
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    tag = f"bench-clockin-{datetime.now().timestamp()}"
+    rows = db.execute_query("""
+        INSERT INTO users (email, password_hash, role, full_name, email_verified)
+        SELECT %s || '-' || g || '@chronotrack.test', 'x', 'intern', 'Bench User', TRUE
+        FROM generate_series(1, %s) g
+        RETURNING id
+    """, (tag, users), fetch=True)
+    user_ids = [row['id'] for row in rows]
+    
+    # Each variant gets its own day so neither sees the other's rows
+    now = datetime.now(pytz.timezone('Africa/Lagos'))
+    legacy_day, atomic_day = now - timedelta(days=2), now - timedelta(days=1)
+    
+    try:
+        legacy = [timed(legacy_clock_in, uid, legacy_day)[1] for uid in user_ids]
+        print_summary("SELECT + INSERT clock-in", summarize(legacy))
+        
+        atomic = [timed(AttendanceManager.clock_in, uid, atomic_day)[1] for uid in user_ids]
+        print_summary("Single-statement clock-in", summarize(atomic))
+        
+        repeat = [timed(AttendanceManager.clock_in, uid, atomic_day)[1] for uid in user_ids]
+        print_summary("Single-statement repeat clock-in (already present)", summarize(repeat))
+    finally:
+        db.execute_query("DELETE FROM users WHERE id = ANY(%s)", (user_ids,))
+
+
+if __name__ == "__main__":
+    main()
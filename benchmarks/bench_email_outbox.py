@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Email outbox benchmark
+Compares request-path latency of queueing an email against sending it inline,
+then measures how fast the outbox workers drain to a local aiosmtpd sink.
+Requires a database initialized with init_db.py and: pip install aiosmtpd
+
+Usage: python benchmarks/bench_email_outbox.py [messages] [workers]
+"""
+
+import sys
+import time
+import smtplib
+from email.message import EmailMessage
+
+from bench_utils import summarize, timed, print_summary
+
+from aiosmtpd.controller import Controller
+
+from database import db
+from email_outbox import EmailOutboxWorker, enqueue_email
+
+SMTP_HOST, SMTP_PORT = '127.0.0.1', 8026
+
+
+class SinkHandler:
+    def __init__(self):
+        self.count = 0
+    
+    async def handle_DATA(self, server, session, envelope):
+        self.count += 1
+        return '250 OK'
+
+
+def send_inline(index):
+    """What the request thread used to do: a fresh SMTP session per message"""
+    message = EmailMessage()
+    message['Subject'] = 'bench'
+    message['From'] = 'bench@chronotrack.test'
+    message['To'] = f'user{index}@chronotrack.test'
+    message.set_content('<p>bench</p>', subtype='html')
+    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as smtp:
+        smtp.send_message(message)
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    
+    handler = SinkHandler()
+    controller = Controller(handler, hostname=SMTP_HOST, port=SMTP_PORT)
+    controller.start()
+    
+    try:
+        inline = [timed(send_inline, i)[1] for i in range(min(messages, 200))]
+        print_summary("Inline SMTP send (per request)", summarize(inline))
+        
+        enqueue = [
+            timed(enqueue_email, f'user{i}@chronotrack.test', 'bench', '<p>bench</p>',
+                  sender='bench@chronotrack.test')[1]
+            for i in range(messages)
+        ]
+        print_summary("Outbox enqueue (per request)", summarize(enqueue))
+        
+        handler.count = 0
+        worker = EmailOutboxWorker(
+            {'server': SMTP_HOST, 'port': SMTP_PORT, 'use_tls': False},
+            default_sender='bench@chronotrack.test', workers=workers, batch_size=50,
+            poll_interval=0.1
+        )
+        started = time.perf_counter()
+        worker.start()
+        while handler.count < messages:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        worker.stop()
+        
+        print(f"\n📨 Drained {messages} emails with {workers} workers in {elapsed:.2f}s "
+              f"({messages / elapsed:.1f} messages/sec)")
+    finally:
+        controller.stop()
+        db.execute_query("DELETE FROM email_outbox WHERE subject = 'bench'")
+
+
+if __name__ == "__main__":
+    main()
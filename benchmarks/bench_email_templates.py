@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Email template rendering benchmark
+Compares the old per-send render_template_string (parse and compile the
+template on every call) with the precompiled registry in email_templates.py,
+rendering one message at a time and through render_batch. The registry
+numbers include the plain-text alternative the old path never produced.
+Needs no database.
+
+Usage: python benchmarks/bench_email_templates.py [messages]
+"""
+
+import os
+import sys
+import time
+
+from bench_utils import ROOT, save_results
+
+from flask import Flask, render_template_string
+
+from email_templates import email_templates, TEMPLATE_DIR
+
+
+def rate(count, elapsed):
+    return round(count / elapsed, 1) if elapsed else 0.0
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    contexts = [
+        {'full_name': f'Student {i}', 'verification_code': f'{i % 1000000:06d}'}
+        for i in range(messages)
+    ]
+    with open(os.path.join(TEMPLATE_DIR, 'verification.html')) as f:
+        source = f.read()
+
+    app = Flask(__name__)
+    with app.app_context():
+        started = time.perf_counter()
+        for context in contexts:
+            render_template_string(source, **context)
+        before = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for context in contexts:
+        email_templates.render('verification', **context)
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rendered = sum(1 for _ in email_templates.render_batch('verification', contexts))
+    batch = time.perf_counter() - started
+
+    results = {
+        'messages': messages,
+        'render_template_string_per_s': rate(messages, before),
+        'registry_render_per_s': rate(rendered, single),
+        'registry_batch_per_s': rate(rendered, batch),
+    }
+    results['speedup'] = round(results['registry_batch_per_s'] / max(results['render_template_string_per_s'], 1e-9), 1)
+
+    print(f"📊 render_template_string (HTML only): {results['render_template_string_per_s']:>10,.1f} renders/s")
+    print(f"📊 registry render (HTML + text):      {results['registry_render_per_s']:>10,.1f} renders/s")
+    print(f"📊 registry render_batch:              {results['registry_batch_per_s']:>10,.1f} renders/s")
+    print(f"⚡ {results['speedup']}x faster")
+    save_results(os.path.join(ROOT, 'benchmarks', 'bench_email_templates.json'), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Attendance export benchmark
+Seeds a school with attendance rows, then exports it in a fresh subprocess per
+mode so each reports its own peak RSS:
+  stream   - server-side cursor + chunked CSV (attendance_export.py)
+  fetchall - the old execute_query(fetch=True) approach, for comparison
+Requires a database initialized with init_db.py
+
+Usage: python benchmarks/bench_export.py [students] [days]
+"""
+
+import os
+import sys
+import time
+import resource
+import subprocess
+from datetime import date, timedelta
+
+from bench_utils import ROOT
+
+SCHOOL = 'Benchmark Export University'
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, date_from, date_to):
+    from database import db
+    from attendance_export import export_attendance, export_csv
+    
+    started = time.perf_counter()
+    rows = 0
+    with open(os.devnull, 'w') as sink:
+        if mode == 'stream':
+            school_id = db.execute_one("SELECT school_id FROM users WHERE school = %s LIMIT 1", (SCHOOL,))['school_id']
+            chunks, _, close = export_attendance('school', school_id, date_from, date_to, 'csv')
+        else:
+            close = lambda: None
+            records = db.execute_query("""
+                SELECT a.date, u.full_name, u.email, u.matric_number,
+                       a.clock_in_time, a.clock_out_time, a.is_late
+                FROM attendance a JOIN users u ON a.user_id = u.id
+                WHERE u.school = %s AND u.role = 'student' AND a.date BETWEEN %s AND %s
+                ORDER BY a.date, a.clock_in_time
+            """, (SCHOOL, date_from, date_to), fetch=True)
+            chunks = export_csv(records)
+        try:
+            for chunk in chunks:
+                rows += chunk.count('\n')
+                sink.write(chunk)
+        finally:
+            close()
+    elapsed = time.perf_counter() - started
+    rows -= 1  # header
+    print(f"📊 {mode:>8}: {rows:,} rows in {elapsed:.2f}s, {rows / elapsed:,.0f} rows/sec, peak RSS {peak_rss_mb():.1f} MB")
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    
+    from database import db
+    
+    date_to = date.today() - timedelta(days=1)
+    date_from = date_to - timedelta(days=days - 1)
+    
+    users = db.execute_query("""
+        INSERT INTO users (email, password_hash, role, full_name, school, matric_number, email_verified)
+        SELECT 'export-bench-' || g || '@chronotrack.test', 'x', 'student', 'Student ' || g, %s, 'EXP/' || g, TRUE
+        FROM generate_series(1, %s) g
+        RETURNING id
+    """, (SCHOOL, students), fetch=True)
+    user_ids = [u['id'] for u in users]
+    
+    try:
+        db.execute_query("""
+            INSERT INTO attendance (user_id, date, clock_in_time, is_late)
+            SELECT u, d::date, d + TIME '08:30' + (random() * INTERVAL '1 hour'), random() < 0.2
+            FROM unnest(%s::int[]) u, generate_series(%s::date, %s::date, INTERVAL '1 day') d
+        """, (user_ids, date_from, date_to))
+        print(f"🌱 Seeded {students * days:,} attendance rows")
+        
+        for mode in ('stream', 'fetchall'):
+            subprocess.run(
+                [sys.executable, __file__, '--mode', mode, date_from.isoformat(), date_to.isoformat()],
+                cwd=ROOT, check=True
+            )
+    finally:
+        db.execute_query("DELETE FROM users WHERE id = ANY(%s)", (user_ids,))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--mode':
+        run_mode(sys.argv[2], sys.argv[3], sys.argv[4])
+    else:
+        main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Organization key benchmark
+Seeds companies with interns and today's clock-ins, then times the
+supervisor dashboard's present list and the cohort roster filtered the old
+way (free-text users.company, no index) and the new way (users.company_id
+through idx_users_company_name), round-robin across the companies.
+Requires a database initialized with init_db.py
+
+Usage: python benchmarks/bench_organizations.py [companies] [interns_per_company] [queries]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+from bench_utils import ROOT, summarize, print_summary, save_results
+
+from database import db
+from organizations import organizations
+
+QUERIES = {
+    'present_list': """
+        SELECT u.full_name, a.clock_in_time, a.is_late
+        FROM attendance a
+        JOIN users u ON a.user_id = u.id
+        WHERE a.date = %s AND {filter} AND u.role = 'intern'
+        ORDER BY a.clock_in_time
+    """,
+    'roster': """
+        SELECT u.id, u.full_name FROM users u
+        WHERE {filter} AND u.role = 'intern'
+        ORDER BY u.id
+    """,
+}
+
+FILTERS = {
+    'text_key': ("u.company = %s", 'name'),
+    'integer_key': ("u.company_id = %s", 'id'),
+}
+
+
+def main():
+    companies = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per_company = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    queries = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    tag = f"bench-orgs-{int(datetime.now().timestamp())}"
+
+    print(f"🌱 Seeding {companies} companies x {per_company} interns...")
+    users = db.execute_query("""
+        INSERT INTO users (email, password_hash, role, full_name, company, email_verified)
+        SELECT %s || '-' || c || '-' || i || '@chronotrack.test', 'x', 'intern',
+               'Intern ' || i, %s || ' Company ' || c, TRUE
+        FROM generate_series(1, %s) c, generate_series(1, %s) i
+        RETURNING id, company, company_id
+    """, (tag, tag, companies, per_company), fetch=True)
+
+    results = {'companies': companies, 'interns_per_company': per_company, 'queries': queries}
+    try:
+        today = organizations.now(organizations.default).date()
+        # Four in five interns are in today
+        db.execute_query("""
+            INSERT INTO attendance (user_id, date, clock_in_time, is_late)
+            SELECT id, %s, now(), id %% 7 = 0 FROM unnest(%s::int[]) AS id
+            WHERE id %% 5 <> 0
+            ON CONFLICT (user_id, date) DO NOTHING
+        """, (today, [u['id'] for u in users]))
+        db.execute_query("ANALYZE users")
+        db.execute_query("ANALYZE attendance")
+        orgs = sorted({(u['company'], u['company_id']) for u in users})
+
+        for query_name, template in QUERIES.items():
+            for label, (condition, key) in FILTERS.items():
+                query = template.format(filter=condition)
+                latencies = []
+                for i in range(queries):
+                    name, organization_id = orgs[i % len(orgs)]
+                    value = name if key == 'name' else organization_id
+                    params = (today, value) if query_name == 'present_list' else (value,)
+                    started = time.perf_counter()
+                    db.execute_query(query, params, fetch=True)
+                    latencies.append(time.perf_counter() - started)
+                results[f'{query_name}_{label}'] = summarize(latencies)
+                print_summary(f"{query_name.replace('_', ' ')}: {label.replace('_', ' ')}", results[f'{query_name}_{label}'])
+
+        for query_name in QUERIES:
+            before = results[f'{query_name}_text_key']['p50_ms']
+            after = results[f'{query_name}_integer_key']['p50_ms']
+            print(f"\n⚡ {query_name.replace('_', ' ')}: p50 {before}ms -> {after}ms")
+        save_results(os.path.join(ROOT, 'benchmarks', 'bench_organizations.json'), results)
+    finally:
+        db.execute_query("DELETE FROM users WHERE email LIKE %s", (tag + '-%',))
+        db.execute_query("DELETE FROM organizations WHERE name LIKE %s", (tag + ' %',))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Attendance partitioning benchmark
+Builds the same synthetic attendance data twice, once as a plain heap table
+and once partitioned by month like `attendance`, then runs the supervisor
+dashboard's "today" query against both with EXPLAIN ANALYZE to report how
+many partitions were scanned and how long each took.
+Uses its own bench_* tables, so the real attendance data is never touched.
+Requires a database initialized with init_db.py
+
+Usage: python benchmarks/bench_partitioning.py [rows] [--keep]
+"""
+
+import os
+import sys
+import json
+from datetime import date, timedelta
+
+from bench_utils import ROOT, save_results
+
+import psycopg2
+from dotenv import load_dotenv
+
+from partitioning import ensure_partitions
+
+load_dotenv(os.path.join(ROOT, '.env'))
+
+HEAP = 'bench_attendance_heap'
+PARTITIONED = 'bench_attendance_part'
+USERS = 20000
+
+# The supervisor branch of get_dashboard_data, minus the users join so the
+# comparison isolates the attendance scan
+TODAY_QUERY = """
+    SELECT COUNT(*), COUNT(*) FILTER (WHERE is_late)
+    FROM {table}
+    WHERE date = %s
+"""
+
+
+def build_tables(cursor, rows):
+    days = max(1, rows // USERS)
+    first_day = date.today() - timedelta(days=days - 1)
+
+    for table in (HEAP, PARTITIONED):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    # Same columns as attendance, minus the users foreign key so seeding needs no users
+    for table, partitioning in ((HEAP, ''), (PARTITIONED, 'PARTITION BY RANGE (date)')):
+        cursor.execute(f"""
+            CREATE TABLE {table} (
+                id SERIAL,
+                user_id INTEGER,
+                date DATE NOT NULL,
+                clock_in_time TIMESTAMP NOT NULL,
+                clock_out_time TIMESTAMP,
+                is_late BOOLEAN DEFAULT FALSE,
+                notes TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, date)
+            ) {partitioning}
+        """)
+    ensure_partitions(cursor, PARTITIONED, first_day, months_ahead=0)
+
+    print(f"🌱 Seeding {USERS:,} users x {days:,} days = {USERS * days:,} rows per table...")
+    cursor.execute(f"""
+        INSERT INTO {HEAP} (user_id, date, clock_in_time, is_late)
+        SELECT u, d::date, d + TIME '08:30' + (random() * INTERVAL '1 hour'), random() < 0.2
+        FROM generate_series(%s::date, %s::date, INTERVAL '1 day') d, generate_series(1, %s) u
+    """, (first_day, date.today(), USERS))
+    cursor.execute(f"""
+        INSERT INTO {PARTITIONED} (user_id, date, clock_in_time, is_late)
+        SELECT user_id, date, clock_in_time, is_late FROM {HEAP}
+    """)
+    for table in (HEAP, PARTITIONED):
+        cursor.execute(f"CREATE INDEX ON {table}(date)")
+        cursor.execute(f"ANALYZE {table}")
+    return days
+
+
+def count_scans(plan):
+    """Relation scans in a JSON plan node tree; each one is a partition that was not pruned"""
+    scans = 1 if 'Relation Name' in plan else 0
+    for child in plan.get('Plans', []):
+        scans += count_scans(child)
+    return scans
+
+
+def explain(cursor, table, runs=5):
+    """Best of ``runs`` EXPLAIN ANALYZE executions of the today query"""
+    best = None
+    for _ in range(runs):
+        cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + TODAY_QUERY.format(table=table), (date.today(),))
+        result = cursor.fetchone()[0]
+        result = json.loads(result) if isinstance(result, str) else result
+        if best is None or result[0]['Execution Time'] < best[0]['Execution Time']:
+            best = result
+    return {
+        'scanned_relations': count_scans(best[0]['Plan']),
+        'execution_ms': round(best[0]['Execution Time'], 3),
+        'planning_ms': round(best[0]['Planning Time'], 3),
+    }
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    rows = int(args[0]) if args else 50_000_000
+    keep = '--keep' in sys.argv
+
+    conn = psycopg2.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        database=os.getenv('DB_NAME', 'attendance_db'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'password'),
+        port=os.getenv('DB_PORT', '5432')
+    )
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        days = build_tables(cursor, rows)
+        cursor.execute(f"SELECT COUNT(*) FROM pg_inherits WHERE inhparent = '{PARTITIONED}'::regclass")
+        partitions = cursor.fetchone()[0]
+
+        results = {'rows': USERS * days, 'days': days, 'partitions': partitions}
+        for label, table in (('heap', HEAP), ('partitioned', PARTITIONED)):
+            results[label] = explain(cursor, table)
+            print(f"📊 {label:>11}: {results[label]['scanned_relations']} relation(s) scanned, "
+                  f"{results[label]['execution_ms']} ms execution, {results[label]['planning_ms']} ms planning")
+
+        if results['partitioned']['scanned_relations'] != 1:
+            print("❌ Today's query did not prune to a single partition")
+        else:
+            print(f"✅ Today's query pruned to 1 of {partitions} partitions")
+        save_results(os.path.join(ROOT, 'benchmarks', 'bench_partitioning.json'), results)
+    finally:
+        if not keep:
+            for table in (HEAP, PARTITIONED):
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Password hashing benchmark
+Simulates a login storm: request threads verify bcrypt hashes either inline
+(the old AuthUtils behaviour) or through the PasswordHasher worker pool,
+while a probe thread measures how long a cheap non-login request waits.
+No database is needed.
+
+Usage: python benchmarks/bench_password_hashing.py [logins] [request_threads] [rounds]
+"""
+
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from bench_utils import summarize, print_summary
+
+from password_hashing import PasswordHasher
+
+
+def cheap_request():
+    """Stand-in for a cached dashboard poll: a little pure Python work"""
+    return sum(i * i for i in range(2000))
+
+
+def run_storm(label, verify, hashed, logins, request_threads):
+    stop = threading.Event()
+    probe_latencies = []
+    
+    def probe():
+        while not stop.is_set():
+            started = time.perf_counter()
+            cheap_request()
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+    
+    probe_thread = threading.Thread(target=probe)
+    probe_thread.start()
+    
+    login_latencies = []
+    
+    def login(_):
+        started = time.perf_counter()
+        assert verify('correct horse', hashed)
+        login_latencies.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=request_threads) as pool:
+        list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    
+    stop.set()
+    probe_thread.join()
+    
+    cores = os.cpu_count() or 1
+    summary = summarize(login_latencies, elapsed)
+    summary['logins_per_s_per_core'] = round(summary['ops_per_s'] / cores, 2)
+    print_summary(f"{label}: logins", summary)
+    print_summary(f"{label}: concurrent cheap requests", summarize(probe_latencies))
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    request_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 12
+    
+    hashed = bcrypt.hashpw(b'correct horse', bcrypt.gensalt(rounds)).decode('utf-8')
+    print(f"🔐 {logins} logins, {request_threads} request threads, cost {rounds}, {os.cpu_count()} cores")
+    
+    def inline_verify(password, stored):
+        return bcrypt.checkpw(password.encode('utf-8'), stored.encode('utf-8'))
+    
+    run_storm("Inline bcrypt", inline_verify, hashed, logins, request_threads)
+    
+    for kind in ('thread', 'process'):
+        hasher = PasswordHasher(kind=kind, rounds=rounds)
+        hasher.verify('warm up', hashed)
+        run_storm(f"{kind.title()} pool", hasher.verify, hashed, logins, request_threads)
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
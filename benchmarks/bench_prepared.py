@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Prepared statement benchmark
+Runs the registered hot queries (user lookup by id and email, the dashboard
+summary and present list, the clock-in upsert) through db.execute_one /
+execute_query as plain SQL text and through db.execute_prepared_one /
+execute_prepared by name, and reports per-query latency for both.
+Requires a database initialized with init_db.py
+
+Usage: python benchmarks/bench_prepared.py [iterations]
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytz
+
+from bench_utils import ROOT, summarize, timed, print_summary, save_results
+
+from database import db
+from auth_utils import USER_BY_ID, USER_BY_EMAIL
+from attendance_manager import AttendanceManager, CLOCK_IN, DAILY_SUMMARY, PRESENT_LISTS
+
+
+def run_text(name, params, fetch):
+    query = db.statements[name].query
+    if fetch:
+        return db.execute_query(query, params, fetch=True)
+    return db.execute_one(query, params)
+
+
+def run_prepared(name, params, fetch):
+    if fetch:
+        return db.execute_prepared(name, params, fetch=True)
+    return db.execute_prepared_one(name, params)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tag = f"bench-prepared-{datetime.now().timestamp()}"
+    company = f"Bench Prepared {tag}"
+    rows = db.execute_query("""
+        INSERT INTO users (email, password_hash, role, full_name, company, email_verified)
+        SELECT %s || '-' || g || '@chronotrack.test', 'x', 'intern', 'Bench User ' || g, %s, TRUE
+        FROM generate_series(1, 50) g
+        RETURNING id, email, company_id
+    """, (tag, company), fetch=True)
+    user_ids = [row['id'] for row in rows]
+    company_id = rows[0]['company_id']
+
+    now = datetime.now(pytz.timezone('Africa/Lagos'))
+    day = (now - timedelta(days=1)).date()
+    for user_id in user_ids:
+        AttendanceManager.clock_in(user_id, now - timedelta(days=1))
+
+    # The clock-in case repeats an existing clock-in, so every run does the same work
+    cases = [
+        ('user by id', USER_BY_ID, (user_ids[0],), False),
+        ('user by email', USER_BY_EMAIL, (rows[0]['email'],), False),
+        ('daily summary', DAILY_SUMMARY, (day, company_id), False),
+        ('present list', PRESENT_LISTS['company'], (day, company_id), True),
+        ('clock-in (repeat)', CLOCK_IN, {
+            'user_id': user_ids[0], 'date': day,
+            'clock_in_time': now - timedelta(days=1), 'is_late': False,
+        }, False),
+    ]
+
+    results = {'iterations': iterations}
+    try:
+        for label, name, params, fetch in cases:
+            # Warm up: the first prepared call on each pooled connection prepares it
+            for _ in range(50):
+                run_text(name, params, fetch)
+                run_prepared(name, params, fetch)
+
+            text = [timed(run_text, name, params, fetch)[1] for _ in range(iterations)]
+            prepared = [timed(run_prepared, name, params, fetch)[1] for _ in range(iterations)]
+            results[label] = {'text': summarize(text), 'prepared': summarize(prepared)}
+            print_summary(f"{label}: SQL text", results[label]['text'])
+            print_summary(f"{label}: prepared", results[label]['prepared'])
+
+            speedup = results[label]['text']['mean_ms'] / max(results[label]['prepared']['mean_ms'], 1e-9)
+            results[label]['speedup'] = round(speedup, 2)
+            print(f"   ⚡ {label}: {speedup:.2f}x")
+
+        save_results(os.path.join(ROOT, 'benchmarks', 'bench_prepared.json'), results)
+    finally:
+        db.execute_query("DELETE FROM users WHERE id = ANY(%s)", (user_ids,))
+        db.execute_query("DELETE FROM organizations WHERE id = %s", (company_id,))
+
+
+if __name__ == "__main__":
+    main()
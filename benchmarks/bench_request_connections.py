@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Per-request connection benchmark
+Replays supervisor and intern API requests through the Flask test client
+and counts primary pool checkouts and queries per request, first with every
+helper call taking its own connection (DB_BIND_REQUESTS=False behaviour),
+then with one connection bound to the request (db.init_app).
+Requires a database initialized with init_db.py
+
+Usage: python benchmarks/bench_request_connections.py [requests_per_route] [interns]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+from bench_utils import ROOT, summarize, print_summary, save_results
+
+from database import db
+from user_cache import invalidate_user
+import app as app_module
+
+ROUTES = {
+    'dashboard': ('supervisor', '/api/dashboard_data'),
+    'absentees': ('supervisor', '/api/attendance/absent'),
+    'history': ('intern', '/api/attendance/history'),
+    'session_data': ('intern', '/api/session_data'),
+}
+
+
+def run(client, path, headers, requests):
+    queries = []
+    hook = lambda query, seconds, rows, error: queries.append(query)
+    db.add_query_hook(hook)
+    latencies = []
+    checkouts = db.pool_stats()['checkouts']
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, (path, response.status_code)
+    finally:
+        db.query_hooks.remove(hook)
+    summary = summarize(latencies)
+    summary['checkouts_per_request'] = round((db.pool_stats()['checkouts'] - checkouts) / requests, 2)
+    summary['queries_per_request'] = round(len(queries) / requests, 2)
+    return summary
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    interns = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    tag = f"bench-conn-{int(datetime.now().timestamp())}"
+    company = f"{tag} Company"
+
+    users = db.execute_query("""
+        INSERT INTO users (email, password_hash, role, full_name, company, email_verified)
+        SELECT %s || '-' || g || '@chronotrack.test', 'x',
+               CASE WHEN g = 0 THEN 'supervisor' ELSE 'intern' END, 'Bench User ' || g, %s, TRUE
+        FROM generate_series(0, %s) g
+        RETURNING id, role
+    """, (tag, company, interns), fetch=True)
+    user_ids = [u['id'] for u in users]
+
+    try:
+        db.execute_query("""
+            INSERT INTO attendance (user_id, date, clock_in_time, is_late)
+            SELECT id, CURRENT_DATE - d, (CURRENT_DATE - d) + TIME '08:45', FALSE
+            FROM unnest(%s::int[]) AS id, generate_series(0, 30) d
+            WHERE id %% 4 <> 0
+        """, (user_ids,))
+        tokens = {}
+        for role in ('supervisor', 'intern'):
+            user_id = next(u['id'] for u in users if u['role'] == role)
+            invalidate_user(user_id)
+            user = app_module.UserManager.get_user_by_id(user_id)
+            tokens[role] = {'Authorization': f"Bearer {app_module.token_auth.issue(user)['access_token']}"}
+
+        client = app_module.app.test_client()
+        results = {'requests_per_route': requests, 'interns': interns}
+        bind_requests = db.bind_requests
+        try:
+            for label, bind in (('per_call', False), ('per_request', True)):
+                db.bind_requests = bind
+                for route, (role, path) in ROUTES.items():
+                    results[f'{route}_{label}'] = run(client, path, tokens[role], requests)
+        finally:
+            db.bind_requests = bind_requests
+
+        for route in ROUTES:
+            for label in ('per_call', 'per_request'):
+                print_summary(f"{route}: {label.replace('_', ' ')}", results[f'{route}_{label}'])
+        for route in ROUTES:
+            before, after = results[f'{route}_per_call'], results[f'{route}_per_request']
+            print(f"\n🔌 {route}: {before['checkouts_per_request']} -> {after['checkouts_per_request']} checkouts "
+                  f"per request ({after['queries_per_request']} queries), p50 {before['p50_ms']}ms -> {after['p50_ms']}ms")
+        save_results(os.path.join(ROOT, 'benchmarks', 'bench_request_connections.json'), results)
+    finally:
+        db.execute_query("DELETE FROM users WHERE id = ANY(%s)", (user_ids,))
+        db.execute_query("DELETE FROM organizations WHERE name = %s", (company,))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Roster import benchmark
+Imports a generated school roster with roster_import.import_roster (dedupe
+query, COPY, batched invitations) and compares it with registering a sample
+of the same students one at a time through UserManager.create_user plus a
+verification email, extrapolated to the full roster.
+Requires a database initialized with init_db.py
+
+Usage: python benchmarks/bench_roster_import.py [rows] [sample]
+"""
+
+import io
+import os
+import sys
+import time
+from datetime import datetime
+
+from bench_utils import ROOT, save_results
+
+from flask import Flask
+
+from database import db
+from auth_utils import UserManager
+from email_service import EmailService
+from roster_import import read_roster, import_roster
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sample = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    tag = f"bench-roster-{datetime.now().timestamp()}"
+    school = f"Bench Roster School {tag}"
+
+    roster = io.StringIO()
+    roster.write("email,full_name,matric_number,programme,level\n")
+    for i in range(rows):
+        roster.write(f"{tag}-{i}@chronotrack.test,Student {i},MAT{i:06d},Computer Science,300\n")
+    roster.seek(0)
+    emails = [f"{tag}-{i}@chronotrack.test" for i in range(rows)] + [f"{tag}-one-{i}@chronotrack.test" for i in range(sample)]
+
+    app = Flask(__name__)
+    app.config['MAIL_USERNAME'] = None
+    try:
+        # One at a time: bcrypt, INSERT and a queued email per student
+        with app.app_context():
+            started = time.perf_counter()
+            for i in range(sample):
+                email = f"{tag}-one-{i}@chronotrack.test"
+                _, code = UserManager.create_user(email, 'initial-password', 'student', f'Student {i}', school=school)
+                EmailService.send_verification_email(email, f'Student {i}', code)
+            one_by_one = time.perf_counter() - started
+
+        def progress(stage, done, total):
+            print(f"\r{stage:>10}: {done:,}/{total:,}", end='\n' if stage == 'done' else '', flush=True)
+
+        started = time.perf_counter()
+        summary = import_roster(read_roster(roster, 'roster.csv'), 'school', school, 'http://localhost:5001',
+                                progress=progress)
+        bulk = time.perf_counter() - started
+
+        results = {
+            'rows': rows,
+            'created': summary['created'],
+            'bulk_seconds': round(bulk, 3),
+            'bulk_rows_per_s': round(rows / bulk, 1),
+            'one_by_one_rows_per_s': round(sample / one_by_one, 1),
+            'one_by_one_extrapolated_seconds': round(one_by_one / sample * rows, 1),
+        }
+        print(f"📊 Roster import: {rows:,} students in {results['bulk_seconds']}s "
+              f"({results['bulk_rows_per_s']:,} rows/s)")
+        print(f"📊 One at a time: {results['one_by_one_rows_per_s']} rows/s, "
+              f"~{results['one_by_one_extrapolated_seconds']:,}s for the same roster")
+        save_results(os.path.join(ROOT, 'benchmarks', 'bench_roster_import.json'), results)
+    finally:
+        db.execute_query("DELETE FROM email_outbox WHERE recipient = ANY(%s)", (emails,))
+        db.execute_query("DELETE FROM users WHERE email = ANY(%s)", (emails,))
+        db.execute_query("DELETE FROM organizations WHERE org_type = 'school' AND name = %s", (school,))
+
+
+if __name__ == "__main__":
+    main()
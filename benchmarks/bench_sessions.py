@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Session store benchmark
+Creates sessions in user_sessions and times session checks through
+session_store.load: cache hits, cache misses (a row lookup every time) and,
+for reference, decoding Flask's old signed-cookie session. Then replays a
+morning of requests with expiry extensions due and counts the UPDATE
+statements the batched flush needs, against one write per request without
+batching.
+Requires a database initialized with init_db.py
+
+Usage: python benchmarks/bench_sessions.py [sessions] [checks]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+from bench_utils import ROOT, summarize, print_summary, save_results
+
+from flask import Flask
+from flask.sessions import SecureCookieSessionInterface
+
+from database import db
+from auth_utils import UserManager
+from session_store import SessionStore
+
+
+def time_checks(check, tokens, checks):
+    latencies = []
+    for i in range(checks):
+        token = tokens[i % len(tokens)]
+        started = time.perf_counter()
+        assert check(token) is not None
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    checks = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    email = f"bench-sessions-{datetime.now().timestamp()}@chronotrack.test"
+    user_id, _ = UserManager.create_user(email, 'bench-password', 'intern', 'Bench Intern', company='Bench Sessions Co')
+
+    try:
+        store = SessionStore(cache_size=sessions * 2)
+        tokens = [store.create({'user_id': user_id}) for _ in range(sessions)]
+        results = {'sessions': sessions, 'checks': checks}
+
+        results['cache_hit'] = time_checks(store.load, tokens, checks)
+
+        uncached = SessionStore(cache_size=0)
+        results['cache_miss'] = time_checks(uncached.load, tokens, min(checks, 2000))
+
+        app = Flask(__name__)
+        app.secret_key = 'bench'
+        serializer = SecureCookieSessionInterface().get_signing_serializer(app)
+        cookies = [serializer.dumps({'user_id': user_id}) for _ in range(sessions)]
+        results['signed_cookie'] = time_checks(serializer.loads, cookies, checks)
+
+        # Every session is due an extension: with batching they become one UPDATE
+        store.touch_interval = 0
+        queries = []
+        hook = lambda query, seconds, rows, error: queries.append(query)
+        db.add_query_hook(hook)
+        try:
+            for token in tokens:
+                store.load(token)
+            started = time.perf_counter()
+            flushed = store.flush()
+            results['flush'] = {
+                'extensions': flushed,
+                'statements': len(queries),
+                'unbatched_statements': sessions,
+                'seconds': round(time.perf_counter() - started, 4),
+            }
+        finally:
+            db.query_hooks.remove(hook)
+
+        for label in ('cache_hit', 'cache_miss', 'signed_cookie'):
+            print_summary(f"session check: {label.replace('_', ' ')}", results[label])
+        print(f"\n📊 Sliding expiry: {results['flush']['extensions']} extensions written in "
+              f"{results['flush']['statements']} statement(s) ({results['flush']['seconds']}s)")
+        save_results(os.path.join(ROOT, 'benchmarks', 'bench_sessions.json'), results)
+    finally:
+        db.execute_query("DELETE FROM users WHERE id = %s", (user_id,))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark
+Imports database, auth_utils and app in fresh interpreters with DB_HOST
+pointing at a port nothing listens on, and times each import. Checks that
+no pool was created (imports need no database) and lists the slowest
+modules from `python -X importtime` for app.
+Needs no database.
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+from bench_utils import ROOT, summarize, print_summary, save_results
+
+MODULES = ['database', 'auth_utils', 'app']
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+from database import db
+print(json.dumps({{'seconds': elapsed, 'pool_created': db._pid is not None}}))
+"""
+
+
+def no_database_env():
+    env = dict(os.environ)
+    env.update({'DB_HOST': '127.0.0.1', 'DB_PORT': '9', 'DB_REPLICAS': '', 'PYTHONPATH': ROOT})
+    return env
+
+
+def import_once(module):
+    output = subprocess.run([sys.executable, '-c', PROBE.format(module=module)], cwd=ROOT, env=no_database_env(),
+                            capture_output=True, text=True, timeout=120, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(module, count=10):
+    """(cumulative ms, module) of the slowest modules ``module`` imports directly, under -X importtime"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT,
+                            env=no_database_env(), capture_output=True, text=True, timeout=120, check=True).stderr
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # nesting is shown as indentation
+        if depth == 1:
+            timings.append((int(cumulative) / 1000, name.strip()))
+    return sorted(timings, reverse=True)[:count]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    results = {'runs': runs}
+
+    for module in MODULES:
+        probes = [import_once(module) for _ in range(runs)]
+        if any(p['pool_created'] for p in probes):
+            print(f"❌ importing {module} created a connection pool")
+        results[module] = summarize([p['seconds'] for p in probes])
+        results[module]['pool_created'] = any(p['pool_created'] for p in probes)
+        print_summary(f"import {module} (no database)", results[module])
+
+    results['slowest_app_imports'] = [{'module': name, 'cumulative_ms': ms} for ms, name in slowest_imports('app')]
+    print("\n🐢 Slowest imports under app:")
+    for entry in results['slowest_app_imports']:
+        print(f"   {entry['cumulative_ms']:8.1f}ms  {entry['module']}")
+    save_results(os.path.join(ROOT, 'benchmarks', 'bench_startup.json'), results)
+
+
+if __name__ == "__main__":
+    main()
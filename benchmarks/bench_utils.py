@@ -0,0 +1,60 @@
+"""
+Shared helpers for the ChronoTrack benchmark scripts
+Importing this module puts the repository root on sys.path so benchmarks
+can import the application modules when run as `python benchmarks/<name>.py`.
+"""
+
+import os
+import sys
+import json
+import time
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed=None):
+    """Throughput and latency summary for a list of per-operation durations in seconds"""
+    count = len(latencies)
+    elapsed = elapsed if elapsed is not None else sum(latencies)
+    return {
+        'count': count,
+        'elapsed_s': round(elapsed, 4),
+        'ops_per_s': round(count / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+def timed(fn, *args, **kwargs):
+    """Call fn and return (result, seconds)"""
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def print_summary(title, summary):
+    print(f"\n📊 {title}")
+    for key, value in summary.items():
+        print(f"   {key:>12}: {value}")
+
+
+def save_results(path, results):
+    """Write benchmark results as JSON so runs can be compared across commits"""
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"\n💾 Results saved to {path}")
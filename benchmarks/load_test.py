@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Morning clock-in storm load test
+Seeds N interns and students across M companies and M schools (plus one
+supervisor or lecturer each), serves app.py in-process on a local port and
+drives the morning mix against it over HTTP:
+
+  login      every seeded user logs in at once
+  clock_in   the same sessions clock in, with the app's clock starting at 08:59
+  polling    supervisors and lecturers poll /api/dashboard_data like the browser
+             (If-None-Match), while the clock-ins land
+  register   new accounts register; verification emails go through the
+             outbox to a stub SMTP server on localhost
+
+Reports throughput, p50/p95/p99 latency and error rates per scenario and
+saves them as JSON (with the git commit) so runs can be compared across
+commits. Everything random is drawn from --seed, so the same arguments
+replay the same role and organization assignment and request order.
+Requires a database initialized with init_db.py
+
+Usage: python benchmarks/load_test.py [--users 2000] [--orgs 20] [--concurrency 50] [--seed 1]
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+import socketserver
+import http.client
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_utils import ROOT, summarize, print_summary, save_results
+
+SMTP_HOST, SMTP_PORT = '127.0.0.1', 8026
+
+# Point the in-app outbox workers at the stub before app.py reads its config
+os.environ.update({
+    'MAIL_SERVER': SMTP_HOST,
+    'MAIL_PORT': str(SMTP_PORT),
+    'MAIL_USE_TLS': 'False',
+    'MAIL_USERNAME': '',
+    'MAIL_PASSWORD': '',
+    'EMAIL_OUTBOX_IN_APP': 'True',
+})
+
+PASSWORD = 'load-test-password'
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    """Accepts any message, just enough SMTP for smtplib"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 stub ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in (b'EHLO', b'HELO'):
+                self.reply('250 stub')
+            elif command == b'DATA':
+                self.reply('354 end with .')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.server.delivered += 1
+                self.reply('250 OK')
+            elif command == b'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    delivered = 0
+
+
+class StormClock(datetime):
+    """The app's clock during the run: 08:59 today, advancing in real time"""
+
+    started = None
+    start_at = None
+
+    @classmethod
+    def now(cls, tz=None):
+        elapsed = timedelta(seconds=time.monotonic() - cls.started)
+        return (cls.start_at + elapsed).astimezone(tz) if tz else cls.start_at + elapsed
+
+
+class Client:
+    """One browser: its session cookie and last dashboard ETag.
+
+    Each request uses a fresh connection with Connection: close, since the
+    threaded dev server would otherwise park a thread on every idle
+    keep-alive connection.
+    """
+
+    def __init__(self, port):
+        self.port = port
+        self.cookie = None
+        self.etag = None
+
+    def request(self, method, path, body=None, conditional=False):
+        headers = {'Connection': 'close'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        if conditional and self.etag:
+            headers['If-None-Match'] = self.etag
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            return 0
+        finally:
+            conn.close()
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        if conditional and response.getheader('ETag'):
+            self.etag = response.getheader('ETag')
+        return response.status
+
+
+class Scenario:
+    """Latencies and status codes of one request mix"""
+
+    def __init__(self, name, ok_statuses=(200,)):
+        self.name = name
+        self.ok_statuses = ok_statuses
+        self.latencies = []
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def call(self, client, method, path, body=None, conditional=False):
+        started = time.perf_counter()
+        status = client.request(method, path, body, conditional)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies.append(elapsed)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        return status
+
+    def run(self, concurrency, jobs):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda job: job(), jobs))
+        elapsed = time.perf_counter() - started
+        errors = sum(count for status, count in self.statuses.items() if status not in self.ok_statuses)
+        result = summarize(self.latencies, elapsed)
+        result['errors'] = errors
+        result['error_rate'] = round(errors / len(self.latencies), 4) if self.latencies else 0.0
+        result['statuses'] = {str(status): count for status, count in sorted(self.statuses.items())}
+        print_summary(self.name, result)
+        return result
+
+
+def seed(db, rng, users, orgs, tag):
+    """Insert members, supervisors and lecturers sharing one bcrypt hash"""
+    from auth_utils import AuthUtils
+
+    password_hash = AuthUtils.hash_password(PASSWORD)
+    companies = [f"Load Co {tag} {i}" for i in range(orgs)]
+    schools = [f"Load School {tag} {i}" for i in range(orgs)]
+    rows = []
+    for i in range(users):
+        if rng.random() < 0.5:
+            rows.append((f"{tag}-intern-{i}@chronotrack.test", 'intern', rng.choice(companies), None))
+        else:
+            rows.append((f"{tag}-student-{i}@chronotrack.test", 'student', None, rng.choice(schools)))
+    managers = [(f"{tag}-sup-{i}@chronotrack.test", 'supervisor', c, None) for i, c in enumerate(companies)]
+    managers += [(f"{tag}-lec-{i}@chronotrack.test", 'lecturer', None, s) for i, s in enumerate(schools)]
+
+    db.execute_query("""
+        INSERT INTO users (email, password_hash, role, full_name, company, school, email_verified)
+        SELECT email, %s, role, 'Load ' || role, company, school, TRUE
+        FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[]) AS t(email, role, company, school)
+    """, (password_hash, *[list(column) for column in zip(*(rows + managers))]))
+    return [row[0] for row in rows], [row[0] for row in managers]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Morning clock-in storm load test")
+    parser.add_argument('--users', type=int, default=2000, help="interns and students to seed")
+    parser.add_argument('--orgs', type=int, default=20, help="companies, and as many schools")
+    parser.add_argument('--concurrency', type=int, default=50, help="simultaneous clients")
+    parser.add_argument('--polls', type=int, default=20, help="dashboard polls per supervisor or lecturer")
+    parser.add_argument('--registrations', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'load_test.json'))
+    args = parser.parse_args()
+
+    smtp = StubSMTPServer((SMTP_HOST, SMTP_PORT), StubSMTPHandler)
+    threading.Thread(target=smtp.serve_forever, daemon=True).start()
+
+    from werkzeug.serving import make_server
+    import app as app_module
+    import organizations as organizations_module
+    from database import db
+    app_module.start_background_services()  # the outbox workers deliver to the stub SMTP server
+
+    rng = random.Random(args.seed)
+    tag = f"load{args.seed}-{int(time.time())}"
+    print(f"🌱 Seeding {args.users:,} users across {args.orgs} companies and {args.orgs} schools...")
+    members, managers = seed(db, rng, args.users, args.orgs, tag)
+    registered = [f"{tag}-new-{i}@chronotrack.test" for i in range(args.registrations)]
+
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+
+    results = {
+        'commit': git_commit(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'args': vars(args),
+    }
+    original_datetime = app_module.datetime
+    try:
+        member_clients = {email: Client(port) for email in members}
+        manager_clients = {email: Client(port) for email in managers}
+        order = list(member_clients)
+        rng.shuffle(order)
+
+        login = Scenario('login burst')
+        results['login'] = login.run(args.concurrency, [
+            (lambda e=email: login.call(member_clients[e], 'POST', '/api/login', {'email': e, 'password': PASSWORD}))
+            for email in order
+        ])
+        for email, client in manager_clients.items():
+            client.request('POST', '/api/login', {'email': email, 'password': PASSWORD})
+
+        # The app sees 08:59 today from here on, so the burst crosses the late cutoff
+        StormClock.start_at = original_datetime.now(organizations_module.organizations.default['timezone']).replace(hour=8, minute=59, second=0, microsecond=0)
+        StormClock.started = time.monotonic()
+        app_module.datetime = organizations_module.datetime = StormClock
+
+        clock_in = Scenario('clock-in burst at 08:59')
+        polling = Scenario('supervisor polling', ok_statuses=(200, 304))
+        poll_jobs = [
+            (lambda c=client: polling.call(c, 'GET', '/api/dashboard_data', conditional=True))
+            for client in manager_clients.values() for _ in range(args.polls)
+        ]
+        rng.shuffle(poll_jobs)
+        poller = threading.Thread(target=lambda: results.__setitem__(
+            'polling', polling.run(max(1, args.concurrency // 5), poll_jobs)))
+        poller.start()
+        results['clock_in'] = clock_in.run(args.concurrency, [
+            (lambda e=email: clock_in.call(member_clients[e], 'POST', '/api/clock_in'))
+            for email in order
+        ])
+        poller.join()
+        app_module.datetime = organizations_module.datetime = original_datetime
+
+        register = Scenario('registrations', ok_statuses=(201,))
+        results['register'] = register.run(args.concurrency, [
+            (lambda e=email: register.call(Client(port), 'POST', '/api/register', {
+                'email': e, 'password': PASSWORD, 'role': 'intern',
+                'fullName': 'Load Registrant', 'company': f"Load Co {tag} 0",
+            }))
+            for email in registered
+        ])
+
+        # Give the outbox workers a moment to hand verification emails to the stub
+        deadline = time.monotonic() + 30
+        while smtp.delivered < args.registrations and time.monotonic() < deadline:
+            time.sleep(0.2)
+        results['emails_delivered'] = smtp.delivered
+        print(f"\n📧 {smtp.delivered}/{args.registrations} verification emails reached the stub SMTP server")
+
+        save_results(args.output, results)
+    finally:
+        app_module.datetime = organizations_module.datetime = original_datetime
+        server.shutdown()
+        smtp.shutdown()
+        emails = members + managers + registered
+        db.execute_query("DELETE FROM email_outbox WHERE recipient = ANY(%s)", (emails,))
+        db.execute_query("DELETE FROM users WHERE email = ANY(%s)", (emails,))
+        db.execute_query("DELETE FROM organizations WHERE name LIKE %s", (f"Load % {tag} %",))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import time
+import threading
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError
+
+
+class PoolExhaustedError(PoolError):
+    """Raised when no connection became free within the checkout timeout"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConnectionPool:
+    """Thread-safe PostgreSQL connection pool.
+
+    Checkouts block for at most ``timeout`` seconds and then fail fast with
+    PoolExhaustedError. Idle connections are health checked when they are
+    handed out and connections older than ``max_age`` seconds are recycled.
+    Connections are opened in autocommit mode so single statement helpers
+    cost one round trip and never leave a transaction open.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=5.0, max_age=1800, ping_after=30,
+                 retry_after=1, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_age = max_age
+        self.ping_after = ping_after
+        self.retry_after = retry_after
+        self.connect_kwargs = connect_kwargs
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._idle = []        # LIFO stack of (conn, returned_at) so hot connections stay warm
+        self._in_use = {}      # id(conn) -> conn
+        self._created_at = {}  # id(conn) -> monotonic creation time
+        self._opening = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+
+        for _ in range(minconn):
+            conn = self._connect()
+            self._idle.append((conn, time.monotonic()))
+
+    def _connect(self):
+        """Open a new connection and register its creation time"""
+        conn = psycopg2.connect(**self.connect_kwargs)
+        conn.autocommit = True
+        with self._lock:
+            self._created_at[id(conn)] = time.monotonic()
+            self._created += 1
+        return conn
+
+    def _expired(self, conn, now):
+        created = self._created_at.get(id(conn))
+        return self.max_age and created is not None and now - created > self.max_age
+
+    def _healthy(self, conn, returned_at, now):
+        """Cheap liveness check, only pinging connections that sat idle for a while"""
+        if conn.closed:
+            return False
+        if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if self.ping_after is not None and now - returned_at > self.ping_after:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _discard(self, conn, recycled=False):
+        """Forget and close a connection that will not be reused"""
+        with self._available:
+            self._created_at.pop(id(conn), None)
+            if recycled:
+                self._recycled += 1
+            else:
+                self._discarded += 1
+            self._available.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def getconn(self, timeout=None):
+        """Check a healthy connection out of the pool, waiting at most ``timeout`` seconds"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            conn = None
+            with self._available:
+                while True:
+                    if self._closed:
+                        raise PoolError("connection pool is closed")
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if len(self._in_use) + self._opening < self.maxconn:
+                        self._opening += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolExhaustedError(
+                            f"no database connection available after {timeout:.1f}s",
+                            retry_after=self.retry_after
+                        )
+                    waited = True
+                    self._available.wait(remaining)
+
+            now = time.monotonic()
+            if conn is None:
+                try:
+                    conn = self._connect()
+                finally:
+                    with self._available:
+                        self._opening -= 1
+                        if conn is None:
+                            self._available.notify()
+            elif self._expired(conn, now):
+                self._discard(conn, recycled=True)
+                continue
+            elif not self._healthy(conn, returned_at, now):
+                self._discard(conn)
+                continue
+
+            waited_for = time.monotonic() - started
+            with self._available:
+                self._in_use[id(conn)] = conn
+                self._checkouts += 1
+                if waited:
+                    self._waits += 1
+                    self._wait_time_total += waited_for
+                    self._wait_time_max = max(self._wait_time_max, waited_for)
+            return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool, rolling back any transaction left open"""
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+            if not close and not conn.autocommit:
+                # Callers may switch autocommit off for a multi-statement transaction
+                conn.autocommit = True
+
+        with self._available:
+            self._in_use.pop(id(conn), None)
+            recycled = self._expired(conn, time.monotonic())
+            if not (close or conn.closed or recycled or self._closed):
+                self._idle.append((conn, time.monotonic()))
+                self._available.notify()
+                return
+        self._discard(conn, recycled=recycled and not close)
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Snapshot of pool usage counters"""
+        with self._lock:
+            return {
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'opening': self._opening,
+                'max': self.maxconn,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time_total, 6),
+                'wait_time_max': round(self._wait_time_max, 6),
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'recycled': self._recycled,
+                'discarded': self._discarded,
+            }
@@ -1,78 +1,639 @@
 import psycopg2
+import psycopg2.errors
 import psycopg2.extras
-from psycopg2.pool import SimpleConnectionPool
 import os
+import re
+import time
+import threading
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
 from dotenv import load_dotenv
+from flask import g, has_request_context
+
+from connection_pool import ConnectionPool
 
 load_dotenv()
 
+# %(name)s, %s and the %% escape, in the order they appear in a query
+PLACEHOLDER = re.compile(r'%\((\w+)\)s|%s|%%')
+
+# Read replicas: comma-separated host:port list sharing the primary's database and credentials
+DB_REPLICAS = [r.strip() for r in os.getenv('DB_REPLICAS', '').split(',') if r.strip()]
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 5))  # seconds behind before leaving rotation
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 1))
+DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', DB_REPLICA_MAX_LAG))  # outside requests
+DB_BIND_REQUESTS = os.getenv('DB_BIND_REQUESTS', 'True').lower() == 'true'  # one connection per request (init_app)
+
+READ_STATEMENT = re.compile(r'\s*(SELECT|WITH|SHOW|VALUES|TABLE)\b', re.IGNORECASE)
+# Anything that writes, locks rows or touches sequences and advisory locks needs the primary
+WRITE_KEYWORD = re.compile(
+    r'\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+(NO\s+KEY\s+)?UPDATE|FOR\s+(KEY\s+)?SHARE|nextval|setval|pg_advisory\w*)\b',
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=2048)
+def is_read_only(query):
+    """Whether a statement can run on a replica"""
+    return bool(READ_STATEMENT.match(query)) and not WRITE_KEYWORD.search(query)
+
+def _lsn(text):
+    """A pg_lsn 'X/Y' as an integer"""
+    high, low = text.split('/')
+    return (int(high, 16) << 32) | int(low, 16)
+
+class PreparedStatement:
+    """A registered query, rewritten for PREPARE with $n parameters"""
+    
+    def __init__(self, name, query, primary=False):
+        self.name = name
+        self.query = query
+        self.writes = not is_read_only(query)
+        self.read_only = not primary and not self.writes  # may run on a replica
+        self.param_names = []  # named placeholders in $n order, empty for positional
+        positional = 0
+        
+        def number(match):
+            nonlocal positional
+            if match.group(0) == '%%':
+                return '%'
+            if match.group(1):
+                if match.group(1) not in self.param_names:
+                    self.param_names.append(match.group(1))
+                return f"${self.param_names.index(match.group(1)) + 1}"
+            positional += 1
+            return f"${positional}"
+        
+        self.prepare_sql = f"PREPARE {name} AS {PLACEHOLDER.sub(number, query)}"
+        if self.param_names:
+            args = ', '.join(f"%({p})s" for p in self.param_names)
+        else:
+            args = ', '.join(['%s'] * positional)
+        self.execute_sql = f"EXECUTE {name} ({args})" if args else f"EXECUTE {name}"
+
+class Replica:
+    """A streaming standby with its own pool, in rotation while it keeps up"""
+    
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.in_rotation = False  # until the first lag check passes
+        self.lag = None  # seconds of primary commits it may be missing
+        self.error = None
+        self.checked_at = None
+    
+    def status(self):
+        return {
+            'name': self.name,
+            'in_rotation': self.in_rotation,
+            'lag_seconds': None if self.lag is None else round(self.lag, 3),
+            'error': self.error,
+            'pool': self.pool.stats(),
+        }
+
 class Database:
+    """Connection pools and query helpers.
+    
+    Nothing connects until the first query, so importing the application
+    needs no database. Pools belong to the process that created them: a
+    forked child (a gunicorn worker under --preload) opens its own on first
+    use and never touches the sockets it inherited.
+    """
+    
     def __init__(self):
-        self.pool = None
-        self.init_pool()
+        self._pool = None
+        self._pid = None  # process that owns _pool
+        self._pool_lock = threading.RLock()
+        self._abandoned = []  # pools inherited across fork(), kept referenced so they are never closed here
+        self.replicas = []
+        self.max_lag = DB_REPLICA_MAX_LAG
+        self._replica_lock = threading.Lock()
+        self._next_replica = 0
+        self._lsn_samples = deque()  # (monotonic time, primary WAL position) from lag checks
+        self._monitor = None
+        self._local = threading.local()
+        self.bind_requests = DB_BIND_REQUESTS
+        self._routing = {'replica_reads': 0, 'primary_reads': 0, 'sticky_reads': 0, 'replica_fallbacks': 0}
+        self.statements = {}  # name -> PreparedStatement
+        self.use_prepared = os.getenv('DB_PREPARED_STATEMENTS', 'True').lower() == 'true'
+        # Names prepared on each pooled connection; a recycled connection is a
+        # new object with an empty set, so its statements are prepared again
+        self._prepared = weakref.WeakKeyDictionary()
+        self._prepared_lock = threading.Lock()
+        self.query_hooks = []
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+    
+    @property
+    def pool(self):
+        """The primary pool, created on first use in each process"""
+        if self._pid != os.getpid():
+            with self._pool_lock:
+                if self._pid != os.getpid():
+                    if self._pid is not None:
+                        self._after_fork()
+                    self.init_pool()
+        return self._pool
+    
+    def _after_fork(self):
+        """Forget the parent's pools and threads; the next query opens new ones"""
+        # Closing an inherited connection would end the parent's session on the same socket
+        self._abandoned.extend(p for p in [self._pool] + [r.pool for r in self.replicas] if p is not None)
+        self._pool = None
+        self._pid = None
+        self.replicas = []
+        self._monitor = None
+        self._lsn_samples = deque()
+        self._prepared = weakref.WeakKeyDictionary()
+        # Locks may have been held by parent threads that do not exist here
+        self._pool_lock = threading.RLock()
+        self._replica_lock = threading.Lock()
+        self._prepared_lock = threading.Lock()
+        self._local = threading.local()
+    
+    @staticmethod
+    def _create_pool(minconn, host, port):
+        return ConnectionPool(
+            minconn,
+            int(os.getenv('DB_POOL_MAX', 20)),
+            timeout=float(os.getenv('DB_POOL_TIMEOUT', 5)),  # max seconds to wait for a free connection
+            max_age=float(os.getenv('DB_POOL_MAX_AGE', 1800)),  # recycle connections older than this
+            ping_after=float(os.getenv('DB_POOL_PING_AFTER', 30)),  # ping connections idle longer than this
+            retry_after=int(os.getenv('DB_POOL_RETRY_AFTER', 1)),
+            host=host,
+            database=os.getenv('DB_NAME', 'attendance_db'),
+            user=os.getenv('DB_USER', 'postgres'),
+            password=os.getenv('DB_PASSWORD', 'password'),
+            port=port
+        )
     
     def init_pool(self):
         """Initialize connection pool"""
         try:
-            self.pool = SimpleConnectionPool(
-                1, 20,  # min and max connections
-                host=os.getenv('DB_HOST', 'localhost'),
-                database=os.getenv('DB_NAME', 'attendance_db'),
-                user=os.getenv('DB_USER', 'postgres'),
-                password=os.getenv('DB_PASSWORD', 'password'),
-                port=os.getenv('DB_PORT', '5432')
-            )
+            self._pool = self._create_pool(int(os.getenv('DB_POOL_MIN', 1)),
+                                           os.getenv('DB_HOST', 'localhost'), os.getenv('DB_PORT', '5432'))
+            self._pid = os.getpid()
             print("Database connection pool created successfully")
         except Exception as e:
             print(f"Error creating connection pool: {e}")
             raise
+        if DB_REPLICAS:
+            self.init_replicas(DB_REPLICAS)
+    
+    def init_replicas(self, addresses):
+        """Open a pool per replica ("host:port") and start watching their lag.
+        
+        Replica pools start empty, so an unreachable replica only keeps
+        itself out of rotation instead of failing startup.
+        """
+        for address in addresses:
+            host, _, port = address.partition(':')
+            self.replicas.append(Replica(address, self._create_pool(0, host, port or '5432')))
+        self.check_replicas()
+        print(f"Read replicas: {', '.join(r.name for r in self.replicas if r.in_rotation) or 'none in rotation'}")
+        self._start_replica_monitor()
+    
+    def _start_replica_monitor(self):
+        def run():
+            while True:
+                time.sleep(DB_REPLICA_CHECK_INTERVAL)
+                try:
+                    self.check_replicas()
+                except Exception as e:
+                    print(f"Replica lag check failed: {e}")
+        self._monitor = threading.Thread(target=run, name='replica-monitor', daemon=True)
+        self._monitor.start()
+    
+    def check_replicas(self):
+        """Measure each replica's lag and update the rotation.
+        
+        Every check samples the primary's WAL position. A replica that has
+        replayed up to a sample holds every commit made before it, so its
+        lag is the age of the newest sample it has reached, whether the
+        primary is busy or idle.
+        """
+        now = time.monotonic()
+        row = self.execute_one("SELECT pg_current_wal_lsn()::text AS lsn", primary=True)
+        with self._replica_lock:
+            self._lsn_samples.append((now, _lsn(row['lsn'])))
+            while self._lsn_samples and now - self._lsn_samples[0][0] > self.max_lag + 2 * DB_REPLICA_CHECK_INTERVAL:
+                self._lsn_samples.popleft()
+            samples = list(self._lsn_samples)
+        
+        for replica in self.replicas:
+            conn = None
+            try:
+                conn = replica.pool.getconn()
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_is_in_recovery(), pg_last_wal_replay_lsn()::text")
+                    in_recovery, replayed = cursor.fetchone()
+                if not in_recovery:
+                    # A standalone server (e.g. a second local instance kept in sync by hand)
+                    lag = 0.0
+                else:
+                    replayed = _lsn(replayed) if replayed else -1
+                    reached = [taken for taken, lsn in samples if lsn <= replayed]
+                    lag = now - max(reached) if reached else now - samples[0][0] + DB_REPLICA_CHECK_INTERVAL
+                replica.lag, replica.error = lag, None
+                in_rotation = lag <= self.max_lag
+            except Exception as e:
+                replica.error = str(e)
+                in_rotation = False
+            finally:
+                if conn is not None:
+                    replica.pool.putconn(conn)
+            if in_rotation != replica.in_rotation:
+                print(f"Replica {replica.name} {'back in' if in_rotation else 'out of'} rotation"
+                      f" (lag {replica.lag}s{', ' + replica.error if replica.error else ''})")
+            replica.in_rotation = in_rotation
+            replica.checked_at = time.time()
+    
+    def _wrote(self):
+        """Send this request's (or thread's) reads to the primary from now on"""
+        if has_request_context():
+            g._db_wrote = True
+        else:
+            self._local.sticky_until = time.monotonic() + DB_REPLICA_STICKY_SECONDS
+    
+    def _sticky(self):
+        if has_request_context():
+            return g.get('_db_wrote', False)
+        return getattr(self._local, 'sticky_until', 0) > time.monotonic()
+    
+    def _read_replica(self):
+        """The replica to send a read to, or None for the primary"""
+        self.pool  # replicas are set up with the primary pool
+        if not self.replicas:
+            return None
+        sticky = self._sticky() or self._transaction() is not None
+        bound = g.get('_db_conns') if has_request_context() else None
+        with self._replica_lock:
+            candidates = [] if sticky else [r for r in self.replicas if r.in_rotation]
+            if not candidates:
+                self._routing['sticky_reads' if sticky else 'primary_reads'] += 1
+                return None
+            self._routing['replica_reads'] += 1
+            # Stay on the replica this request already holds a connection to
+            for replica in candidates:
+                if bound and replica.pool in bound:
+                    return replica
+            self._next_replica = (self._next_replica + 1) % len(candidates)
+            return candidates[self._next_replica]
+    
+    def _evict(self, replica, error):
+        with self._replica_lock:
+            self._routing['replica_fallbacks'] += 1
+        if replica.in_rotation:
+            print(f"Replica {replica.name} out of rotation: {error}")
+        replica.in_rotation = False
+        replica.error = str(error)
+    
+    def _state(self):
+        """Where the open transaction lives: the request's g, else this thread"""
+        return g if has_request_context() else self._local
+    
+    def _transaction(self):
+        return getattr(self._state(), '_db_transaction', None)
+    
+    def init_app(self, app):
+        """Bind one connection per pool to each request.
+        
+        Helpers called during a request share the connection checked out by
+        the first of them instead of taking one from the pool per call. It
+        goes back when the view returns, before a streamed body is sent, so
+        SSE streams and exports do not hold it for their whole length.
+        """
+        @app.before_request
+        def _bind_connections():
+            g._db_bind = self.bind_requests
+        
+        @app.after_request
+        def _release_connections(response):
+            g._db_bind = False
+            self.release_connection()
+            return response
+        
+        @app.teardown_request
+        def _teardown_connections(exc):
+            g._db_bind = False
+            self.release_connection()
+    
+    def _bound(self, pool):
+        """The request's connection from ``pool``, checked out on first use; None outside a bound request"""
+        if not has_request_context() or not g.get('_db_bind'):
+            return None
+        conns = g.setdefault('_db_conns', {})
+        conn = conns.get(pool)
+        if conn is not None and conn.closed:
+            pool.putconn(conns.pop(pool))
+            conn = None
+        if conn is None:
+            conn = conns[pool] = pool.getconn()
+        return conn
+    
+    def release_connection(self):
+        """Hand the request's idle connections back, e.g. before slow work without queries"""
+        if not has_request_context():
+            return
+        transaction = self._transaction()
+        kept = {}
+        for pool, conn in (g.pop('_db_conns', None) or {}).items():
+            if transaction is not None and transaction['conn'] is conn:
+                kept[pool] = conn
+            else:
+                pool.putconn(conn)
+        if kept:
+            g._db_conns = kept
+    
+    def _acquire(self, pool):
+        """(connection, how) for one statement: 'transaction', 'bound' to the request, or 'owned'"""
+        transaction = self._transaction()
+        if transaction is not None and pool is self.pool:
+            if transaction['conn'] is None:
+                # The transaction takes its connection at its first statement
+                conn = self._bound(pool)
+                transaction['owned'] = conn is None
+                conn = conn or pool.getconn()
+                conn.autocommit = False
+                transaction['conn'] = conn
+                with conn.cursor() as cursor:
+                    for name in transaction['pending']:
+                        cursor.execute(f"SAVEPOINT {name}")
+                transaction['pending'] = []
+            return transaction['conn'], 'transaction'
+        conn = self._bound(pool)
+        if conn is not None:
+            return conn, 'bound'
+        return pool.getconn(), 'owned'
+    
+    @contextmanager
+    def transaction(self):
+        """Run the helpers called inside the block as one transaction on one connection.
+        
+        Commits when the block exits and rolls back if it raises. A nested
+        ``with db.transaction()`` becomes a savepoint, so an exception
+        escaping it undoes only the inner block. Reads inside a transaction
+        go to the primary. Inside a request the transaction uses the
+        request's connection.
+        """
+        state = self._state()
+        transaction = getattr(state, '_db_transaction', None)
+        if transaction is not None:
+            with self._savepoint(transaction):
+                yield
+            return
+        
+        transaction = {'conn': None, 'owned': False, 'depth': 0, 'pending': [], 'on_commit': []}
+        state._db_transaction = transaction
+        try:
+            yield
+            if transaction['conn'] is not None:
+                transaction['conn'].commit()
+        except BaseException:
+            conn = transaction['conn']
+            if conn is not None and not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass
+            raise
+        finally:
+            state._db_transaction = None
+            conn = transaction['conn']
+            if conn is not None:
+                if not conn.closed:
+                    conn.autocommit = True
+                if transaction['owned']:
+                    self.pool.putconn(conn)
+                self._wrote()
+        for callback in transaction['on_commit']:
+            callback()
+    
+    @contextmanager
+    def _savepoint(self, transaction):
+        transaction['depth'] += 1
+        name = f"savepoint_{transaction['depth']}"
+        callbacks = len(transaction['on_commit'])
+        if transaction['conn'] is None:
+            transaction['pending'].append(name)
+        else:
+            with transaction['conn'].cursor() as cursor:
+                cursor.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException:
+            if name in transaction['pending']:
+                transaction['pending'].remove(name)
+            elif not transaction['conn'].closed:
+                with transaction['conn'].cursor() as cursor:
+                    cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            del transaction['on_commit'][callbacks:]
+            raise
+        else:
+            if name in transaction['pending']:
+                transaction['pending'].remove(name)
+            else:
+                with transaction['conn'].cursor() as cursor:
+                    cursor.execute(f"RELEASE SAVEPOINT {name}")
+        finally:
+            transaction['depth'] -= 1
+    
+    def on_commit(self, callback):
+        """Call ``callback`` once the open transaction commits, or at once outside one"""
+        transaction = self._transaction()
+        if transaction is None:
+            callback()
+        else:
+            transaction['on_commit'].append(callback)
     
     def get_connection(self):
-        """Get connection from pool"""
+        """Get a primary connection from the pool; the caller may write with it"""
+        self._wrote()
         return self.pool.getconn()
     
     def return_connection(self, conn):
         """Return connection to pool"""
         self.pool.putconn(conn)
     
-    def execute_query(self, query, params=None, fetch=False):
-        """Execute a query and return results if needed"""
-        conn = None
+    def pool_stats(self):
+        """Get connection pool usage statistics, empty until the first query"""
+        if self._pid != os.getpid():
+            return {}
+        return self._pool.stats()
+    
+    def routing_stats(self):
+        """Where reads went, and how many replicas are in rotation"""
+        with self._replica_lock:
+            stats = dict(self._routing)
+        stats['replicas'] = len(self.replicas)
+        stats['replicas_in_rotation'] = sum(r.in_rotation for r in self.replicas)
+        return stats
+    
+    def replica_status(self):
+        return [replica.status() for replica in self.replicas]
+    
+    def add_query_hook(self, hook):
+        """Call ``hook(query, seconds, rows, error)`` after every helper query (see metrics.py)"""
+        self.query_hooks.append(hook)
+    
+    def _observe(self, query, started, rows, error):
+        if not self.query_hooks:
+            return
+        elapsed = time.perf_counter() - started
+        for hook in self.query_hooks:
+            try:
+                hook(query, elapsed, rows, error)
+            except Exception as e:
+                print(f"Query hook failed: {e}")
+    
+    def _execute(self, query, run, result, replica_ok, writes):
+        """Run ``run(conn, cursor)`` on a replica when ``replica_ok``, else on the primary.
+        
+        ``result`` is 'all', 'one', 'rowcount' or 'returned' (what ``run`` returns). A replica that fails to
+        connect or answer is taken out of rotation and the read is retried
+        on the primary. ``writes`` makes the rest of the request sticky.
+        """
+        replica = self._read_replica() if replica_ok else None
+        if replica is None:
+            return self._execute_on(self.pool, query, run, result, writes)
+        try:
+            return self._execute_on(replica.pool, query, run, result, writes=False)
+        except psycopg2.OperationalError as e:
+            self._evict(replica, e)
+            return self._execute_on(self.pool, query, run, result, writes=False)
+    
+    def _execute_on(self, pool, query, run, result, writes):
+        conn = cursor = how = None
+        started, rows, error = time.perf_counter(), None, None
         try:
-            conn = self.get_connection()
+            conn, how = self._acquire(pool)
             cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            cursor.execute(query, params)
+            returned = run(conn, cursor)
             
-            if fetch:
-                result = cursor.fetchall()
-                return result
+            if result == 'returned':
+                value = returned
+                rows = len(value) if isinstance(value, (list, tuple)) else None
+            elif result == 'one':
+                row = cursor.fetchone()
+                rows = 0 if row is None else 1
+                value = row
+            elif result == 'all':
+                value = cursor.fetchall()
+                rows = len(value)
             else:
-                conn.commit()
-                return cursor.rowcount
+                if how != 'transaction':
+                    conn.commit()
+                value = rows = cursor.rowcount
+            if writes:
+                self._wrote()
+            return value
         except Exception as e:
-            if conn:
+            error = e
+            if conn and result != 'one' and how != 'transaction':
                 conn.rollback()
             raise e
         finally:
             if conn:
-                cursor.close()
-                self.return_connection(conn)
+                if cursor is not None:
+                    cursor.close()
+                if how == 'owned':
+                    pool.putconn(conn)
+            self._observe(query, started, rows, error)
     
-    def execute_one(self, query, params=None):
-        """Execute query and return one result"""
-        conn = None
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-            return result
-        except Exception as e:
-            raise e
-        finally:
-            if conn:
-                cursor.close()
-                self.return_connection(conn)
+    def execute_query(self, query, params=None, fetch=False, primary=False):
+        """Execute a query and return results if needed.
+        
+        Reads with ``fetch=True`` go to a replica unless ``primary`` is set
+        or this request has already written.
+        """
+        read_only = is_read_only(query)
+        return self._execute(query, lambda conn, cursor: cursor.execute(query, params),
+                             'all' if fetch else 'rowcount',
+                             replica_ok=fetch and read_only and not primary, writes=not read_only)
+    
+    def register(self, name, query, primary=False):
+        """Declare a hot query once, to be prepared on each connection that runs it.
+        
+        ``primary=True`` keeps a read on the primary, for lookups that must
+        see writes made moments ago by another request.
+        """
+        if not re.fullmatch(r'[a-z_][a-z0-9_]*', name):
+            raise ValueError(f"Invalid prepared statement name: {name}")
+        existing = self.statements.get(name)
+        if existing and (existing.query, existing.read_only) != (query, not primary and is_read_only(query)):
+            raise ValueError(f"Prepared statement {name} is already registered with a different query")
+        self.statements[name] = PreparedStatement(name, query, primary)
+        return name
+    
+    def _execute_prepared(self, conn, cursor, name, params):
+        """Run a registered statement, preparing it on this connection first if needed"""
+        statement = self.statements[name]
+        if not self.use_prepared:
+            cursor.execute(statement.query, params)
+            return
+        with self._prepared_lock:
+            prepared = self._prepared.setdefault(conn, set())
+        if name not in prepared:
+            cursor.execute(statement.prepare_sql)
+            prepared.add(name)
+            cursor.execute(statement.execute_sql, params)
+            return
+        
+        transaction = self._transaction()
+        if conn.autocommit:
+            try:
+                cursor.execute(statement.execute_sql, params)
+            except (psycopg2.errors.InvalidSqlStatementName, psycopg2.errors.FeatureNotSupported) as e:
+                self._prepare_again(cursor, statement, e)
+                cursor.execute(statement.execute_sql, params)
+        elif transaction is not None and transaction['conn'] is conn:
+            # A failed EXECUTE aborts the transaction, so retry from a savepoint
+            try:
+                with self._savepoint(transaction):
+                    cursor.execute(statement.execute_sql, params)
+            except (psycopg2.errors.InvalidSqlStatementName, psycopg2.errors.FeatureNotSupported) as e:
+                self._prepare_again(cursor, statement, e)
+                cursor.execute(statement.execute_sql, params)
+        else:
+            cursor.execute(statement.execute_sql, params)
+    
+    @staticmethod
+    def _prepare_again(cursor, statement, error):
+        if isinstance(error, psycopg2.errors.FeatureNotSupported):
+            # "cached plan must not change result type" after a schema change
+            cursor.execute(f"DEALLOCATE {statement.name}")
+        # Otherwise deallocated behind our back (DISCARD ALL, a pooler)
+        cursor.execute(statement.prepare_sql)
+    
+    def execute_prepared(self, name, params=None, fetch=False):
+        """execute_query for a statement declared with register()"""
+        statement = self.statements[name]
+        return self._execute(statement.query, lambda conn, cursor: self._execute_prepared(conn, cursor, name, params),
+                             'all' if fetch else 'rowcount',
+                             replica_ok=fetch and statement.read_only, writes=statement.writes)
+    
+    def execute_prepared_one(self, name, params=None):
+        """execute_one for a statement declared with register()"""
+        statement = self.statements[name]
+        return self._execute(statement.query, lambda conn, cursor: self._execute_prepared(conn, cursor, name, params),
+                             'one', replica_ok=statement.read_only, writes=statement.writes)
+    
+    def execute_one(self, query, params=None, primary=False):
+        """Execute query and return one result (from a replica for reads, like execute_query)"""
+        read_only = is_read_only(query)
+        return self._execute(query, lambda conn, cursor: cursor.execute(query, params),
+                             'one', replica_ok=read_only and not primary, writes=not read_only)
+
+    def execute_cursor(self, query, run):
+        """Run ``run(cursor)`` on the primary and return its result.
+        
+        For work the other helpers cannot express (execute_values, COPY).
+        It uses the request's connection or the open transaction like any
+        helper, and ``query`` labels it for the query hooks.
+        """
+        return self._execute(query, lambda conn, cursor: run(cursor), 'returned',
+                             replica_ok=False, writes=True)
 
 # Global database instance
 db = Database()
\ No newline at end of file
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Durable email outbox for ChronoTrack
+Requests only INSERT into email_outbox; a pool of background workers drains it
+over persistent SMTP connections with retry, backoff and dead-lettering.
+Run this file directly to drain the outbox from a dedicated process.
+"""
+
+import os
+import time
+import random
+import smtplib
+import threading
+from email.message import EmailMessage
+
+import psycopg2.extras
+from dotenv import load_dotenv
+
+from database import db
+
+load_dotenv()
+
+# Set whenever something is enqueued so in-process workers wake up immediately
+_wakeup = threading.Event()
+
+
+def enqueue_email(recipient, subject, html_body, text_body=None, sender=None):
+    """Queue an email for background delivery and return its outbox id"""
+    query = """
+    INSERT INTO email_outbox (recipient, sender, subject, html_body, text_body)
+    VALUES (%s, %s, %s, %s, %s)
+    RETURNING id
+    """
+    result = db.execute_one(query, (recipient, sender, subject, html_body, text_body))
+    # Inside db.transaction() the row is only visible to workers after commit
+    db.on_commit(_wakeup.set)
+    return result['id']
+
+
+def enqueue_emails(cursor, messages):
+    """Queue many (recipient, sender, subject, html_body, text_body) rows on ``cursor``.
+
+    Runs inside the caller's transaction so the emails are only queued if
+    the rows they announce are committed; call notify_outbox() after commit.
+    """
+    psycopg2.extras.execute_values(cursor, """
+        INSERT INTO email_outbox (recipient, sender, subject, html_body, text_body)
+        VALUES %s
+    """, messages, page_size=1000)
+
+
+def notify_outbox():
+    """Wake in-process workers after a batch was committed"""
+    _wakeup.set()
+
+
+class SMTPSender:
+    """One persistent SMTP connection, reused across messages and reopened when stale"""
+
+    def __init__(self, server, port, use_tls=True, username=None, password=None,
+                 timeout=30, max_messages=100, max_idle=60):
+        self.server = server
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_messages = max_messages  # many providers cap messages per connection
+        self.max_idle = max_idle
+        self.connections_opened = 0
+        self._smtp = None
+        self._sent_on_connection = 0
+        self._last_used = 0.0
+
+    def _connect(self):
+        self.close()
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        if self.use_tls:
+            smtp.starttls()
+        if self.username and self.password:
+            smtp.login(self.username, self.password)
+        self._smtp = smtp
+        self._sent_on_connection = 0
+        self.connections_opened += 1
+
+    def _ensure_connection(self):
+        if self._smtp is None or self._sent_on_connection >= self.max_messages:
+            self._connect()
+        elif time.monotonic() - self._last_used > self.max_idle:
+            # Servers drop idle sessions; probe before trusting an old connection
+            try:
+                if self._smtp.noop()[0] != 250:
+                    self._connect()
+            except smtplib.SMTPException:
+                self._connect()
+
+    def send(self, message):
+        """Send an EmailMessage, reconnecting once if the server hung up"""
+        self._ensure_connection()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self._connect()
+            self._smtp.send_message(message)
+        self._sent_on_connection += 1
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+class EmailOutboxWorker:
+    """Pool of threads that claim outbox rows with SKIP LOCKED and deliver them"""
+
+    def __init__(self, smtp_settings, default_sender=None, workers=2, batch_size=10,
+                 max_attempts=5, backoff_base=30, backoff_max=3600, poll_interval=2.0,
+                 lease=300):
+        self.smtp_settings = smtp_settings
+        self.default_sender = default_sender
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.lease = lease  # seconds before a row stuck in 'sending' is retried
+
+        self._threads = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a worker from Flask-style MAIL_* settings and EMAIL_* environment variables"""
+        smtp_settings = {
+            'server': config.get('MAIL_SERVER', 'localhost'),
+            'port': int(config.get('MAIL_PORT', 25)),
+            'use_tls': config.get('MAIL_USE_TLS', False),
+            'username': config.get('MAIL_USERNAME'),
+            'password': config.get('MAIL_PASSWORD'),
+        }
+        return cls(
+            smtp_settings,
+            default_sender=config.get('MAIL_DEFAULT_SENDER') or config.get('MAIL_USERNAME'),
+            workers=int(os.getenv('EMAIL_WORKERS', 2)),
+            batch_size=int(os.getenv('EMAIL_BATCH_SIZE', 10)),
+            max_attempts=int(os.getenv('EMAIL_MAX_ATTEMPTS', 5)),
+            backoff_base=float(os.getenv('EMAIL_BACKOFF_BASE', 30)),
+            backoff_max=float(os.getenv('EMAIL_BACKOFF_MAX', 3600)),
+            poll_interval=float(os.getenv('EMAIL_POLL_INTERVAL', 2)),
+        )
+
+    def start(self):
+        """Start the worker threads"""
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"email-outbox-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Email outbox started with {self.workers} workers")
+
+    def stop(self, timeout=10):
+        """Signal the workers to stop and wait for them"""
+        self._stopping.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        sender = SMTPSender(**self.smtp_settings)
+        try:
+            while not self._stopping.is_set():
+                try:
+                    processed = self.process_batch(sender)
+                except Exception as e:
+                    print(f"Email outbox worker error: {e}")
+                    processed = 0
+                if processed == 0:
+                    _wakeup.wait(self.poll_interval)
+                    _wakeup.clear()
+        finally:
+            sender.close()
+
+    def _claim(self):
+        """Lease a batch of due rows; rows stuck in 'sending' past the lease are reclaimed"""
+        query = """
+        UPDATE email_outbox
+        SET status = 'sending', locked_at = CURRENT_TIMESTAMP, attempts = attempts + 1
+        WHERE id IN (
+            SELECT id FROM email_outbox
+            WHERE (status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP)
+               OR (status = 'sending' AND locked_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+            ORDER BY next_attempt_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, recipient, sender, subject, html_body, text_body, attempts
+        """
+        return db.execute_query(query, (self.lease, self.batch_size), fetch=True)
+
+    def _build_message(self, row):
+        message = EmailMessage()
+        message['Subject'] = row['subject']
+        message['From'] = row['sender'] or self.default_sender
+        message['To'] = row['recipient']
+        if row['text_body']:
+            message.set_content(row['text_body'])
+            message.add_alternative(row['html_body'], subtype='html')
+        else:
+            message.set_content(row['html_body'], subtype='html')
+        return message
+
+    def process_batch(self, sender):
+        """Claim and deliver one batch, returning the number of rows handled"""
+        rows = self._claim()
+        delivered = []
+        try:
+            for row in rows:
+                try:
+                    sender.send(self._build_message(row))
+                except smtplib.SMTPRecipientsRefused as e:
+                    # The server rejected the address itself; retrying cannot help
+                    self._mark_failed(row, e, permanent=True)
+                    continue
+                except (smtplib.SMTPException, OSError) as e:
+                    sender.close()
+                    self._mark_failed(row, e)
+                    continue
+                except (UnicodeError, ValueError) as e:
+                    # Malformed address or header; the message can never be built or sent
+                    self._mark_failed(row, e, permanent=True)
+                    continue
+                except Exception as e:
+                    sender.close()
+                    self._mark_failed(row, e)
+                    continue
+                delivered.append(row['id'])
+        finally:
+            # Even if the loop dies (e.g. a DB error in _mark_failed), record what
+            # already went out so the expired lease does not resend it
+            if delivered:
+                query = """
+                UPDATE email_outbox
+                SET status = 'sent', sent_at = CURRENT_TIMESTAMP, locked_at = NULL, last_error = NULL
+                WHERE id = ANY(%s)
+                """
+                db.execute_query(query, (delivered,))
+                with self._lock:
+                    self.sent += len(delivered)
+        return len(rows)
+
+    def _mark_failed(self, row, error, permanent=False):
+        """Schedule a retry with exponential backoff, or dead-letter the row"""
+        if permanent or row['attempts'] >= self.max_attempts:
+            query = """
+            UPDATE email_outbox
+            SET status = 'dead', locked_at = NULL, last_error = %s
+            WHERE id = %s
+            """
+            db.execute_query(query, (str(error), row['id']))
+            with self._lock:
+                self.dead += 1
+            print(f"Email {row['id']} to {row['recipient']} dead-lettered: {error}")
+            return
+
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (row['attempts'] - 1))
+        delay *= random.uniform(0.8, 1.2)  # jitter so a provider outage does not retry in lockstep
+        query = """
+        UPDATE email_outbox
+        SET status = 'pending', locked_at = NULL, last_error = %s,
+            next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+        WHERE id = %s
+        """
+        db.execute_query(query, (str(error), delay, row['id']))
+        with self._lock:
+            self.retried += 1
+
+    def stats(self):
+        """Delivery counters for this process"""
+        with self._lock:
+            return {'workers': len(self._threads), 'sent': self.sent,
+                    'retried': self.retried, 'dead': self.dead}
+
+
+def start_email_workers(app):
+    """Start in-process outbox workers using ``app``'s mail settings"""
+    worker = EmailOutboxWorker.from_config(app.config)
+    worker.start()
+    return worker
+
+
+if __name__ == "__main__":
+    config = {
+        'MAIL_SERVER': os.getenv('MAIL_SERVER', 'smtp.gmail.com'),
+        'MAIL_PORT': int(os.getenv('MAIL_PORT', 587)),
+        'MAIL_USE_TLS': os.getenv('MAIL_USE_TLS', 'True').lower() == 'true',
+        'MAIL_USERNAME': os.getenv('MAIL_USERNAME'),
+        'MAIL_PASSWORD': os.getenv('MAIL_PASSWORD'),
+    }
+    worker = EmailOutboxWorker.from_config(config)
+    worker.start()
+    try:
+        while True:
+            time.sleep(60)
+            print(f"Email outbox: {worker.stats()}")
+    except KeyboardInterrupt:
+        worker.stop()
@@ -0,0 +1,122 @@
+import os
+import re
+from html.parser import HTMLParser
+
+from jinja2 import Environment, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'email')
+
+# Template name -> subject line; the body is templates/email/<name>.html
+EMAIL_SUBJECTS = {
+    'verification': "Verify Your ChronoTrack Account",
+    'password_reset': "Reset Your ChronoTrack Password",
+    'invitation': "You're Invited to ChronoTrack",
+}
+
+_BLOCK_TAGS = {'p', 'div', 'h1', 'h2', 'h3', 'h4', 'br', 'tr', 'li', 'table', 'ul', 'ol'}
+_SKIPPED_TAGS = {'head', 'style', 'script', 'title'}
+
+
+class _TextConverter(HTMLParser):
+    """Turns an HTML email template into its plain-text counterpart.
+
+    Runs over the template source, so Jinja expressions in text pass through
+    untouched and links keep their target as ``text: url``.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+        self._href = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append('\n\n')
+        elif tag == 'a':
+            self._href = dict(attrs).get('href')
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS:
+            self._skipping -= 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append('\n\n')
+        elif tag == 'a' and self._href:
+            self.parts.append(f": {self._href}")
+            self._href = None
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(re.sub(r'\s+', ' ', data))
+
+    def text(self):
+        lines = (line.strip() for line in ''.join(self.parts).split('\n'))
+        return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip() + '\n'
+
+
+def html_to_text_template(source):
+    """Plain-text template source generated from an HTML template's source"""
+    converter = _TextConverter()
+    converter.feed(source)
+    converter.close()
+    return converter.text()
+
+
+class EmailTemplates:
+    """Email bodies compiled once and reused for every send.
+
+    Each registered template is compiled twice up front, as autoescaped HTML
+    and as a plain-text alternative: templates/email/<name>.txt if present,
+    otherwise one generated from the HTML. Rendering never parses a template
+    again, and render_batch() personalizes many messages in one call.
+    """
+
+    def __init__(self, directory=TEMPLATE_DIR, subjects=EMAIL_SUBJECTS):
+        self.directory = directory
+        self.html_env = Environment(autoescape=select_autoescape(default_for_string=True))
+        self.text_env = Environment(autoescape=False)
+        self._templates = {}  # name -> (subject, html template, text template)
+        for name, subject in subjects.items():
+            self.register(name, subject)
+
+    def register(self, name, subject):
+        """Compile templates/email/<name>.html and its text alternative"""
+        with open(os.path.join(self.directory, f"{name}.html")) as f:
+            html_source = f.read()
+        text_path = os.path.join(self.directory, f"{name}.txt")
+        if os.path.exists(text_path):
+            with open(text_path) as f:
+                text_source = f.read()
+        else:
+            text_source = html_to_text_template(html_source)
+        self._templates[name] = (
+            subject,
+            self.html_env.from_string(html_source),
+            self.text_env.from_string(text_source),
+        )
+
+    def names(self):
+        return sorted(self._templates)
+
+    def render(self, name, **context):
+        """Return (subject, html_body, text_body) for one message"""
+        subject, html, text = self._templates[name]
+        return subject, html.render(context), text.render(context)
+
+    def render_batch(self, name, contexts, **common):
+        """Render one template for many recipients.
+
+        ``contexts`` is an iterable of per-message dicts; ``common`` holds
+        values shared by every message. Yields (subject, html_body,
+        text_body) in order, so thousands of messages never sit in memory
+        at once unless the caller collects them.
+        """
+        subject, html, text = self._templates[name]
+        for context in contexts:
+            values = {**common, **context} if common else context
+            yield subject, html.render(values), text.render(values)
+
+
+email_templates = EmailTemplates()
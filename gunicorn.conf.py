@@ -0,0 +1,54 @@
+"""
+Gunicorn settings for ChronoTrack: gunicorn -c gunicorn.conf.py wsgi:app
+
+Worker processes take the CPU-bound work (bcrypt, JSON); threads in each
+worker serve requests that wait on Postgres. Every worker has its own
+DB_POOL_MAX connections, so Postgres sees up to workers x DB_POOL_MAX.
+"""
+
+import os
+import multiprocessing
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', 5001)}")
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+worker_class = 'gthread'  # SSE dashboard streams each hold a thread while open
+# ...so a worker takes at most half its threads in streams and answers more with a 503 and
+# Retry-After, leaving the rest for API calls. Set before the app (and live_events) is imported.
+os.environ.setdefault('SSE_MAX_SUBSCRIBERS', str(max(1, threads // 2)))
+# Every worker runs its own outbox sender threads (email_outbox.py), one SMTP connection each,
+# so workers x EMAIL_WORKERS send in total. One per worker unless EMAIL_WORKERS says otherwise.
+email_workers = int(os.getenv('EMAIL_WORKERS', 1))
+os.environ['EMAIL_WORKERS'] = str(email_workers)
+# Import the app once in the master and fork it; safe because nothing connects at import
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() == 'true'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))  # recycle workers after this many requests; 0 never
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+
+
+def on_starting(server):
+    pool_max = int(os.getenv('DB_POOL_MAX', 20))
+    if threads > pool_max:
+        print(f"⚠️ {threads} threads per worker share {pool_max} connections (DB_POOL_MAX); "
+              f"requests will wait for the pool")
+    streams = int(os.environ['SSE_MAX_SUBSCRIBERS'])
+    if streams >= threads:
+        print(f"⚠️ SSE_MAX_SUBSCRIBERS={streams} lets dashboard streams hold all {threads} threads "
+              f"of a worker; API requests will queue behind them")
+    if os.getenv('EMAIL_OUTBOX_IN_APP', 'True').lower() == 'true':
+        print(f"Email outbox: {workers} workers x {email_workers} sender threads "
+              f"= {workers * email_workers} SMTP connections")
+
+
+def post_worker_init(worker):
+    """Background threads do not survive fork(): start them in every worker"""
+    from app import start_background_services
+    start_background_services()
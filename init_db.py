@@ -8,8 +8,70 @@ import psycopg2
 import os
 from dotenv import load_dotenv
 
+from partitioning import attendance_table_sql, is_partitioned, ensure_partitions
+from rebuild_rollups import rebuild_rollups
+
 load_dotenv()
 
+def create_attendance_triggers(cursor, table='attendance'):
+    """(Re)create the statement-level triggers feeding the rollups and live dashboards"""
+    # Transition tables allow one event per trigger and no column list
+    cursor.execute(f"DROP TRIGGER IF EXISTS attendance_rollup ON {table}")
+    for event, referencing in (
+        ('INSERT', 'NEW TABLE AS new_rows'),
+        ('DELETE', 'OLD TABLE AS old_rows'),
+        ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+    ):
+        name = f"attendance_rollup_{event.lower()}"
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+        cursor.execute(f"""
+        CREATE TRIGGER {name}
+        AFTER {event} ON {table}
+        REFERENCING {referencing}
+        FOR EACH STATEMENT EXECUTE FUNCTION update_attendance_rollup()
+        """)
+    
+    cursor.execute(f"DROP TRIGGER IF EXISTS attendance_notify_insert ON {table}")
+    cursor.execute(f"""
+    CREATE TRIGGER attendance_notify_insert
+    AFTER INSERT ON {table}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_attendance_insert()
+    """)
+
+def migrate_organizations(cursor):
+    """Backfill organizations and users.company_id/school_id from the free-text names.
+    
+    Spelling variants (case, spacing) of a name become one organization named
+    after its most common spelling. Returns True when users were updated, in
+    which case the rollups have to be rebuilt.
+    """
+    cursor.execute("""
+    INSERT INTO organizations (org_type, name)
+    SELECT org_type, mode() WITHIN GROUP (ORDER BY name)
+    FROM (
+        SELECT 'company' AS org_type, btrim(company) AS name FROM users
+        WHERE company_id IS NULL AND btrim(company) <> ''
+        UNION ALL
+        SELECT 'school', btrim(school) FROM users
+        WHERE school_id IS NULL AND btrim(school) <> ''
+    ) names
+    GROUP BY org_type, organization_name_key(name)
+    ON CONFLICT (org_type, name_key) DO NOTHING
+    """)
+    if cursor.rowcount:
+        print(f"Organizations created from user names: {cursor.rowcount}")
+    
+    # Setting a name to itself lets resolve_user_organizations() fill in the id
+    cursor.execute("""
+    UPDATE users SET company = company, school = school
+    WHERE (company_id IS NULL AND btrim(company) <> '')
+       OR (school_id IS NULL AND btrim(school) <> '')
+    """)
+    if cursor.rowcount:
+        print(f"Users linked to organizations: {cursor.rowcount}")
+    return cursor.rowcount > 0
+
 def create_database():
     """Create the database if it doesn't exist"""
     try:
@@ -75,20 +137,41 @@ def create_tables():
         )
         """)
         
-        # Attendance table
+        # Companies and schools, one row per spelling-insensitive name, with attendance settings.
+        # NULL settings fall back to LATE_CUTOFF, ATTENDANCE_TIMEZONE and EXPECTED_DAYS.
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS attendance (
+        CREATE OR REPLACE FUNCTION organization_name_key(p_name TEXT)
+        RETURNS TEXT AS $$
+            SELECT lower(regexp_replace(btrim(p_name), '\\s+', ' ', 'g'))
+        $$ LANGUAGE sql IMMUTABLE
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS organizations (
             id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-            date DATE NOT NULL,
-            clock_in_time TIMESTAMP NOT NULL,
-            clock_out_time TIMESTAMP,
-            is_late BOOLEAN DEFAULT FALSE,
-            notes TEXT,
+            org_type VARCHAR(10) NOT NULL CHECK (org_type IN ('company', 'school')),
+            name VARCHAR(255) NOT NULL,
+            name_key VARCHAR(255) GENERATED ALWAYS AS (organization_name_key(name)) STORED,
+            late_cutoff TIME,
+            timezone VARCHAR(64),
+            expected_days SMALLINT[],
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id, date)
+            UNIQUE (org_type, name_key)
         )
         """)
+        cursor.execute("""
+        ALTER TABLE users
+            ADD COLUMN IF NOT EXISTS company_id INTEGER REFERENCES organizations(id),
+            ADD COLUMN IF NOT EXISTS school_id INTEGER REFERENCES organizations(id)
+        """)
+        
+        # Attendance table, range partitioned by month (see partitioning.py)
+        cursor.execute("SELECT to_regclass('attendance')")
+        if cursor.fetchone()[0] is None:
+            cursor.execute(attendance_table_sql())
+        if is_partitioned(cursor):
+            ensure_partitions(cursor)
+        else:
+            print("Note: attendance is not partitioned yet. Run: python partitioning.py migrate")
         
         # Sessions table (for additional security)
         cursor.execute("""
@@ -101,12 +184,93 @@ def create_tables():
         )
         """)
         
+        # Server-side session store (session_store.py): data and sliding expiry
+        cursor.execute("""
+        ALTER TABLE user_sessions
+            ADD COLUMN IF NOT EXISTS data JSONB NOT NULL DEFAULT '{}'::jsonb,
+            ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        """)
+        
+        # Revoked API tokens (token_auth.py); rows either name one token or cut off a user
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS token_revocations (
+            id BIGSERIAL PRIMARY KEY,
+            jti VARCHAR(64),
+            user_id INTEGER NOT NULL,
+            revoked_before TIMESTAMPTZ,
+            expires_at TIMESTAMPTZ NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CHECK ((jti IS NULL) <> (revoked_before IS NULL))
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_token_revocations_expires ON token_revocations(expires_at)")
+        
+        # Email outbox (drained by email_outbox.py workers)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id BIGSERIAL PRIMARY KEY,
+            recipient VARCHAR(255) NOT NULL,
+            sender VARCHAR(255),
+            subject VARCHAR(255) NOT NULL,
+            html_body TEXT NOT NULL,
+            text_body TEXT,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'sent', 'dead')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            locked_at TIMESTAMP,
+            sent_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        
+        # Roster import jobs (roster_import.py), polled from whichever worker gets the request
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS roster_import_jobs (
+            id VARCHAR(32) PRIMARY KEY,
+            owner_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            status VARCHAR(20) NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'finished', 'failed')),
+            stage VARCHAR(20) NOT NULL DEFAULT 'queued',
+            done INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            result JSONB,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_roster_import_jobs_created ON roster_import_jobs(created_at)")
+        
         # Create indexes for better performance
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_user_date ON attendance(user_id, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_matric ON users(matric_number)")
+        # Organization rosters in name or email order: dashboards and absentee pages walk these
+        # and stop after a page. (org, role) lookups use their prefix, so the plain versions go.
+        cursor.execute("DROP INDEX IF EXISTS idx_users_company")
+        cursor.execute("DROP INDEX IF EXISTS idx_users_school")
+        for org_column in ('company_id', 'school_id'):
+            org = org_column[:-3]
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_users_{org}_name ON users({org_column}, role, full_name, id)")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_users_{org}_email ON users({org_column}, role, email, id)")
+        # Covering index so history pages are index-only scans; rebuild older plain versions once
+        cursor.execute("""
+        SELECT indexdef FROM pg_indexes WHERE indexname = 'idx_attendance_user_date'
+        """)
+        existing_index = cursor.fetchone()
+        if existing_index and 'INCLUDE' not in existing_index[0]:
+            cursor.execute("DROP INDEX idx_attendance_user_date")
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_attendance_user_date
+        ON attendance(user_id, date) INCLUDE (clock_in_time, is_late)
+        """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_token ON user_sessions(session_token)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON user_sessions(user_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON user_sessions(expires_at)")
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(next_attempt_at)
+        WHERE status IN ('pending', 'sending')
+        """)
         
         # Create trigger to update updated_at timestamp
         cursor.execute("""
@@ -129,12 +293,268 @@ def create_tables():
         FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()
         """)
         
+        # Daily attendance rollups for supervisor/lecturer dashboards, kept current by triggers.
+        # Interns count towards their company and students towards their school.
+        # Rollups keyed by organization name predate organizations: drop and rebuild them.
+        cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'organization_member_counts' AND column_name = 'org_name'
+        """)
+        rebuild = cursor.fetchone() is not None
+        if rebuild:
+            cursor.execute("DROP TABLE attendance_daily_rollup, organization_member_counts")
+        
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS organization_member_counts (
+            organization_id INTEGER PRIMARY KEY REFERENCES organizations(id) ON DELETE CASCADE,
+            members INTEGER NOT NULL DEFAULT 0,
+            -- Bumped by every attendance write of the organization; dashboards build ETags from it
+            attendance_version BIGINT NOT NULL DEFAULT 0
+        )
+        """)
+        
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_daily_rollup (
+            organization_id INTEGER NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+            date DATE NOT NULL,
+            present INTEGER NOT NULL DEFAULT 0,
+            late INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (organization_id, date)
+        )
+        """)
+        
+        # Statement-level: a COPY of 100k clock-ins costs one grouped upsert, not 100k
+        cursor.execute("""
+        CREATE OR REPLACE FUNCTION update_attendance_rollup()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            v_users INTEGER[] := '{}';
+        BEGIN
+            -- Rows of users deleted in this transaction were already subtracted by their own trigger
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                v_users := v_users || ARRAY(SELECT DISTINCT user_id FROM old_rows);
+                INSERT INTO attendance_daily_rollup AS r (organization_id, date, present, late)
+                SELECT CASE u.role WHEN 'intern' THEN u.company_id ELSE u.school_id END,
+                       o.date, -COUNT(*), -COUNT(*) FILTER (WHERE o.is_late)
+                FROM old_rows o
+                JOIN users u ON u.id = o.user_id
+                WHERE (u.role = 'intern' AND u.company_id IS NOT NULL) OR (u.role = 'student' AND u.school_id IS NOT NULL)
+                GROUP BY 1, 2
+                ORDER BY 1, 2
+                ON CONFLICT (organization_id, date) DO UPDATE
+                SET present = r.present + EXCLUDED.present,
+                    late = r.late + EXCLUDED.late;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                v_users := v_users || ARRAY(SELECT DISTINCT user_id FROM new_rows);
+                INSERT INTO attendance_daily_rollup AS r (organization_id, date, present, late)
+                SELECT CASE u.role WHEN 'intern' THEN u.company_id ELSE u.school_id END,
+                       n.date, COUNT(*), COUNT(*) FILTER (WHERE n.is_late)
+                FROM new_rows n
+                JOIN users u ON u.id = n.user_id
+                WHERE (u.role = 'intern' AND u.company_id IS NOT NULL) OR (u.role = 'student' AND u.school_id IS NOT NULL)
+                GROUP BY 1, 2
+                ORDER BY 1, 2
+                ON CONFLICT (organization_id, date) DO UPDATE
+                SET present = r.present + EXCLUDED.present,
+                    late = r.late + EXCLUDED.late;
+            END IF;
+            
+            -- One version bump per organization touched by the statement, in key order
+            INSERT INTO organization_member_counts AS c (organization_id, attendance_version)
+            SELECT DISTINCT CASE u.role WHEN 'intern' THEN u.company_id ELSE u.school_id END, 1
+            FROM users u
+            WHERE u.id = ANY(v_users)
+              AND ((u.role = 'intern' AND u.company_id IS NOT NULL) OR (u.role = 'student' AND u.school_id IS NOT NULL))
+            ORDER BY 1
+            ON CONFLICT (organization_id) DO UPDATE
+            SET attendance_version = c.attendance_version + 1;
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql'
+        """)
+        
+        # Clock-ins are pushed to live supervisor dashboards (live_events.py).
+        # Bulk statements send one 'refresh' per organization instead of a flood.
+        cursor.execute("""
+        CREATE OR REPLACE FUNCTION notify_attendance_insert()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF (SELECT COUNT(*) FROM new_rows) <= 100 THEN
+                PERFORM pg_notify('attendance_events', json_build_object(
+                    'type', 'clock_in',
+                    'organization_id', CASE u.role WHEN 'intern' THEN u.company_id ELSE u.school_id END,
+                    'user_id', n.user_id,
+                    'full_name', u.full_name,
+                    'date', n.date,
+                    'clock_in_time', n.clock_in_time,
+                    'is_late', n.is_late
+                )::text)
+                FROM new_rows n
+                JOIN users u ON u.id = n.user_id
+                WHERE (u.role = 'intern' AND u.company_id IS NOT NULL) OR (u.role = 'student' AND u.school_id IS NOT NULL);
+            ELSE
+                PERFORM pg_notify('attendance_events', json_build_object(
+                    'type', 'refresh', 'organization_id', o.organization_id
+                )::text)
+                FROM (
+                    SELECT DISTINCT CASE u.role WHEN 'intern' THEN u.company_id ELSE u.school_id END AS organization_id
+                    FROM new_rows n
+                    JOIN users u ON u.id = n.user_id
+                    WHERE (u.role = 'intern' AND u.company_id IS NOT NULL) OR (u.role = 'student' AND u.school_id IS NOT NULL)
+                ) o;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql'
+        """)
+        
+        create_attendance_triggers(cursor)
+        cursor.execute("DROP FUNCTION IF EXISTS bump_attendance_rollup(INTEGER, DATE, BOOLEAN, INTEGER)")
+        
+        # company/school stay as display names; the ids are resolved (and organizations
+        # created) from them, so every insert path keeps working with plain names
+        cursor.execute("""
+        CREATE OR REPLACE FUNCTION organization_id_for(p_type VARCHAR, p_name VARCHAR)
+        RETURNS INTEGER AS $$
+        DECLARE
+            v_id INTEGER;
+        BEGIN
+            IF p_name IS NULL OR btrim(p_name) = '' THEN
+                RETURN NULL;
+            END IF;
+            SELECT id INTO v_id FROM organizations
+            WHERE org_type = p_type AND name_key = organization_name_key(p_name);
+            IF v_id IS NULL THEN
+                INSERT INTO organizations (org_type, name) VALUES (p_type, btrim(p_name))
+                ON CONFLICT (org_type, name_key) DO UPDATE SET name = organizations.name
+                RETURNING id INTO v_id;
+            END IF;
+            RETURN v_id;
+        END;
+        $$ language 'plpgsql'
+        """)
+        
+        cursor.execute("""
+        CREATE OR REPLACE FUNCTION resolve_user_organizations()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.company_id IS DISTINCT FROM OLD.company_id
+               OR TG_OP = 'INSERT' AND NEW.company_id IS NOT NULL THEN
+                NEW.company := (SELECT name FROM organizations WHERE id = NEW.company_id);
+            ELSIF TG_OP = 'INSERT' OR NEW.company IS DISTINCT FROM OLD.company
+                  OR (NEW.company_id IS NULL AND NEW.company IS NOT NULL) THEN
+                NEW.company_id := organization_id_for('company', NEW.company);
+                IF NEW.company_id IS NOT NULL THEN
+                    NEW.company := (SELECT name FROM organizations WHERE id = NEW.company_id);
+                END IF;
+            END IF;
+            
+            IF TG_OP = 'UPDATE' AND NEW.school_id IS DISTINCT FROM OLD.school_id
+               OR TG_OP = 'INSERT' AND NEW.school_id IS NOT NULL THEN
+                NEW.school := (SELECT name FROM organizations WHERE id = NEW.school_id);
+            ELSIF TG_OP = 'INSERT' OR NEW.school IS DISTINCT FROM OLD.school
+                  OR (NEW.school_id IS NULL AND NEW.school IS NOT NULL) THEN
+                NEW.school_id := organization_id_for('school', NEW.school);
+                IF NEW.school_id IS NOT NULL THEN
+                    NEW.school := (SELECT name FROM organizations WHERE id = NEW.school_id);
+                END IF;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ language 'plpgsql'
+        """)
+        
+        cursor.execute("DROP TRIGGER IF EXISTS users_resolve_organizations ON users")
+        cursor.execute("""
+        CREATE TRIGGER users_resolve_organizations
+        BEFORE INSERT OR UPDATE OF company, school, company_id, school_id ON users
+        FOR EACH ROW EXECUTE FUNCTION resolve_user_organizations()
+        """)
+        
+        cursor.execute("""
+        CREATE OR REPLACE FUNCTION update_organization_members()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            v_old_id INTEGER;
+            v_new_id INTEGER;
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                v_old_id := CASE OLD.role WHEN 'intern' THEN OLD.company_id WHEN 'student' THEN OLD.school_id END;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                v_new_id := CASE NEW.role WHEN 'intern' THEN NEW.company_id WHEN 'student' THEN NEW.school_id END;
+            END IF;
+            
+            IF v_old_id IS NOT DISTINCT FROM v_new_id THEN
+                RETURN NULL;
+            END IF;
+            
+            IF v_old_id IS NOT NULL THEN
+                UPDATE organization_member_counts SET members = members - 1
+                WHERE organization_id = v_old_id;
+            END IF;
+            IF v_new_id IS NOT NULL THEN
+                INSERT INTO organization_member_counts (organization_id, members)
+                VALUES (v_new_id, 1)
+                ON CONFLICT (organization_id) DO UPDATE
+                SET members = organization_member_counts.members + 1;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql'
+        """)
+        
+        # Listing company/school too: a BEFORE trigger changing the ids does not count as a SET target
+        cursor.execute("DROP TRIGGER IF EXISTS users_organization_members ON users")
+        cursor.execute("""
+        CREATE TRIGGER users_organization_members
+        AFTER INSERT OR DELETE OR UPDATE OF role, company, school, company_id, school_id ON users
+        FOR EACH ROW EXECUTE FUNCTION update_organization_members()
+        """)
+        
+        # A deleted user's attendance is cascaded away after the user row is gone,
+        # so take it out of the rollups while the user's organization is still known
+        cursor.execute("""
+        CREATE OR REPLACE FUNCTION remove_user_attendance_rollup()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF (OLD.role = 'intern' AND OLD.company_id IS NOT NULL) OR (OLD.role = 'student' AND OLD.school_id IS NOT NULL) THEN
+                UPDATE attendance_daily_rollup r
+                SET present = r.present - d.present, late = r.late - d.late
+                FROM (
+                    SELECT date, COUNT(*) AS present, COUNT(*) FILTER (WHERE is_late) AS late
+                    FROM attendance WHERE user_id = OLD.id
+                    GROUP BY date
+                ) d
+                WHERE r.organization_id = CASE OLD.role WHEN 'intern' THEN OLD.company_id ELSE OLD.school_id END
+                  AND r.date = d.date;
+            END IF;
+            RETURN OLD;
+        END;
+        $$ language 'plpgsql'
+        """)
+        
+        cursor.execute("DROP TRIGGER IF EXISTS users_remove_attendance_rollup ON users")
+        cursor.execute("""
+        CREATE TRIGGER users_remove_attendance_rollup
+        BEFORE DELETE ON users
+        FOR EACH ROW EXECUTE FUNCTION remove_user_attendance_rollup()
+        """)
+        
+        if migrate_organizations(cursor):
+            rebuild = True
+        
         conn.commit()
         cursor.close()
         conn.close()
         
         print("All tables created successfully!")
         
+        if rebuild:
+            # Outside the schema transaction: the rebuild locks and re-reads everything
+            rebuild_rollups()
+        
     except Exception as e:
         print(f"Error creating tables: {e}")
         raise
@@ -0,0 +1,214 @@
+import os
+import json
+import select
+import threading
+from collections import deque
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Channel the attendance_notify_insert trigger publishes on (see init_db.py)
+CHANNEL = 'attendance_events'
+
+SSE_HEARTBEAT = float(os.getenv('SSE_HEARTBEAT', 15))  # seconds between keep-alive comments
+# Each open stream holds a server thread; gunicorn.conf.py defaults this to half of GUNICORN_THREADS
+SSE_MAX_SUBSCRIBERS = int(os.getenv('SSE_MAX_SUBSCRIBERS', 1000))
+SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', 100))  # events buffered per slow client
+
+
+class SubscriberLimitError(Exception):
+    """Raised when the process already serves its maximum of streams (SSE_MAX_SUBSCRIBERS)"""
+
+    def __init__(self, message, retry_after=5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Subscription:
+    """One dashboard's event buffer; kept small since hundreds are open at once"""
+
+    __slots__ = ('key', 'events', 'ready', 'overflowed')
+
+    def __init__(self, key):
+        self.key = key
+        self.events = deque(maxlen=SSE_QUEUE_SIZE)
+        self.ready = threading.Event()
+        self.overflowed = False
+
+    def push(self, message):
+        if len(self.events) == self.events.maxlen:
+            # The oldest event is about to be dropped; the client must reload instead
+            self.overflowed = True
+        self.events.append(message)
+        self.ready.set()
+
+    def drain(self):
+        """Return the buffered SSE messages as one string"""
+        self.ready.clear()
+        messages = []
+        while self.events:
+            messages.append(self.events.popleft())
+        if self.overflowed:
+            self.overflowed = False
+            return REFRESH_MESSAGE
+        return ''.join(messages)
+
+
+def format_sse(event, data):
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+REFRESH_MESSAGE = format_sse('refresh', {'type': 'refresh'})
+
+
+class AttendanceEventHub:
+    """Fans attendance NOTIFY messages out to SSE subscribers.
+
+    A single listener thread per process holds one dedicated connection
+    (outside the pool) and LISTENs on CHANNEL. Each notification is routed
+    to the subscriptions of its organization, so pushing a clock-in to every
+    open supervisor dashboard costs no queries at all.
+    """
+
+    def __init__(self, max_subscribers=SSE_MAX_SUBSCRIBERS, heartbeat=SSE_HEARTBEAT):
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+        self._subscribers = {}  # organization id -> set of Subscription
+        self._count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+
+        self.notifications = 0
+        self.delivered = 0
+        self.reconnects = 0
+
+    def subscribe(self, organization_id):
+        """Register a subscription for an organization's events"""
+        subscription = Subscription(organization_id)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise SubscriberLimitError("too many live dashboard connections")
+            self._subscribers.setdefault(subscription.key, set()).add(subscription)
+            self._count += 1
+        self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.key)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.key]
+
+    def publish(self, event):
+        """Deliver an event to every subscription of its organization"""
+        with self._lock:
+            targets = list(self._subscribers.get(event.get('organization_id'), ()))
+        # Encoded once, however many dashboards receive it
+        message = format_sse(event.get('type', 'clock_in'), event)
+        for subscription in targets:
+            subscription.push(message)
+        with self._lock:
+            self.notifications += 1
+            self.delivered += len(targets)
+
+    def _broadcast_refresh(self):
+        """Tell every subscriber to reload; used after events may have been missed"""
+        with self._lock:
+            targets = [s for subscribers in self._subscribers.values() for s in subscribers]
+        for subscription in targets:
+            subscription.push(REFRESH_MESSAGE)
+
+    def stream(self, subscription):
+        """Yield SSE text for a subscription until the client goes away"""
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                if not subscription.ready.wait(self.heartbeat):
+                    # Keeps proxies from closing an idle stream and detects gone clients
+                    yield ": keep-alive\n\n"
+                    continue
+                yield subscription.drain()
+        finally:
+            self.unsubscribe(subscription)
+
+    def _ensure_listener(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stopping.clear()
+                    self._thread = threading.Thread(target=self._listen, name='attendance-listener', daemon=True)
+                    self._thread.start()
+
+    def _connect(self):
+        conn = psycopg2.connect(
+            host=os.getenv('DB_HOST', 'localhost'),
+            database=os.getenv('DB_NAME', 'attendance_db'),
+            user=os.getenv('DB_USER', 'postgres'),
+            password=os.getenv('DB_PASSWORD', 'password'),
+            port=os.getenv('DB_PORT', '5432')
+        )
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return conn
+
+    def _listen(self):
+        backoff = 1
+        connected_before = False
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                if connected_before:
+                    # Notifications sent while we were disconnected are gone
+                    self._broadcast_refresh()
+                connected_before = True
+                backoff = 1
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            event = json.loads(notify.payload)
+                        except ValueError:
+                            continue
+                        self.publish(event)
+            except Exception as e:
+                print(f"Attendance listener error: {e}")
+                with self._lock:
+                    self.reconnects += 1
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def stop(self):
+        self._stopping.set()
+
+    def stats(self):
+        """Subscriber and delivery counters for this process"""
+        with self._lock:
+            return {
+                'subscribers': self._count,
+                'organizations': len(self._subscribers),
+                'listening': bool(self._thread and self._thread.is_alive()),
+                'notifications': self.notifications,
+                'delivered': self.delivered,
+                'reconnects': self.reconnects,
+            }
+
+
+event_hub = AttendanceEventHub()
@@ -0,0 +1,224 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+from flask import g, has_request_context, request
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Queries slower than this are printed with their fingerprint; 0 disables the log
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+# Distinct fingerprints tracked; further ones are counted under "other"
+METRICS_MAX_QUERIES = int(os.getenv('METRICS_MAX_QUERIES', 500))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DB_CALL_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+_COMMENTS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_LITERALS = re.compile(r"'(?:[^']|'')*'|%\(\w+\)s|%s|\$\d+|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+_fingerprints = OrderedDict()
+_fingerprints_lock = threading.Lock()
+
+
+def fingerprint(query):
+    """Normalize a query so every execution of the same statement shares one key.
+
+    Comments are dropped, literals and placeholders become ``?``, value
+    lists collapse to ``(?+)`` and whitespace is squeezed. Results are
+    memoized per query text since the helpers mostly run constant strings.
+    """
+    with _fingerprints_lock:
+        cached = _fingerprints.get(query)
+        if cached is not None:
+            _fingerprints.move_to_end(query)
+            return cached
+    normalized = _COMMENTS.sub(' ', query)
+    normalized = _LITERALS.sub('?', normalized)
+    normalized = _LISTS.sub('(?+)', normalized)
+    normalized = _SPACE.sub(' ', normalized).strip()
+    with _fingerprints_lock:
+        _fingerprints[query] = normalized
+        while len(_fingerprints) > 4 * METRICS_MAX_QUERIES:
+            _fingerprints.popitem(last=False)
+    return normalized
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in Prometheus layout"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, ('le', bound))} {count}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, ('le', '+Inf'))} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]:.6f}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._values = {}
+
+    def inc(self, labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Metrics:
+    """Process-wide query and request metrics, rendered in Prometheus text format.
+
+    Database.add_query_hook(metrics.observe_query) feeds per-fingerprint
+    latency, row and error counts; instrument_app() times every route and
+    counts the DB calls each request made. Gauges (pool usage, caches) are
+    read from registered callbacks at scrape time, so they cost nothing
+    between scrapes.
+    """
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, max_queries=METRICS_MAX_QUERIES):
+        self.slow_query_ms = slow_query_ms
+        self.max_queries = max_queries
+        self._lock = threading.Lock()
+        self._queries = set()
+        self._gauges = []  # (prefix, callback returning a dict of numbers)
+        self.started_at = time.time()
+
+        self.query_duration = Histogram(
+            'chronotrack_db_query_duration_seconds', 'Database helper query latency by fingerprint',
+            ('query',), LATENCY_BUCKETS)
+        self.query_rows = Counter(
+            'chronotrack_db_query_rows_total', 'Rows returned or affected by fingerprint', ('query',))
+        self.query_errors = Counter(
+            'chronotrack_db_query_errors_total', 'Failed queries by fingerprint and exception', ('query', 'error'))
+        self.slow_queries = Counter(
+            'chronotrack_db_slow_queries_total', 'Queries slower than SLOW_QUERY_MS', ('query',))
+        self.request_duration = Histogram(
+            'chronotrack_http_request_duration_seconds', 'Request latency by route (time to response headers)',
+            ('route', 'method', 'status'), LATENCY_BUCKETS)
+        self.request_db_calls = Histogram(
+            'chronotrack_http_request_db_calls', 'Database helper calls made per request',
+            ('route',), DB_CALL_BUCKETS)
+
+    def _query_label(self, query):
+        key = fingerprint(query)
+        if key in self._queries:
+            return key
+        if len(self._queries) >= self.max_queries:
+            return 'other'
+        self._queries.add(key)
+        return key
+
+    def observe_query(self, query, seconds, rows, error):
+        """Query hook for Database.add_query_hook"""
+        if has_request_context():
+            g._db_calls = g.get('_db_calls', 0) + 1
+        with self._lock:
+            label = (self._query_label(query),)
+            self.query_duration.observe(label, seconds)
+            if rows is not None and rows > 0:
+                self.query_rows.inc(label, rows)
+            if error is not None:
+                self.query_errors.inc(label + (type(error).__name__,))
+            slow = self.slow_query_ms and seconds * 1000 >= self.slow_query_ms
+            if slow:
+                self.slow_queries.inc(label)
+        if slow:
+            route = request.path if has_request_context() else '-'
+            print(f"Slow query ({seconds * 1000:.1f} ms, {rows} rows, {route}): {label[0]}")
+
+    def add_gauges(self, prefix, callback):
+        """Export the numeric values of ``callback()`` as ``chronotrack_<prefix>_<key>`` gauges"""
+        self._gauges.append((prefix, callback))
+
+    def instrument_app(self, app):
+        """Time every request and count its database calls"""
+
+        @app.before_request
+        def _start_request_timer():
+            g._request_started = time.perf_counter()
+            g._db_calls = 0
+
+        @app.after_request
+        def _record_request(response):
+            started = g.get('_request_started')
+            if started is not None:
+                # Streamed responses (exports, SSE) are timed up to their headers
+                route = request.url_rule.rule if request.url_rule else 'unmatched'
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.request_duration.observe((route, request.method, str(response.status_code)), elapsed)
+                    self.request_db_calls.observe((route,), g.get('_db_calls', 0))
+            return response
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP chronotrack_process_start_time_seconds Unix time the process started",
+            "# TYPE chronotrack_process_start_time_seconds gauge",
+            f"chronotrack_process_start_time_seconds {self.started_at:.0f}",
+        ]
+        for prefix, callback in self._gauges:
+            try:
+                values = callback()
+            except Exception as e:
+                print(f"Metrics gauge {prefix} failed: {e}")
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"chronotrack_{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        with self._lock:
+            for metric in (self.query_duration, self.query_rows, self.query_errors, self.slow_queries,
+                           self.request_duration, self.request_db_calls):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -0,0 +1,147 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import pytz
+from dotenv import load_dotenv
+
+from database import db
+
+load_dotenv()
+
+# Used for organizations that leave a setting unset, and for users without one
+DEFAULT_TIMEZONE = os.getenv('ATTENDANCE_TIMEZONE', 'Africa/Lagos')
+DEFAULT_LATE_CUTOFF = datetime.strptime(os.getenv('LATE_CUTOFF', '09:00:00'), '%H:%M:%S').time()
+DEFAULT_EXPECTED_DAYS = tuple(int(day) for day in os.getenv('EXPECTED_DAYS', '0,1,2,3,4').split(','))  # Monday = 0
+
+ORGANIZATION_CACHE_TTL = float(os.getenv('ORGANIZATION_CACHE_TTL', 60))
+ORGANIZATION_CACHE_SIZE = int(os.getenv('ORGANIZATION_CACHE_SIZE', 4096))
+
+# Interns and supervisors belong to a company, students and lecturers to a school
+ROLE_ORGANIZATIONS = {
+    'intern': 'company',
+    'supervisor': 'company',
+    'student': 'school',
+    'lecturer': 'school',
+}
+
+ORGANIZATION_BY_ID = db.register('organization_by_id', """
+    SELECT id, org_type, name, late_cutoff, timezone, expected_days
+    FROM organizations
+    WHERE id = %s
+""")
+
+
+def organization_id_of(user):
+    """The id of the company or school a user row (or token claims) belongs to"""
+    org_type = ROLE_ORGANIZATIONS.get(user.get('role'))
+    return user.get(f'{org_type}_id') if org_type else None
+
+
+class OrganizationSettings:
+    """Per-organization attendance settings, cached in process.
+
+    Clock-ins and dashboards read the late cutoff, time zone and expected
+    weekdays of the user's organization on every request, so rows are kept
+    for ORGANIZATION_CACHE_TTL seconds; update() drops this process's copy
+    at once and other workers pick the change up when theirs expires.
+    Unset columns fall back to LATE_CUTOFF, ATTENDANCE_TIMEZONE and
+    EXPECTED_DAYS.
+    """
+
+    def __init__(self, ttl=ORGANIZATION_CACHE_TTL, max_size=ORGANIZATION_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # organization id -> (expires_at, settings)
+        self._lock = threading.Lock()
+        self.default = self._settings(None)
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _settings(row):
+        row = row or {}
+        return {
+            'id': row.get('id'),
+            'org_type': row.get('org_type'),
+            'name': row.get('name'),
+            'late_cutoff': row.get('late_cutoff') or DEFAULT_LATE_CUTOFF,
+            'timezone': pytz.timezone(row.get('timezone') or DEFAULT_TIMEZONE),
+            'expected_days': tuple(row.get('expected_days') or DEFAULT_EXPECTED_DAYS),
+        }
+
+    def get(self, organization_id):
+        """Settings of an organization; defaults when the id is None or unknown"""
+        if organization_id is None:
+            return self.default
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(organization_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(organization_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        row = db.execute_prepared_one(ORGANIZATION_BY_ID, (organization_id,))
+        settings = self._settings(row) if row else self.default
+        with self._lock:
+            self._entries[organization_id] = (now + self.ttl, settings)
+            self._entries.move_to_end(organization_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return settings
+
+    def for_user(self, user):
+        return self.get(organization_id_of(user))
+
+    def now(self, settings):
+        """The current time in an organization's time zone"""
+        return datetime.now(settings['timezone'])
+
+    @staticmethod
+    def is_late(settings, clock_in_time):
+        return clock_in_time.time() > settings['late_cutoff']
+
+    @staticmethod
+    def find(org_type, name):
+        """Id of the organization a name refers to, ignoring case and spacing"""
+        row = db.execute_one("""
+            SELECT id FROM organizations
+            WHERE org_type = %s AND name_key = organization_name_key(%s)
+        """, (org_type, name))
+        return row['id'] if row else None
+
+    def update(self, organization_id, **settings):
+        """Change late_cutoff, timezone or expected_days (None restores the default)"""
+        allowed = {'late_cutoff', 'timezone', 'expected_days'}
+        unknown = set(settings) - allowed
+        if unknown:
+            raise ValueError(f"Unknown organization settings: {', '.join(sorted(unknown))}")
+        if settings.get('timezone'):
+            pytz.timezone(settings['timezone'])  # raises UnknownTimeZoneError
+        if settings:
+            assignments = ', '.join(f"{column} = %s" for column in settings)
+            db.execute_query(f"UPDATE organizations SET {assignments} WHERE id = %s",
+                             (*settings.values(), organization_id))
+        self.invalidate(organization_id)
+
+    def invalidate(self, organization_id):
+        with self._lock:
+            self._entries.pop(organization_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+organizations = OrganizationSettings()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Attendance partition management for ChronoTrack
+The attendance table is range partitioned by month on `date`, with a
+default partition catching rows outside every monthly range. This script
+pre-creates upcoming partitions, detaches partitions past the retention
+window, and migrates an existing unpartitioned attendance table online.
+app.py runs the same maintenance on a background thread.
+
+Usage:
+  python partitioning.py maintain   # create upcoming partitions, detach expired ones
+  python partitioning.py migrate    # move an unpartitioned attendance table across
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from datetime import date
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PARTITIONS_AHEAD = int(os.getenv('ATTENDANCE_PARTITIONS_AHEAD', 3))
+RETAIN_MONTHS = int(os.getenv('ATTENDANCE_RETAIN_MONTHS', 0))  # 0 keeps every partition attached
+MIGRATION_BATCH_SIZE = int(os.getenv('ATTENDANCE_MIGRATION_BATCH', 50000))
+MAINTENANCE_INTERVAL = int(os.getenv('ATTENDANCE_MAINTENANCE_INTERVAL', 6 * 3600))
+# pg_advisory_lock key taken by whichever process runs maintenance; the others skip their pass
+MAINTENANCE_LOCK_KEY = 7_201_305_001
+
+PARTITION_NAME = re.compile(r'_y(\d{4})m(\d{2})$')
+
+
+def attendance_table_sql(table='attendance', id_column='id SERIAL'):
+    """DDL for the partitioned attendance table; the partition key must be in every unique key"""
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        {id_column},
+        user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+        date DATE NOT NULL,
+        clock_in_time TIMESTAMP NOT NULL,
+        clock_out_time TIMESTAMP,
+        is_late BOOLEAN DEFAULT FALSE,
+        notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, date),
+        UNIQUE (user_id, date)
+    ) PARTITION BY RANGE (date)
+    """
+
+
+def add_months(month, count):
+    """First day of the month ``count`` months after ``month``"""
+    years, month_index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(month, parent='attendance'):
+    return f"{parent}_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned(cursor, table='attendance'):
+    """Check if ``table`` exists as a partitioned table"""
+    cursor.execute("""
+        SELECT c.relkind FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = %s AND n.nspname = current_schema()
+    """, (table,))
+    row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def list_partitions(cursor, parent='attendance'):
+    """Attached partitions of ``parent`` as {month: name}"""
+    cursor.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = %s
+    """, (parent,))
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def default_partition_name(parent='attendance'):
+    return f"{parent}_default"
+
+
+def ensure_default_partition(cursor, parent='attendance'):
+    """Catch-all partition so a row outside every monthly range is stored instead of rejected"""
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {default_partition_name(parent)} PARTITION OF {parent} DEFAULT")
+
+
+def _create_partition(cursor, parent, month):
+    """Create one monthly partition, moving any of its rows out of the default partition first"""
+    name = partition_name(month, parent)
+    default = default_partition_name(parent)
+    bounds = (month, add_months(month, 1))
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (default,))
+    has_default = cursor.fetchone()[0]
+    if has_default:
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE date >= %s AND date < %s)", bounds)
+        has_default = cursor.fetchone()[0]
+    if not has_default:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} FOR VALUES FROM (%s) TO (%s)", bounds)
+        return
+
+    # Postgres refuses to create a range the default partition already holds rows for,
+    # so park those rows, create the partition and route them back in one transaction.
+    # The rollup trigger sees a delete and an insert per row, which cancel out.
+    conn = cursor.connection
+    autocommit = conn.autocommit
+    conn.autocommit = False
+    try:
+        cursor.execute(f"CREATE TEMP TABLE {name}_overflow (LIKE {parent}) ON COMMIT DROP")
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM {default} WHERE date >= %s AND date < %s RETURNING *
+            )
+            INSERT INTO {name}_overflow SELECT * FROM moved
+        """, bounds)
+        cursor.execute(f"CREATE TABLE {name} PARTITION OF {parent} FOR VALUES FROM (%s) TO (%s)", bounds)
+        cursor.execute(f"INSERT INTO {parent} SELECT * FROM {name}_overflow")
+        if autocommit:
+            conn.commit()
+    except Exception:
+        if autocommit:
+            conn.rollback()
+        raise
+    finally:
+        if autocommit:
+            conn.autocommit = True
+
+
+def ensure_partitions(cursor, parent='attendance', start=None, months_ahead=PARTITIONS_AHEAD):
+    """Create monthly partitions from ``start``'s month through ``months_ahead`` months from now"""
+    ensure_default_partition(cursor, parent)
+    month = (start or date.today()).replace(day=1)
+    last = add_months(date.today().replace(day=1), months_ahead)
+    existing = list_partitions(cursor, parent)
+    created = []
+    while month <= last:
+        if month not in existing:
+            _create_partition(cursor, parent, month)
+            created.append(partition_name(month, parent))
+        month = add_months(month, 1)
+    return created
+
+
+def detach_old_partitions(cursor, parent='attendance', retain_months=RETAIN_MONTHS):
+    """Detach partitions older than the retention window; the tables are kept for archiving"""
+    if retain_months <= 0:
+        return []
+    cutoff = add_months(date.today().replace(day=1), -retain_months)
+    detached = []
+    for month, name in sorted(list_partitions(cursor, parent).items()):
+        if month < cutoff:
+            # CONCURRENTLY is not allowed alongside a default partition, so keep
+            # the brief exclusive lock from queueing clock-ins for long
+            cursor.execute("SET lock_timeout = '5s'")
+            try:
+                cursor.execute(f"ALTER TABLE {parent} DETACH PARTITION {name}")
+            finally:
+                cursor.execute("RESET lock_timeout")
+            detached.append(name)
+    return detached
+
+
+def maintain(cursor):
+    """Routine upkeep, safe to run daily and on application start"""
+    if not is_partitioned(cursor):
+        return [], []
+    return ensure_partitions(cursor), detach_old_partitions(cursor)
+
+
+def maintain_exclusively(cursor):
+    """maintain() while holding the maintenance advisory lock.
+
+    Every gunicorn worker runs maintenance, so only the one that gets the
+    lock does the work; returns None when another process holds it.
+    """
+    cursor.execute("SELECT pg_try_advisory_lock(%s)", (MAINTENANCE_LOCK_KEY,))
+    if not cursor.fetchone()[0]:
+        return None
+    try:
+        return maintain(cursor)
+    finally:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (MAINTENANCE_LOCK_KEY,))
+
+
+def connect():
+    """Dedicated connection for partition management, outside the application pool"""
+    conn = psycopg2.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        database=os.getenv('DB_NAME', 'attendance_db'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'password'),
+        port=os.getenv('DB_PORT', '5432')
+    )
+    conn.autocommit = True
+    return conn
+
+
+def start_maintenance(interval=MAINTENANCE_INTERVAL):
+    """Run maintain_exclusively() now and then every ``interval`` seconds on a daemon thread"""
+    def run():
+        while True:
+            try:
+                conn = connect()
+                try:
+                    done = maintain_exclusively(conn.cursor())
+                    if done and any(done):
+                        print(f"Attendance partitions created: {done[0]}, detached: {done[1]}")
+                finally:
+                    conn.close()
+            except Exception as e:
+                print(f"Attendance partition maintenance failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='partition-maintenance', daemon=True)
+    thread.start()
+    return thread
+
+
+def _copy_batches(cursor, after_id, until_id, batch_size):
+    """Copy attendance rows with after_id < id <= until_id into attendance_partitioned"""
+    while after_id < until_id:
+        upper = min(after_id + batch_size, until_id)
+        cursor.execute("""
+            INSERT INTO attendance_partitioned
+            SELECT id, user_id, date, clock_in_time, clock_out_time, is_late, notes, created_at
+            FROM attendance
+            WHERE id > %s AND id <= %s
+            ON CONFLICT DO NOTHING
+        """, (after_id, upper))
+        after_id = upper
+    return after_id
+
+
+def _copy_missing(cursor):
+    """Copy every attendance row not yet in attendance_partitioned, whatever its id.
+
+    Ids are taken at nextval() but rows become visible at commit, so a row
+    can land below the batch watermark after its batch was copied.
+    """
+    cursor.execute("""
+        INSERT INTO attendance_partitioned
+        SELECT a.id, a.user_id, a.date, a.clock_in_time, a.clock_out_time, a.is_late, a.notes, a.created_at
+        FROM attendance a
+        WHERE NOT EXISTS (
+            SELECT 1 FROM attendance_partitioned p
+            WHERE p.user_id = a.user_id AND p.date = a.date
+        )
+        ON CONFLICT DO NOTHING
+    """)
+    return cursor.rowcount
+
+
+def migrate(conn, batch_size=MIGRATION_BATCH_SIZE):
+    """Move an unpartitioned attendance table to a partitioned one while the app keeps running.
+
+    Rows are copied in id batches while clock-ins continue against the old
+    table. A final transaction blocks writes, copies every row still missing
+    (matched on user and date, not id) and swaps the tables. The old table
+    is kept as attendance_legacy. Rows deleted through a user deletion are
+    removed from both tables by the foreign key; the application never
+    updates or deletes attendance rows directly, so no other change needs
+    replaying.
+    """
+    conn.autocommit = True
+    cursor = conn.cursor()
+    if is_partitioned(cursor):
+        print("attendance is already partitioned")
+        return
+
+    cursor.execute(attendance_table_sql(
+        'attendance_partitioned', "id INTEGER NOT NULL DEFAULT nextval('attendance_id_seq')"
+    ))
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_attendance_partitioned_user_date
+        ON attendance_partitioned(user_id, date) INCLUDE (clock_in_time, is_late)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_partitioned_date ON attendance_partitioned(date)")
+
+    cursor.execute("SELECT MIN(date), COALESCE(MAX(id), 0) FROM attendance")
+    first_date, last_id = cursor.fetchone()
+    ensure_partitions(cursor, 'attendance_partitioned', first_date)
+
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM attendance_partitioned")
+    copied = _copy_batches(cursor, cursor.fetchone()[0], last_id, batch_size)
+    print(f"Copied attendance rows up to id {copied}")
+    # Unlocked catch-up pass so the locked one below has little left to do
+    print(f"Copied {_copy_missing(cursor)} late-committed rows")
+
+    # Final swap: readers keep working, writers wait for a few seconds at most
+    conn.autocommit = False
+    try:
+        cursor.execute("SET LOCAL lock_timeout = '10s'")
+        cursor.execute("LOCK TABLE attendance IN EXCLUSIVE MODE")
+        cursor.execute("SELECT MIN(date) FROM attendance")
+        ensure_partitions(cursor, 'attendance_partitioned', cursor.fetchone()[0])
+        _copy_missing(cursor)
+
+        cursor.execute("ALTER TABLE attendance RENAME TO attendance_legacy")
+        cursor.execute("ALTER INDEX IF EXISTS idx_attendance_user_date RENAME TO idx_attendance_legacy_user_date")
+        cursor.execute("ALTER INDEX IF EXISTS idx_attendance_date RENAME TO idx_attendance_legacy_date")
+        for trigger in ('attendance_rollup', 'attendance_rollup_insert', 'attendance_rollup_delete',
+                        'attendance_rollup_update', 'attendance_notify_insert'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger} ON attendance_legacy")
+        cursor.execute("ALTER TABLE attendance_legacy RENAME CONSTRAINT attendance_pkey TO attendance_legacy_pkey")
+        cursor.execute("ALTER TABLE attendance_legacy RENAME CONSTRAINT attendance_user_id_date_key TO attendance_legacy_user_id_date_key")
+
+        cursor.execute("ALTER TABLE attendance_partitioned RENAME TO attendance")
+        cursor.execute("ALTER INDEX idx_attendance_partitioned_user_date RENAME TO idx_attendance_user_date")
+        cursor.execute("ALTER INDEX idx_attendance_partitioned_date RENAME TO idx_attendance_date")
+        cursor.execute("ALTER TABLE attendance RENAME CONSTRAINT attendance_partitioned_pkey TO attendance_pkey")
+        cursor.execute("ALTER TABLE attendance RENAME CONSTRAINT attendance_partitioned_user_id_date_key TO attendance_user_id_date_key")
+        for month, name in list_partitions(cursor, 'attendance').items():
+            cursor.execute(f"ALTER TABLE {name} RENAME TO {partition_name(month)}")
+        cursor.execute(f"ALTER TABLE {default_partition_name('attendance_partitioned')} RENAME TO {default_partition_name()}")
+        cursor.execute("ALTER SEQUENCE attendance_id_seq OWNED BY attendance.id")
+
+        # Copied rows are already in the rollups; only new writes should reach the triggers
+        from init_db import create_attendance_triggers
+        create_attendance_triggers(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = True
+
+    print("attendance is now partitioned; the old table is kept as attendance_legacy")
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'maintain'
+    conn = connect()
+    try:
+        if command == 'migrate':
+            migrate(conn)
+        elif command == 'maintain':
+            done = maintain_exclusively(conn.cursor())
+            if done is None:
+                print("Maintenance is already running in another process")
+                return
+            created, detached = done
+            print(f"Partitions created: {created or 'none'}")
+            print(f"Partitions detached: {detached or 'none'}")
+        else:
+            print(__doc__)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
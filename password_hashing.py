@@ -0,0 +1,105 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import bcrypt
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+# Stored for accounts created without a password (roster invitations); never verifies
+UNUSABLE_PASSWORD = '!'
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing queue stayed full for the whole wait timeout"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated executor with a bounded queue.
+
+    ``kind`` is 'thread' (bcrypt releases the GIL while hashing, so request
+    threads keep running) or 'process' for full isolation. At most
+    ``workers + queue_size`` jobs are admitted; further callers wait up to
+    ``timeout`` seconds and then get HashingBusyError so a login storm sheds
+    load instead of piling up request threads.
+    """
+
+    def __init__(self, kind='thread', workers=None, queue_size=64, rounds=12, timeout=10):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"unknown hashing executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use so importing the module never spawns workers
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == 'process':
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix='bcrypt'
+                        )
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusyError("password hashing queue is full")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        """Hash a password with the configured cost factor"""
+        return self._run(_hashpw, password.encode('utf-8'), self.rounds).decode('utf-8')
+
+    def verify(self, password, hashed):
+        """Check a password against a stored bcrypt hash"""
+        if not hashed.startswith('$2'):
+            # UNUSABLE_PASSWORD or anything else bcrypt would reject
+            return False
+        return self._run(_checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        """True when a stored hash was made with a different cost factor"""
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    kind=os.getenv('BCRYPT_EXECUTOR', 'thread'),
+    workers=int(os.getenv('BCRYPT_WORKERS', 0)) or None,
+    queue_size=int(os.getenv('BCRYPT_QUEUE_SIZE', 64)),
+    rounds=int(os.getenv('BCRYPT_ROUNDS', 12)),
+    timeout=float(os.getenv('BCRYPT_QUEUE_TIMEOUT', 10))
+)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Rollup rebuild script for ChronoTrack
+Recomputes organization_member_counts and attendance_daily_rollup from the
+users and attendance tables. Run it once after upgrading to backfill history,
+or any time the rollups are suspected to have drifted.
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Existing rows keep their attendance_version (bumped separately); new ones start past
+# the (0, 0) that get_attendance_version reports for an organization without a row
+MEMBER_COUNTS_SQL = """
+INSERT INTO organization_member_counts AS c (organization_id, members, attendance_version)
+SELECT CASE role WHEN 'intern' THEN company_id ELSE school_id END, COUNT(*), 1
+FROM users
+WHERE (role = 'intern' AND company_id IS NOT NULL) OR (role = 'student' AND school_id IS NOT NULL)
+GROUP BY 1
+ON CONFLICT (organization_id) DO UPDATE SET members = EXCLUDED.members
+"""
+
+DAILY_ROLLUP_SQL = """
+INSERT INTO attendance_daily_rollup (organization_id, date, present, late)
+SELECT CASE u.role WHEN 'intern' THEN u.company_id ELSE u.school_id END AS organization_id,
+       a.date,
+       COUNT(*) AS present,
+       COUNT(*) FILTER (WHERE a.is_late) AS late
+FROM attendance a
+JOIN users u ON a.user_id = u.id
+WHERE (u.role = 'intern' AND u.company_id IS NOT NULL) OR (u.role = 'student' AND u.school_id IS NOT NULL)
+GROUP BY 1, 2
+"""
+
+def rebuild_rollups():
+    """Rebuild all rollups in one transaction so dashboards never see a half-built table"""
+    try:
+        conn = psycopg2.connect(
+            host=os.getenv('DB_HOST', 'localhost'),
+            database=os.getenv('DB_NAME', 'attendance_db'),
+            user=os.getenv('DB_USER', 'postgres'),
+            password=os.getenv('DB_PASSWORD', 'password'),
+            port=os.getenv('DB_PORT', '5432')
+        )
+        cursor = conn.cursor()
+        
+        # Block concurrent clock-ins and user changes so no trigger update is lost
+        cursor.execute("LOCK TABLE users, attendance IN SHARE MODE")
+        cursor.execute("TRUNCATE attendance_daily_rollup")
+        # Versions only move forward, so an ETag from before the rebuild never matches after it
+        cursor.execute("UPDATE organization_member_counts SET members = 0, attendance_version = attendance_version + 1")
+        
+        cursor.execute(MEMBER_COUNTS_SQL)
+        print(f"Organizations counted: {cursor.rowcount}")
+        
+        cursor.execute(DAILY_ROLLUP_SQL)
+        print(f"Daily rollup rows written: {cursor.rowcount}")
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+    except Exception as e:
+        print(f"Error rebuilding rollups: {e}")
+        raise
+
+if __name__ == "__main__":
+    print("Rebuilding attendance rollups...")
+    rebuild_rollups()
+    print("Rollup rebuild complete!")
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Bulk roster import for schools and companies
+Reads a CSV or XLSX roster (email, full_name, matric_number, programme,
+level and an optional initial password per row), validates it, skips
+addresses that already have accounts with one query, hashes any initial
+passwords across a process pool, loads the users with COPY and queues an
+invitation email per new user, all in one transaction.
+
+Usage: python roster_import.py roster.csv (--school NAME | --company NAME) [--base-url URL]
+"""
+
+import io
+import os
+import re
+import csv
+import json
+import time
+import uuid
+import argparse
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+
+from database import db
+from password_hashing import _hashpw, password_hasher, UNUSABLE_PASSWORD
+from email_templates import email_templates
+from email_outbox import enqueue_emails, notify_outbox
+from auth_utils import AuthUtils
+
+load_dotenv()
+
+ROSTER_MAX_ROWS = int(os.getenv('ROSTER_MAX_ROWS', 50000))
+ROSTER_HASH_WORKERS = int(os.getenv('ROSTER_HASH_WORKERS', 0)) or None  # None = one per CPU core
+ROSTER_INVITE_DAYS = int(os.getenv('ROSTER_INVITE_DAYS', 7))
+ROSTER_JOBS_KEEP_DAYS = int(os.getenv('ROSTER_JOBS_KEEP_DAYS', 7))
+ROSTER_JOB_STALE_SECONDS = int(os.getenv('ROSTER_JOB_STALE_SECONDS', 600))  # no progress for this long = worker died
+
+# Members of each organization type, as on the dashboards
+ROSTER_ROLES = {'school': 'student', 'company': 'intern'}
+
+# Header spellings accepted for each column
+COLUMN_ALIASES = {
+    'email': 'email', 'email_address': 'email',
+    'full_name': 'full_name', 'fullname': 'full_name', 'name': 'full_name',
+    'matric_number': 'matric_number', 'matric': 'matric_number', 'matric_no': 'matric_number',
+    'programme': 'programme', 'program': 'programme',
+    'level': 'level',
+    'password': 'password', 'initial_password': 'password',
+}
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class RosterError(ValueError):
+    """The roster file as a whole cannot be imported"""
+
+
+def _normalize_header(header):
+    key = re.sub(r'[\s\-]+', '_', str(header or '').strip().lower())
+    return COLUMN_ALIASES.get(key)
+
+
+def _rows_from_table(table):
+    """Turn an iterator of cell lists (header first) into row dicts"""
+    try:
+        header = next(table)
+    except StopIteration:
+        raise RosterError("The roster is empty")
+    columns = [_normalize_header(h) for h in header]
+    if 'email' not in columns or 'full_name' not in columns:
+        raise RosterError("The roster needs email and full_name columns")
+    rows = []
+    for cells in table:
+        if not any(cell not in (None, '') for cell in cells):
+            continue
+        if len(rows) >= ROSTER_MAX_ROWS:
+            raise RosterError(f"At most {ROSTER_MAX_ROWS} rows per roster")
+        rows.append({
+            column: str(cell).strip() if cell is not None else ''
+            for column, cell in zip(columns, cells) if column
+        })
+    return rows
+
+
+def read_roster(fileobj, filename):
+    """Parse a CSV or XLSX roster into a list of row dicts"""
+    if filename.lower().endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise RosterError("XLSX rosters need openpyxl (pip install openpyxl); upload a CSV instead")
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            return _rows_from_table(iter(workbook.active.iter_rows(values_only=True)))
+        finally:
+            workbook.close()
+    data = fileobj.read()
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    return _rows_from_table(csv.reader(io.StringIO(data)))
+
+
+def validate_rows(rows):
+    """Split rows into valid ones and per-row errors (row numbers count the header as 1)"""
+    valid, errors, seen = [], [], set()
+    for number, row in enumerate(rows, start=2):
+        email = row.get('email', '').lower()
+        if not EMAIL_PATTERN.match(email):
+            errors.append({'row': number, 'email': email, 'message': 'Invalid email address'})
+        elif email in seen:
+            errors.append({'row': number, 'email': email, 'message': 'Email appears more than once in the roster'})
+        elif not row.get('full_name'):
+            errors.append({'row': number, 'email': email, 'message': 'Missing full_name'})
+        elif row.get('password') and len(row['password']) < 6:
+            errors.append({'row': number, 'email': email, 'message': 'Password must be at least 6 characters'})
+        else:
+            seen.add(email)
+            valid.append(dict(row, email=email, row=number))
+    return valid, errors
+
+
+def existing_emails(emails):
+    """The subset of ``emails`` that already belong to an account, in one query"""
+    rows = db.execute_query("SELECT email FROM users WHERE email = ANY(%s)", (list(emails),), fetch=True)
+    return {row['email'] for row in rows}
+
+
+def hash_passwords(passwords, rounds, progress=None, workers=ROSTER_HASH_WORKERS):
+    """bcrypt a list of passwords across a process pool, keeping order"""
+    if not passwords:
+        return []
+    hashed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(passwords) // ((workers or os.cpu_count() or 1) * 8))
+        results = executor.map(_hashpw, (p.encode('utf-8') for p in passwords), [rounds] * len(passwords),
+                               chunksize=chunksize)
+        for result in results:
+            hashed.append(result.decode('utf-8'))
+            if progress and len(hashed) % 100 == 0:
+                progress('hashing', len(hashed), len(passwords))
+    return hashed
+
+
+def _copy_users(cursor, users):
+    """COPY new users through a staging table; returns {email: id} of the rows inserted"""
+    cursor.execute("""
+        CREATE TEMP TABLE roster_staging (
+            email VARCHAR(255), password_hash VARCHAR(255), role VARCHAR(50), full_name VARCHAR(255),
+            company VARCHAR(255), school VARCHAR(255), programme VARCHAR(255), level VARCHAR(50),
+            matric_number VARCHAR(100), verification_code VARCHAR(10),
+            reset_token VARCHAR(255), reset_token_expires TIMESTAMP
+        ) ON COMMIT DROP
+    """)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for user in users:
+        writer.writerow(['' if value is None else value for value in user])
+    buffer.seek(0)
+    cursor.copy_expert("COPY roster_staging FROM STDIN WITH (FORMAT csv)", buffer)
+    # A concurrent registration may have taken an address since the dedupe query
+    cursor.execute("""
+        INSERT INTO users (email, password_hash, role, full_name, company, school, programme, level,
+                           matric_number, verification_code, reset_token, reset_token_expires)
+        SELECT email, password_hash, role, full_name, company, school, programme, level,
+               matric_number, verification_code, reset_token, reset_token_expires
+        FROM roster_staging
+        ON CONFLICT (email) DO NOTHING
+        RETURNING id, email
+    """)
+    return {email: user_id for user_id, email in cursor.fetchall()}
+
+
+def import_roster(rows, org_type, org_name, base_url, sender=None, progress=None):
+    """Create accounts for a roster and queue their invitations.
+
+    Every new user gets an invitation link (the reset-password page with a
+    token valid ROSTER_INVITE_DAYS days) to choose a password; rows with an
+    initial password can also sign in with it right away. ``progress`` is
+    called as progress(stage, done, total). Returns a summary dict.
+    """
+    if org_type not in ROSTER_ROLES or not org_name:
+        raise RosterError("A roster is imported into one school or company")
+    progress = progress or (lambda stage, done, total: None)
+    started = time.perf_counter()
+
+    progress('validating', 0, len(rows))
+    valid, errors = validate_rows(rows)
+    taken = existing_emails([row['email'] for row in valid]) if valid else set()
+    new_rows = [row for row in valid if row['email'] not in taken]
+    progress('validating', len(rows), len(rows))
+
+    with_password = [row for row in new_rows if row.get('password')]
+    hashes = hash_passwords([row['password'] for row in with_password], password_hasher.rounds, progress)
+    password_hashes = {row['email']: hashed for row, hashed in zip(with_password, hashes)}
+
+    expires_at = datetime.utcnow() + timedelta(days=ROSTER_INVITE_DAYS)
+    role = ROSTER_ROLES[org_type]
+    users, tokens = [], {}
+    for row in new_rows:
+        tokens[row['email']] = AuthUtils.generate_reset_token()
+        users.append((
+            row['email'], password_hashes.get(row['email'], UNUSABLE_PASSWORD), role, row['full_name'],
+            org_name if org_type == 'company' else None, org_name if org_type == 'school' else None,
+            row.get('programme') or None, row.get('level') or None, row.get('matric_number') or None,
+            AuthUtils.generate_verification_code(), tokens[row['email']], expires_at,
+        ))
+
+    created = {}
+    if users:
+        progress('inserting', 0, len(users))
+        conn = db.get_connection()
+        try:
+            conn.autocommit = False
+            cursor = conn.cursor()
+            created = _copy_users(cursor, users)
+            progress('inserting', len(users), len(users))
+
+            # Invitations commit with the accounts they announce
+            rendered = email_templates.render_batch('invitation', (
+                {'full_name': row['full_name'], 'invite_url': f"{base_url}/reset-password?token={tokens[row['email']]}"}
+                for row in new_rows if row['email'] in created
+            ), org_name=org_name, expires_days=ROSTER_INVITE_DAYS)
+            invited = [row['email'] for row in new_rows if row['email'] in created]
+            enqueue_emails(cursor, [
+                (email, sender, subject, html_body, text_body)
+                for email, (subject, html_body, text_body) in zip(invited, rendered)
+            ])
+            progress('inviting', len(invited), len(invited))
+            conn.commit()
+            cursor.close()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            db.return_connection(conn)
+        notify_outbox()
+
+    skipped = [
+        {'row': row['row'], 'email': row['email'], 'message': 'Email already registered'}
+        for row in valid if row['email'] not in created
+    ]
+    summary = {
+        'rows': len(rows),
+        'created': len(created),
+        'skipped': len(skipped),
+        'invalid': len(errors),
+        'errors': errors + skipped,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    progress('done', len(rows), len(rows))
+    return summary
+
+
+class RosterImportJobs:
+    """Roster imports running in background threads, polled for progress.
+
+    Job state lives in roster_import_jobs so any worker can answer a poll;
+    jobs older than ROSTER_JOBS_KEEP_DAYS are dropped when a new one starts.
+    """
+
+    def __init__(self, keep_days=ROSTER_JOBS_KEEP_DAYS, stale_after=ROSTER_JOB_STALE_SECONDS):
+        self.keep_days = keep_days
+        self.stale_after = stale_after
+
+    def start(self, owner_id, rows, org_type, org_name, base_url, sender=None):
+        job_id = uuid.uuid4().hex
+        db.execute_query("DELETE FROM roster_import_jobs WHERE created_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 day'",
+                         (self.keep_days,))
+        db.execute_query("""
+            INSERT INTO roster_import_jobs (id, owner_id, status, stage, done, total)
+            VALUES (%s, %s, 'running', 'queued', 0, %s)
+        """, (job_id, owner_id, len(rows)))
+        last = {'stage': 'queued', 'at': 0.0}
+
+        def progress(stage, done, total):
+            # One write per stage change and at most one a second within a stage
+            now = time.monotonic()
+            if stage == last['stage'] and done < total and now - last['at'] < 1:
+                return
+            last.update(stage=stage, at=now)
+            db.execute_query("""
+                UPDATE roster_import_jobs SET stage = %s, done = %s, total = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (stage, done, total, job_id))
+
+        def run():
+            try:
+                result = import_roster(rows, org_type, org_name, base_url, sender, progress)
+                db.execute_query("""
+                    UPDATE roster_import_jobs SET status = 'finished', result = %s::jsonb, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                """, (json.dumps(result), job_id))
+            except Exception as e:
+                print(f"Roster import {job_id} failed: {e}")
+                try:
+                    db.execute_query("""
+                        UPDATE roster_import_jobs SET status = 'failed', error = %s, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = %s
+                    """, (str(e), job_id))
+                except Exception as e:
+                    print(f"Could not record roster import {job_id} failure: {e}")
+
+        threading.Thread(target=run, name=f'roster-import-{job_id[:8]}', daemon=True).start()
+        return job_id
+
+    def get(self, job_id, owner_id):
+        """A job's state, or None if unknown or someone else's.
+
+        A running job that has not reported for ``stale_after`` seconds died
+        with its worker and is reported as failed.
+        """
+        return db.execute_one("""
+            SELECT id,
+                   CASE WHEN status = 'running' AND updated_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second'
+                        THEN 'failed' ELSE status END AS status,
+                   stage, done, total, result,
+                   CASE WHEN status = 'running' AND updated_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second'
+                        THEN 'Import stopped before finishing' ELSE error END AS error
+            FROM roster_import_jobs
+            WHERE id = %s AND owner_id = %s
+        """, (self.stale_after, self.stale_after, job_id, owner_id), primary=True)
+
+
+roster_jobs = RosterImportJobs()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a school or company roster")
+    parser.add_argument('roster', help="CSV or XLSX file")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--school')
+    group.add_argument('--company')
+    parser.add_argument('--base-url', default=os.getenv('BASE_URL', 'http://localhost:5001'))
+    args = parser.parse_args()
+
+    org_type, org_name = ('school', args.school) if args.school else ('company', args.company)
+    with open(args.roster, 'rb') as f:
+        rows = read_roster(f, args.roster)
+
+    def progress(stage, done, total):
+        print(f"\r{stage:>10}: {done:,}/{total:,}", end='\n' if stage == 'done' else '', flush=True)
+
+    summary = import_roster(rows, org_type, org_name, args.base_url, os.getenv('MAIL_USERNAME'), progress)
+    for error in summary['errors']:
+        print(f"Row {error['row']} ({error['email']}): {error['message']}")
+    print(f"✅ {summary['created']:,} created, {summary['skipped']:,} already registered, "
+          f"{summary['invalid']:,} invalid in {summary['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+import os
+import json
+import time
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import Signer, BadSignature
+from werkzeug.datastructures import CallbackDict
+from dotenv import load_dotenv
+
+from database import db
+
+load_dotenv()
+
+SESSION_LIFETIME = int(os.getenv('SESSION_LIFETIME', 7 * 24 * 3600))  # seconds of inactivity before a session ends
+SESSION_TOUCH_INTERVAL = int(os.getenv('SESSION_TOUCH_INTERVAL', 300))  # extend expiry at most this often
+SESSION_FLUSH_INTERVAL = float(os.getenv('SESSION_FLUSH_INTERVAL', 5))  # seconds between batched expiry writes
+SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', 30))  # seconds a cached session is trusted
+SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', 10000))
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', 600))
+SESSION_SWEEP_CHUNK = int(os.getenv('SESSION_SWEEP_CHUNK', 1000))
+
+# user_sessions timestamps are UTC without a time zone; the store works in unix time.
+# Read from the primary: the session may have been created by the previous request
+SESSION_BY_TOKEN = db.register('session_by_token', """
+    SELECT id, user_id, data,
+           EXTRACT(EPOCH FROM expires_at)::float8 AS expires_at
+    FROM user_sessions
+    WHERE session_token = %s
+""", primary=True)
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session data kept in user_sessions; the cookie holds only a signed token"""
+
+    def __init__(self, initial=None, token=None, user_id=None, session_id=None):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.token = token
+        self.session_id = session_id
+        self.initial_user_id = user_id
+        self.new = token is None
+        self.modified = False
+
+
+class SessionStore:
+    """user_sessions rows behind a bounded in-process TTL cache.
+
+    A cached session is trusted for SESSION_CACHE_TTL seconds, so a check
+    on a hit is a hash and a dict lookup. Expiry slides on use, but an
+    extension is only queued once the session was last extended
+    SESSION_TOUCH_INTERVAL seconds ago, and queued extensions are written
+    in one UPDATE every SESSION_FLUSH_INTERVAL seconds. A sweeper deletes
+    expired rows in chunks. Sessions revoked on another worker stop
+    working there once its cached copy expires.
+    """
+
+    def __init__(self, lifetime=SESSION_LIFETIME, touch_interval=SESSION_TOUCH_INTERVAL,
+                 cache_ttl=SESSION_CACHE_TTL, cache_size=SESSION_CACHE_SIZE):
+        self.lifetime = lifetime
+        self.touch_interval = min(touch_interval, lifetime)
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # token hash -> session entry
+        self._touches = {}  # token hash -> new expiry, waiting for flush()
+        self._lock = threading.Lock()
+        self._threads = None
+
+        self.hits = 0
+        self.misses = 0
+        self.touches = 0
+        self.flushed = 0
+        self.swept = 0
+
+    @staticmethod
+    def _key(token):
+        # Only a hash of the token is stored, so a leaked table cannot be replayed
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _remember(self, key, entry):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+            self._touches.pop(key, None)
+
+    def load(self, token):
+        """The live session entry for a token, or None"""
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry['cached_at'] + self.cache_ttl > now:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                entry = None
+                self.misses += 1
+
+        if entry is None:
+            row = db.execute_prepared_one(SESSION_BY_TOKEN, (key,))
+            if row is None:
+                self._forget(key)
+                return None
+            entry = {
+                'id': row['id'],
+                'user_id': row['user_id'],
+                'data': row['data'] or {},
+                'expires_at': row['expires_at'],
+                'cached_at': now,
+            }
+            with self._lock:
+                # A queued extension is newer than the row
+                entry['expires_at'] = max(entry['expires_at'], self._touches.get(key, 0))
+            self._remember(key, entry)
+
+        if entry['expires_at'] <= now:
+            self._forget(key)
+            return None
+        if entry['expires_at'] - now < self.lifetime - self.touch_interval:
+            with self._lock:
+                entry['expires_at'] = now + self.lifetime
+                self._touches[key] = entry['expires_at']
+                self.touches += 1
+        return entry
+
+    def create(self, data):
+        """Store a new session and return its token"""
+        token = secrets.token_urlsafe(32)
+        key = self._key(token)
+        expires_at = time.time() + self.lifetime
+        row = db.execute_one("""
+            INSERT INTO user_sessions (user_id, session_token, data, expires_at, last_seen_at)
+            VALUES (%s, %s, %s::jsonb, to_timestamp(%s) AT TIME ZONE 'UTC', CURRENT_TIMESTAMP AT TIME ZONE 'UTC')
+            RETURNING id
+        """, (data.get('user_id'), key, json.dumps(data), expires_at))
+        self._remember(key, {
+            'id': row['id'],
+            'user_id': data.get('user_id'),
+            'data': dict(data),
+            'expires_at': expires_at,
+            'cached_at': time.time(),
+        })
+        return token
+
+    def update(self, token, data):
+        """Replace a session's data"""
+        key = self._key(token)
+        db.execute_query("UPDATE user_sessions SET data = %s::jsonb WHERE session_token = %s",
+                         (json.dumps(data), key))
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                entry['data'] = dict(data)
+
+    def destroy(self, token):
+        """End one session (logout)"""
+        key = self._key(token)
+        self._forget(key)
+        db.execute_query("DELETE FROM user_sessions WHERE session_token = %s", (key,))
+
+    def revoke(self, user_id, session_id=None):
+        """End one or all of a user's sessions; returns how many were ended"""
+        if session_id is None:
+            rows = db.execute_query("DELETE FROM user_sessions WHERE user_id = %s RETURNING session_token",
+                                    (user_id,), fetch=True)
+        else:
+            rows = db.execute_query("DELETE FROM user_sessions WHERE user_id = %s AND id = %s RETURNING session_token",
+                                    (user_id, session_id), fetch=True)
+        for row in rows:
+            self._forget(row['session_token'])
+        return len(rows)
+
+    def active_sessions(self, user_id):
+        """A user's unexpired sessions, most recently used first"""
+        self.flush()
+        return db.execute_query("""
+            SELECT id, created_at, last_seen_at, expires_at
+            FROM user_sessions
+            WHERE user_id = %s AND expires_at > CURRENT_TIMESTAMP AT TIME ZONE 'UTC'
+            ORDER BY last_seen_at DESC
+        """, (user_id,), fetch=True)
+
+    def flush(self):
+        """Write queued expiry extensions in one statement"""
+        with self._lock:
+            touches, self._touches = self._touches, {}
+        if not touches:
+            return 0
+        db.execute_query("""
+            UPDATE user_sessions s
+            SET expires_at = to_timestamp(t.expires_at) AT TIME ZONE 'UTC',
+                last_seen_at = to_timestamp(t.expires_at - %s) AT TIME ZONE 'UTC'
+            FROM unnest(%s::text[], %s::float8[]) AS t(session_token, expires_at)
+            WHERE s.session_token = t.session_token AND s.expires_at < to_timestamp(t.expires_at) AT TIME ZONE 'UTC'
+        """, (self.lifetime, list(touches), list(touches.values())))
+        with self._lock:
+            self.flushed += len(touches)
+        return len(touches)
+
+    def sweep(self, chunk=SESSION_SWEEP_CHUNK):
+        """Delete expired sessions, ``chunk`` rows per statement to keep locks short"""
+        deleted = 0
+        while True:
+            count = db.execute_query("""
+                DELETE FROM user_sessions
+                WHERE id IN (
+                    SELECT id FROM user_sessions
+                    WHERE expires_at < CURRENT_TIMESTAMP AT TIME ZONE 'UTC'
+                    ORDER BY expires_at
+                    LIMIT %s
+                )
+            """, (chunk,))
+            deleted += count
+            if count < chunk:
+                break
+        with self._lock:
+            self.swept += deleted
+        return deleted
+
+    def start(self, flush_interval=SESSION_FLUSH_INTERVAL, sweep_interval=SESSION_SWEEP_INTERVAL):
+        """Flush expiry extensions and sweep expired rows on daemon threads"""
+        def every(interval, task, label):
+            def run():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        task()
+                    except Exception as e:
+                        print(f"Session {label} failed: {e}")
+            return threading.Thread(target=run, name=f'session-{label}', daemon=True)
+
+        with self._lock:
+            if self._threads is not None:
+                return self._threads
+            self._threads = [every(flush_interval, self.flush, 'flush'),
+                             every(sweep_interval, self.sweep, 'sweep')]
+        for thread in self._threads:
+            thread.start()
+        return self._threads
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cached': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'pending_touches': len(self._touches),
+                'touches': self.touches,
+                'flushed': self.flushed,
+                'swept': self.swept,
+            }
+
+
+session_store = SessionStore()
+
+
+class DatabaseSessionInterface(SessionInterface):
+    """Flask sessions backed by session_store.
+
+    The cookie carries a random token signed with SECRET_KEY, so forged
+    cookies are rejected without a lookup. Rows are only written for
+    sessions that hold data, and a login on an existing session gets a
+    fresh token.
+    """
+
+    def __init__(self, store=session_store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='chronotrack-session')
+
+    def cookie_value(self, app, token):
+        return self._signer(app).sign(token).decode()
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return ServerSession()
+        try:
+            token = self._signer(app).unsign(cookie).decode()
+        except BadSignature:
+            return ServerSession()
+        entry = self.store.load(token)
+        if entry is None:
+            return ServerSession()
+        return ServerSession(entry['data'], token=token, user_id=entry['user_id'], session_id=entry['id'])
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.token is not None:
+                self.store.destroy(session.token)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified and session.token is not None:
+            return
+
+        data = dict(session)
+        if session.token is None or data.get('user_id') != session.initial_user_id:
+            # New session, or a different user signed in on this one: never reuse the token
+            if session.token is not None:
+                self.store.destroy(session.token)
+            session.token = self.store.create(data)
+            session.session_id = None
+            session.initial_user_id = data.get('user_id')
+        else:
+            self.store.update(session.token, data)
+
+        response.set_cookie(
+            name,
+            self.cookie_value(app, session.token),
+            expires=self.get_expiration_time(app, session),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            httponly=self.get_cookie_httponly(app),
+            samesite=self.get_cookie_samesite(app),
+        )
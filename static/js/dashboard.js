@@ -161,52 +161,85 @@ function renderSupervisorDashboard(container) {
         </div>
     `;
 
-    fetch('/api/dashboard_data')
-        .then(res => res.json())
-        .then(data => {
-            const summaryContainer = document.getElementById('summary-cards');
-            const tableBody = document.getElementById('attendance-table-body');
-            
-            const presentCount = data.present ? data.present.length : 0;
-            const totalCount = data.all_interns_count || 0;
-            const onTimeCount = data.present ? data.present.filter(p => !p.is_late).length : 0;
-
-            summaryContainer.innerHTML = `
-                <div class="summary-card card">
-                    <h3>Present Today</h3>
-                    <div class="count">${presentCount} / ${totalCount}</div>
-                </div>
-                <div class="summary-card card">
-                    <h3>On Time</h3>
-                    <div class="count">${onTimeCount}</div>
-                </div>
-                <div class="summary-card card">
-                    <h3>Late</h3>
-                    <div class="count">${presentCount - onTimeCount}</div>
-                </div>
-            `;
-            
-            if (data.present && presentCount > 0) {
-                let tableHtml = '';
-                data.present.sort((a, b) => new Date(a.clock_in_time) - new Date(b.clock_in_time));
-                data.present.forEach(rec => {
-                    const clockIn = new Date(rec.clock_in_time);
-                    tableHtml += `
-                        <tr>
-                            <td>${rec.full_name}</td>
-                            <td>${clockIn.toLocaleTimeString()}</td>
-                            <td>${rec.is_late ? '<span class="late-tag">Late</span>' : '<span class="ontime-tag">On Time</span>'}</td>
-                        </tr>
-                    `;
-                });
-                tableBody.innerHTML = tableHtml;
-            } else {
-                tableBody.innerHTML = `<tr><td colspan="3" style="text-align:center;">No one has clocked in today.</td></tr>`;
+    let state = null;
+
+    function renderSupervisorData(data) {
+        const summaryContainer = document.getElementById('summary-cards');
+        const tableBody = document.getElementById('attendance-table-body');
+        
+        const summary = data.summary || {};
+        const presentCount = summary.present ?? (data.present ? data.present.length : 0);
+        const totalCount = summary.total ?? (data.all_interns_count || 0);
+        const onTimeCount = summary.on_time ?? (data.present ? data.present.filter(p => !p.is_late).length : 0);
+
+        summaryContainer.innerHTML = `
+            <div class="summary-card card">
+                <h3>Present Today</h3>
+                <div class="count">${presentCount} / ${totalCount}</div>
+            </div>
+            <div class="summary-card card">
+                <h3>On Time</h3>
+                <div class="count">${onTimeCount}</div>
+            </div>
+            <div class="summary-card card">
+                <h3>Late</h3>
+                <div class="count">${presentCount - onTimeCount}</div>
+            </div>
+        `;
+        
+        if (data.present && presentCount > 0) {
+            let tableHtml = '';
+            data.present.sort((a, b) => new Date(a.clock_in_time) - new Date(b.clock_in_time));
+            data.present.forEach(rec => {
+                const clockIn = new Date(rec.clock_in_time);
+                tableHtml += `
+                    <tr>
+                        <td>${rec.full_name}</td>
+                        <td>${clockIn.toLocaleTimeString()}</td>
+                        <td>${rec.is_late ? '<span class="late-tag">Late</span>' : '<span class="ontime-tag">On Time</span>'}</td>
+                    </tr>
+                `;
+            });
+            tableBody.innerHTML = tableHtml;
+        } else {
+            tableBody.innerHTML = `<tr><td colspan="3" style="text-align:center;">No one has clocked in today.</td></tr>`;
+        }
+    }
+
+    function loadSupervisorData() {
+        return fetch('/api/dashboard_data')
+            .then(res => res.json())
+            .then(data => {
+                state = data;
+                renderSupervisorData(state);
+            })
+            .catch(error => {
+                console.error('Error loading supervisor dashboard:', error);
+                document.getElementById('summary-cards').innerHTML = `<p>Error loading dashboard data.</p>`;
+                document.getElementById('attendance-table-body').innerHTML = `<tr><td colspan="3" style="text-align:center;">Error loading attendance data.</td></tr>`;
+            });
+    }
+
+    // New arrivals are pushed over server-sent events; no polling needed
+    loadSupervisorData().then(() => {
+        if (!window.EventSource) return;
+        const events = new EventSource('/api/dashboard/stream');
+        events.addEventListener('clock_in', (e) => {
+            const rec = JSON.parse(e.data);
+            if (!state || !state.summary) {
+                loadSupervisorData();
+                return;
             }
-        })
-        .catch(error => {
-            console.error('Error loading supervisor dashboard:', error);
-            document.getElementById('summary-cards').innerHTML = `<p>Error loading dashboard data.</p>`;
-            document.getElementById('attendance-table-body').innerHTML = `<tr><td colspan="3" style="text-align:center;">Error loading attendance data.</td></tr>`;
+            // Back-dated kiosk uploads do not change today's view
+            if (rec.date !== state.date) return;
+            state.present = state.present || [];
+            state.present.push({ full_name: rec.full_name, clock_in_time: rec.clock_in_time, is_late: rec.is_late });
+            state.summary.present += 1;
+            state.summary.late += rec.is_late ? 1 : 0;
+            state.summary.on_time = state.summary.present - state.summary.late;
+            renderSupervisorData(state);
         });
+        // Sent after bulk uploads or missed events: reload the whole view
+        events.addEventListener('refresh', () => loadSupervisorData());
+    });
 }
\ No newline at end of file
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Absentee list test script
+Seeds a large company with most interns clocked in today, walks every page
+of AttendanceManager.get_absentees in each sort order, and checks with
+EXPLAIN that a page is read in order from the organization's name/email
+index and probes attendance by key, without sorting or scanning users.
+Requires a database initialized with init_db.py
+"""
+
+import json
+import time
+from datetime import date, datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _plan_nodes(child)
+
+def _explain(db, query, params):
+    """EXPLAIN (FORMAT JSON) exactly the query get_absentees would run"""
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            plan = cur.fetchone()[0]
+            return json.loads(plan) if isinstance(plan, str) else plan
+    finally:
+        db.return_connection(conn)
+
+def test_absentees(members=50000, page_size=100):
+    """Walk every page in every sort and verify the plan and first-page time"""
+    print("🧪 Testing absentee list...")
+    
+    from database import db
+    from attendance_manager import AttendanceManager, ABSENTEE_SORTS
+    
+    tag = f"absent-test-{datetime.now().timestamp()}"
+    users = db.execute_query("""
+        INSERT INTO users (email, password_hash, role, full_name, company, email_verified)
+        SELECT %s || '-' || g || '@chronotrack.test', 'x', 'intern',
+               'Intern ' || md5(g::text), %s, TRUE
+        FROM generate_series(1, %s) g
+        RETURNING id, company_id
+    """, (tag, f"{tag} Company", members), fetch=True)
+    user_ids = [u['id'] for u in users]
+    organization_id = users[0]['company_id']
+    today = date.today()
+    
+    try:
+        # Everyone but one intern in ten is in today
+        db.execute_query("""
+            INSERT INTO attendance (user_id, date, clock_in_time, is_late)
+            SELECT id, %s, now(), FALSE FROM unnest(%s::int[]) AS id
+            WHERE id %% 10 <> 0
+        """, (today, user_ids))
+        db.execute_query("VACUUM ANALYZE users")
+        db.execute_query("VACUUM ANALYZE attendance")
+        expected = {i for i in user_ids if i % 10 == 0}
+        
+        for sort, (column, direction) in ABSENTEE_SORTS.items():
+            # Compare against the database's own ordering, which follows its collation
+            ordered = db.execute_query(f"""
+                SELECT id FROM users WHERE id = ANY(%s) AND id %% 10 = 0
+                ORDER BY {column} {direction}, id {direction}
+            """, (user_ids,), fetch=True)
+            seen, cursor, pages = [], None, 0
+            while True:
+                records, cursor = AttendanceManager.get_absentees(
+                    'company', organization_id, today, sort, cursor, page_size
+                )
+                seen.extend(r['id'] for r in records)
+                pages += 1
+                if not cursor:
+                    break
+            
+            print(f"📄 {sort}: {pages} pages, {len(seen)} absentees")
+            if set(seen) != expected or len(seen) != len(expected):
+                print(f"❌ {sort}: pages overlapped or skipped absentees")
+                return False
+            if seen != [r['id'] for r in ordered]:
+                print(f"❌ {sort}: absentees out of order")
+                return False
+        
+        deep_record = {'id': max(expected), 'full_name': 'Intern 8', 'email': f"{tag}-5@chronotrack.test"}
+        for sort in ABSENTEE_SORTS:
+            for label, cursor in (('first page', None),
+                                  ('deep page', AttendanceManager.encode_absentee_cursor(sort, deep_record))):
+                query, params = AttendanceManager.absentee_query(
+                    'company', organization_id, today, sort, cursor, page_size
+                )
+                nodes = list(_plan_nodes(_explain(db, query, params)[0]['Plan']))
+                node_types = [n['Node Type'] for n in nodes]
+                user_indexes = {n.get('Index Name') for n in nodes if n.get('Relation Name') == 'users'} - {None}
+                print(f"🗺️ {sort} {label}: {' -> '.join(node_types)} using {user_indexes}")
+                
+                if 'Sort' in node_types or any(n['Node Type'] == 'Seq Scan' and n.get('Relation Name') == 'users'
+                                               for n in nodes):
+                    print(f"❌ {sort} {label}: query sorts or scans users")
+                    return False
+                if not user_indexes <= {'idx_users_company_name', 'idx_users_company_email'} or not user_indexes:
+                    print(f"❌ {sort} {label}: query does not use the company name/email index")
+                    return False
+        
+        timings = []
+        for _ in range(50):
+            started = time.perf_counter()
+            AttendanceManager.get_absentees('company', organization_id, today, 'name', None, page_size)
+            timings.append(time.perf_counter() - started)
+        p50 = sorted(timings)[len(timings) // 2] * 1000
+        print(f"⏱️ First page of {page_size} from {members} members: p50 {p50:.2f}ms")
+        if p50 > 10:
+            print("❌ First page took longer than 10ms")
+            return False
+        
+        print("✅ Absentee list is index-backed, complete and ordered!")
+        return True
+    finally:
+        db.execute_query("DELETE FROM users WHERE id = ANY(%s)", (user_ids,))
+        db.execute_query("DELETE FROM organizations WHERE id = %s", (organization_id,))
+
+if __name__ == "__main__":
+    test_absentees()
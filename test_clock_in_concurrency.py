@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Clock-in concurrency test script
+Fires many simultaneous clock-ins for one user and checks that exactly one
+succeeds, none error, and a single attendance row is written.
+Requires a database initialized with init_db.py
+"""
+
+import threading
+from datetime import datetime
+
+import pytz
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def test_concurrent_clock_in(concurrency=50):
+    """Race many clock-ins for the same user on the same day"""
+    print(f"🧪 Testing {concurrency} concurrent clock-ins for one user...")
+    
+    from database import db
+    from attendance_manager import AttendanceManager
+    
+    email = f"clockin-race-{datetime.now().timestamp()}@chronotrack.test"
+    user = db.execute_one("""
+        INSERT INTO users (email, password_hash, role, full_name, email_verified)
+        VALUES (%s, 'x', 'intern', 'Race Test', TRUE)
+        RETURNING id
+    """, (email,))
+    user_id = user['id']
+    
+    now = datetime.now(pytz.timezone('Africa/Lagos'))
+    barrier = threading.Barrier(concurrency)
+    results, errors = [], []
+    
+    def worker():
+        try:
+            barrier.wait()
+            created, _ = AttendanceManager.clock_in(user_id, now)
+            results.append(created)
+        except Exception as e:
+            errors.append(e)
+    
+    try:
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        rows = db.execute_one(
+            "SELECT COUNT(*) AS count FROM attendance WHERE user_id = %s AND date = %s",
+            (user_id, now.date())
+        )
+        
+        print(f"✅ Created: {results.count(True)}")
+        print(f"🔁 Already clocked in: {results.count(False)}")
+        print(f"❌ Errors: {len(errors)}")
+        print(f"📋 Attendance rows: {rows['count']}")
+        
+        if errors:
+            print(f"❌ First error: {errors[0]}")
+            return False
+        if results.count(True) != 1 or rows['count'] != 1:
+            print("❌ Expected exactly one successful clock-in")
+            return False
+        
+        print("✅ Concurrent clock-ins handled correctly!")
+        return True
+    finally:
+        db.execute_query("DELETE FROM users WHERE id = %s", (user_id,))
+
+if __name__ == "__main__":
+    test_concurrent_clock_in()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Conditional dashboard polling test script
+Polls /api/dashboard_data and /api/session_data as a supervisor and an
+intern, repeats each poll with If-None-Match and checks that an unchanged
+repeat answers 304 without running a single attendance or rollup query, and
+that a clock-in changes the ETag again.
+Requires a database initialized with init_db.py
+"""
+
+from datetime import datetime
+
+import pytz
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class QueryRecorder:
+    """Records the SQL sent through the db helpers, prepared statements included"""
+
+    METHODS = ('execute_query', 'execute_one', 'execute_prepared', 'execute_prepared_one')
+
+    def __init__(self, db):
+        self.db = db
+        self.queries = []
+
+    def _wrap(self, method):
+        original = getattr(self.db, method)
+        prepared = method.startswith('execute_prepared')
+
+        def recorded(query, *args, **kwargs):
+            self.queries.append(self.db.statements[query].query if prepared else query)
+            return original(query, *args, **kwargs)
+        return recorded
+
+    def __enter__(self):
+        self._originals = {m: getattr(self.db, m) for m in self.METHODS}
+        for method in self.METHODS:
+            setattr(self.db, method, self._wrap(method))
+        return self
+
+    def __exit__(self, *exc):
+        for method, original in self._originals.items():
+            setattr(self.db, method, original)
+
+    def attendance_queries(self):
+        return [q for q in self.queries if 'attendance ' in q or 'attendance_daily_rollup' in q]
+
+def _poll(client, path, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.get(path, headers=headers)
+
+def test_conditional_get():
+    """An unchanged repeat poll is a 304 that touches no attendance data"""
+    print("🧪 Testing conditional dashboard polling...")
+
+    from app import app
+    from database import db
+    from attendance_manager import AttendanceManager
+
+    company = f"ETag Test {datetime.now().timestamp()}"
+    slug = company.replace(' ', '-').lower()
+    supervisor = db.execute_one("""
+        INSERT INTO users (email, password_hash, role, full_name, company, email_verified)
+        VALUES (%s, 'x', 'supervisor', 'ETag Supervisor', %s, TRUE)
+        RETURNING id
+    """, (f"{slug}@chronotrack.test", company))
+    intern = db.execute_one("""
+        INSERT INTO users (email, password_hash, role, full_name, company, email_verified)
+        VALUES (%s, 'x', 'intern', 'ETag Intern', %s, TRUE)
+        RETURNING id
+    """, (f"{slug}-intern@chronotrack.test", company))
+    user_ids = [supervisor['id'], intern['id']]
+
+    ok = True
+    try:
+        for label, user_id in (('supervisor', supervisor['id']), ('intern', intern['id'])):
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['user_id'] = user_id
+
+            for path in ('/api/dashboard_data', '/api/session_data'):
+                first = _poll(client, path)
+                etag = first.headers.get('ETag')
+                if first.status_code != 200 or not etag:
+                    print(f"❌ {label} {path}: first poll returned {first.status_code} without an ETag")
+                    ok = False
+                    continue
+
+                with QueryRecorder(db) as recorder:
+                    repeat = _poll(client, path, etag)
+                if repeat.status_code != 304 or repeat.data:
+                    print(f"❌ {label} {path}: unchanged repeat returned {repeat.status_code}")
+                    ok = False
+                elif recorder.attendance_queries():
+                    print(f"❌ {label} {path}: 304 still ran {len(recorder.attendance_queries())} attendance queries")
+                    ok = False
+                else:
+                    print(f"✅ {label} {path}: 304 after {len(recorder.queries)} queries, none on attendance")
+
+        # A clock-in must change the dashboard ETag for both roles
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = supervisor['id']
+        etag = _poll(client, '/api/dashboard_data').headers.get('ETag')
+        AttendanceManager.clock_in(intern['id'], datetime.now(pytz.timezone('Africa/Lagos')))
+        after = _poll(client, '/api/dashboard_data', etag)
+        if after.status_code != 200 or after.get_json()['summary']['present'] != 1:
+            print(f"❌ Dashboard poll after a clock-in returned {after.status_code}, expected fresh data")
+            ok = False
+        else:
+            print("✅ A clock-in invalidates the dashboard ETag")
+
+        if ok:
+            print("✅ Conditional polling works!")
+        return ok
+    finally:
+        db.execute_query("DELETE FROM users WHERE id = ANY(%s)", (user_ids,))
+        db.execute_query("DELETE FROM organizations WHERE org_type = 'company' AND name = %s", (company,))
+
+if __name__ == "__main__":
+    test_conditional_get()
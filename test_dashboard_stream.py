@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Live dashboard stream test script
+Serves the app on a local port, opens a few hundred concurrent SSE
+subscriptions for one company, clocks interns in and checks that every
+subscriber receives every clock-in pushed through LISTEN/NOTIFY. Reports the
+server's memory cost per open subscriber.
+Requires a database initialized with init_db.py
+
+Usage: python test_dashboard_stream.py [subscribers] [clock_ins]
+"""
+
+import sys
+import time
+import socket
+import selectors
+import threading
+import tracemalloc
+from datetime import datetime
+
+import pytz
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+def _wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+def test_dashboard_stream(subscribers=300, clock_ins=5):
+    """Fan clock-ins out to many SSE subscribers and measure memory per stream"""
+    print(f"🧪 Testing {subscribers} live dashboard subscribers...")
+
+    from werkzeug.serving import make_server
+    from app import app
+    from database import db
+    from attendance_manager import AttendanceManager
+    from live_events import event_hub
+    from session_store import session_store
+
+    event_hub.heartbeat = 1  # notice closed clients quickly
+    company = f"Stream Test {datetime.now().timestamp()}"
+    supervisor = db.execute_one("""
+        INSERT INTO users (email, password_hash, role, full_name, company, email_verified)
+        VALUES (%s, 'x', 'supervisor', 'Stream Supervisor', %s, TRUE)
+        RETURNING id
+    """, (f"{company.replace(' ', '-').lower()}@chronotrack.test", company))
+    interns = db.execute_query("""
+        INSERT INTO users (email, password_hash, role, full_name, company, email_verified)
+        SELECT %s || '-' || g || '@chronotrack.test', 'x', 'intern', 'Intern ' || g, %s, TRUE
+        FROM generate_series(1, %s) g
+        RETURNING id
+    """, (company.replace(' ', '-').lower(), company, clock_ins), fetch=True)
+    user_ids = [supervisor['id']] + [u['id'] for u in interns]
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    cookie = app.session_interface.cookie_value(app, session_store.create({'user_id': supervisor['id']}))
+    request = (
+        f"GET /api/dashboard/stream HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+        f"Cookie: {app.config['SESSION_COOKIE_NAME']}={cookie}\r\nAccept: text/event-stream\r\n\r\n"
+    ).encode()
+
+    sockets = []
+    received = {}
+    selector = selectors.DefaultSelector()
+    stop_reading = threading.Event()
+
+    def read_streams():
+        # One thread reads every client socket, so clients add almost nothing to the measurement
+        while not stop_reading.is_set():
+            for key, _ in selector.select(timeout=0.2):
+                try:
+                    data = key.fileobj.recv(65536)
+                except OSError:
+                    data = b''
+                if data:
+                    received[key.fileobj] += data
+
+    try:
+        # Warm up imports, the user cache and the listener before measuring
+        warm = socket.create_connection(('127.0.0.1', port))
+        warm.sendall(request)
+        warm.recv(1024)
+        warm.close()
+        _wait_for(lambda: event_hub.stats()['subscribers'] == 0, 5)
+
+        tracemalloc.start()
+        rss_before = _rss_kb()
+        traced_before = tracemalloc.get_traced_memory()[0]
+
+        for _ in range(subscribers):
+            sock = socket.create_connection(('127.0.0.1', port))
+            sock.sendall(request)
+            sock.setblocking(False)
+            received[sock] = bytearray()
+            selector.register(sock, selectors.EVENT_READ)
+            sockets.append(sock)
+        reader = threading.Thread(target=read_streams, daemon=True)
+        reader.start()
+
+        if not _wait_for(lambda: event_hub.stats()['subscribers'] == subscribers, 30):
+            print(f"❌ Only {event_hub.stats()['subscribers']} of {subscribers} subscriptions opened")
+            return False
+
+        rss_per = (_rss_kb() - rss_before) / subscribers
+        traced_per = (tracemalloc.get_traced_memory()[0] - traced_before) / 1024 / subscribers
+        tracemalloc.stop()
+        print(f"💾 Memory per subscriber: {rss_per:.1f} KB RSS, {traced_per:.1f} KB Python heap")
+
+        started = time.perf_counter()
+        now = datetime.now(pytz.timezone('Africa/Lagos'))
+        for user_id in user_ids[1:]:
+            AttendanceManager.clock_in(user_id, now)
+
+        delivered = lambda: all(buf.count(b'event: clock_in') >= clock_ins for buf in received.values())
+        ok = _wait_for(delivered, 30)
+        elapsed = time.perf_counter() - started
+        counts = [buf.count(b'event: clock_in') for buf in received.values()]
+        print(f"📨 Events per subscriber: min {min(counts)}, max {max(counts)} (expected {clock_ins})")
+        print(f"⏱️ All {subscribers * clock_ins:,} deliveries in {elapsed * 1000:.0f} ms")
+        if not ok:
+            print("❌ Some subscribers missed clock-ins")
+            return False
+
+        stop_reading.set()
+        reader.join()
+        for sock in sockets:
+            selector.unregister(sock)
+            sock.close()
+        if not _wait_for(lambda: event_hub.stats()['subscribers'] == 0, 10):
+            print(f"❌ {event_hub.stats()['subscribers']} subscriptions leaked after clients closed")
+            return False
+
+        print("✅ Live dashboard fan-out works!")
+        return True
+    finally:
+        stop_reading.set()
+        for sock in sockets:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        server.shutdown()
+        db.execute_query("DELETE FROM users WHERE id = ANY(%s)", (user_ids,))
+        db.execute_query("DELETE FROM organizations WHERE org_type = 'company' AND name = %s", (company,))
+
+if __name__ == "__main__":
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    clock_ins = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    test_dashboard_stream(subscribers, clock_ins)
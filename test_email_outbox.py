@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Email outbox test script
+Delivers queued emails to a local aiosmtpd stand-in instead of a real provider.
+Requires a database initialized with init_db.py and: pip install aiosmtpd
+"""
+
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def test_email_outbox(message_count=20, workers=2):
+    """Queue emails and check the workers deliver them over reused connections"""
+    print("🧪 Testing Email Outbox...")
+    
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        print("❌ aiosmtpd is not installed. Run: pip install aiosmtpd")
+        return False
+    
+    from database import db
+    from email_outbox import EmailOutboxWorker, SMTPSender, enqueue_email
+    
+    class CollectingHandler:
+        def __init__(self):
+            self.messages = []
+            self.sessions = set()
+        
+        async def handle_DATA(self, server, session, envelope):
+            self.messages.append(envelope)
+            self.sessions.add(id(session))
+            return '250 Message accepted for delivery'
+    
+    handler = CollectingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=8025)
+    controller.start()
+    
+    worker = EmailOutboxWorker(
+        {'server': '127.0.0.1', 'port': 8025, 'use_tls': False},
+        default_sender='noreply@chronotrack.test',
+        workers=workers,
+        poll_interval=0.2
+    )
+    
+    try:
+        tag = f"outbox-test-{int(time.time())}"
+        ids = [
+            enqueue_email(f"user{i}@chronotrack.test", tag, f"<p>Message {i}</p>", text_body=f"Message {i}")
+            for i in range(message_count)
+        ]
+        print(f"📬 Queued {len(ids)} emails")
+        
+        worker.start()
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            row = db.execute_one(
+                "SELECT COUNT(*) AS count FROM email_outbox WHERE id = ANY(%s) AND status = 'sent'",
+                (ids,)
+            )
+            if row['count'] == len(ids):
+                break
+            time.sleep(0.2)
+        worker.stop()
+        
+        delivered = [m for m in handler.messages if tag.encode() in m.content]
+        print(f"📨 Delivered: {len(delivered)}/{message_count}")
+        print(f"🔌 SMTP sessions used: {len(handler.sessions)} (workers: {workers})")
+        
+        if len(delivered) != message_count:
+            print("❌ Not every queued email was delivered")
+            return False
+        if len(handler.sessions) > workers:
+            print("❌ Workers opened more SMTP sessions than expected")
+            return False
+        
+        # A refused recipient must be dead-lettered rather than retried forever
+        class RejectingHandler:
+            async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+                return '550 No such user'
+        
+        controller.stop()
+        controller = Controller(RejectingHandler(), hostname='127.0.0.1', port=8025)
+        controller.start()
+        
+        dead_id = enqueue_email("missing@chronotrack.test", tag, "<p>Bounce</p>")
+        sender = SMTPSender('127.0.0.1', 8025, use_tls=False)
+        while worker.process_batch(sender):
+            pass
+        sender.close()
+        row = db.execute_one("SELECT status FROM email_outbox WHERE id = %s", (dead_id,))
+        if row['status'] != 'dead':
+            print(f"❌ Refused email ended in status '{row['status']}', expected 'dead'")
+            return False
+        
+        print("✅ Email outbox works correctly!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Email outbox test failed: {str(e)}")
+        return False
+    finally:
+        worker.stop()
+        controller.stop()
+
+if __name__ == "__main__":
+    test_email_outbox()
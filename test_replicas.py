@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Read replica routing test script
+Checks that reads go to a replica, that a request reads its own writes from
+the primary, and that a replica whose replay is paused leaves rotation once
+it falls DB_REPLICA_MAX_LAG seconds behind and rejoins after catching up.
+Requires a database initialized with init_db.py, a streaming standby listed
+in DB_REPLICAS (see README) and a superuser to pause replay.
+"""
+
+import time
+import threading
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _in_thread(task):
+    """Run ``task`` on a new thread, which has no read-after-write stickiness"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=task()))
+    thread.start()
+    thread.join()
+    return result.get('value')
+
+def _wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.2)
+    return False
+
+def _set_replay(replica, paused):
+    conn = replica.pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT pg_wal_replay_{'pause' if paused else 'resume'}()")
+    finally:
+        replica.pool.putconn(conn)
+
+def test_replicas():
+    """Routing, read-your-writes and lag eviction"""
+    print("🧪 Testing read replica routing...")
+    
+    from flask import Flask
+    from database import db
+    
+    if not db.replicas:
+        print("❌ Set DB_REPLICAS to a streaming standby of the primary")
+        return False
+    replica = db.replicas[0]
+    if not _wait_for(lambda: replica.in_rotation, 10):
+        print(f"❌ Replica {replica.name} never joined rotation: {replica.error}")
+        return False
+    
+    email = f"replica-test-{datetime.now().timestamp()}@chronotrack.test"
+    app = Flask(__name__)
+    try:
+        before = db.routing_stats()
+        _in_thread(lambda: db.execute_query("SELECT 1 AS one", fetch=True))
+        if db.routing_stats()['replica_reads'] != before['replica_reads'] + 1:
+            print("❌ A read outside any write did not go to the replica")
+            return False
+        print("✅ Reads go to the replica")
+        
+        with app.test_request_context():
+            db.execute_query("""
+                INSERT INTO users (email, password_hash, role, full_name)
+                VALUES (%s, 'x', 'intern', 'Replica Test')
+            """, (email,))
+            before = db.routing_stats()
+            row = db.execute_one("SELECT id FROM users WHERE email = %s", (email,))
+            if row is None or db.routing_stats()['sticky_reads'] != before['sticky_reads'] + 1:
+                print("❌ A request did not read its own write from the primary")
+                return False
+        print("✅ Requests read their own writes")
+        
+        _set_replay(replica, paused=True)
+        try:
+            db.execute_query("UPDATE users SET full_name = 'Replica Test 2' WHERE email = %s", (email,))
+            if not _wait_for(lambda: not replica.in_rotation, db.max_lag + 10):
+                print(f"❌ Replica stayed in rotation while paused (lag {replica.lag}s)")
+                return False
+            print(f"✅ Lagging replica left rotation (lag {replica.lag:.1f}s)")
+            
+            before = db.routing_stats()
+            _in_thread(lambda: db.execute_query("SELECT 1 AS one", fetch=True))
+            if db.routing_stats()['primary_reads'] != before['primary_reads'] + 1:
+                print("❌ Reads did not fall back to the primary")
+                return False
+        finally:
+            _set_replay(replica, paused=False)
+        
+        if not _wait_for(lambda: replica.in_rotation, db.max_lag + 10):
+            print(f"❌ Replica did not rejoin after catching up: {replica.status()}")
+            return False
+        print("✅ Replica rejoined after catching up")
+        return True
+    finally:
+        db.execute_query("DELETE FROM users WHERE email = %s", (email,))
+
+if __name__ == "__main__":
+    test_replicas()
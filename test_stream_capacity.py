@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Stream capacity test script
+Serves the app from a fixed pool of threads, as a gunicorn gthread worker
+does, opens as many dashboard streams as there are threads and checks that
+the streams beyond SSE_MAX_SUBSCRIBERS get a 503 with Retry-After while an
+intern's clock-in is still answered promptly.
+Requires a database initialized with init_db.py
+
+Usage: python test_stream_capacity.py [threads]
+"""
+
+import sys
+import time
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _pooled_server(app, threads):
+    """A werkzeug server whose requests share ``threads`` threads, like gthread"""
+    from werkzeug.serving import ThreadedWSGIServer
+
+    class PooledWSGIServer(ThreadedWSGIServer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.executor = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.executor.submit(self.process_request_thread, request, client_address)
+
+        def server_close(self):
+            super().server_close()
+            self.executor.shutdown(wait=False)
+
+    return PooledWSGIServer('127.0.0.1', 0, app)
+
+def _status_and_headers(sock):
+    """Read a response's status code and headers"""
+    data = b''
+    while b'\r\n\r\n' not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    head = data.split(b'\r\n\r\n', 1)[0].decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in head[1:] if ': ' in line)
+    return int(head[0].split()[1]), headers
+
+def test_stream_capacity(threads=8):
+    """Fill every thread's worth of streams and check clock-ins still get through"""
+    print(f"🧪 Testing {threads} dashboard streams against {threads} server threads...")
+
+    import threading
+    from app import app
+    from database import db
+    from live_events import event_hub
+    from session_store import session_store
+
+    # What gunicorn.conf.py sets for a worker with this many threads
+    event_hub.max_subscribers = max(1, threads // 2)
+    event_hub.heartbeat = 1  # closed streams give their threads back quickly
+    company = f"Capacity Test {datetime.now().timestamp()}"
+    slug = company.replace(' ', '-').lower()
+    supervisor = db.execute_one("""
+        INSERT INTO users (email, password_hash, role, full_name, company, email_verified)
+        VALUES (%s, 'x', 'supervisor', 'Capacity Supervisor', %s, TRUE)
+        RETURNING id
+    """, (f"{slug}@chronotrack.test", company))
+    intern = db.execute_one("""
+        INSERT INTO users (email, password_hash, role, full_name, company, email_verified)
+        VALUES (%s, 'x', 'intern', 'Capacity Intern', %s, TRUE)
+        RETURNING id
+    """, (f"{slug}-intern@chronotrack.test", company))
+    user_ids = [supervisor['id'], intern['id']]
+
+    server = _pooled_server(app, threads)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    cookie_name = app.config['SESSION_COOKIE_NAME']
+    def cookie_for(user_id):
+        return app.session_interface.cookie_value(app, session_store.create({'user_id': user_id}))
+
+    stream_request = (
+        f"GET /api/dashboard/stream HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+        f"Cookie: {cookie_name}={cookie_for(supervisor['id'])}\r\nAccept: text/event-stream\r\n\r\n"
+    ).encode()
+    clock_in_request = (
+        f"POST /api/clock_in HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+        f"Cookie: {cookie_name}={cookie_for(intern['id'])}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+    ).encode()
+
+    sockets = []
+    try:
+        statuses = []
+        for _ in range(threads):
+            sock = socket.create_connection(('127.0.0.1', port), timeout=10)
+            sock.sendall(stream_request)
+            status, headers = _status_and_headers(sock)
+            statuses.append(status)
+            if status == 200:
+                sockets.append(sock)
+                continue
+            # A refused client goes away; kept alive, werkzeug would hold a thread for it
+            sock.close()
+            if status == 503 and 'Retry-After' not in headers:
+                print("❌ Refused stream has no Retry-After header")
+                return False
+        opened, refused = statuses.count(200), statuses.count(503)
+        print(f"📡 Streams: {opened} open, {refused} refused with 503")
+        if opened != event_hub.max_subscribers or opened + refused != threads:
+            print(f"❌ Expected {event_hub.max_subscribers} open streams and the rest refused")
+            return False
+
+        started = time.perf_counter()
+        sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+        sockets.append(sock)
+        sock.sendall(clock_in_request)
+        try:
+            status, _ = _status_and_headers(sock)
+        except socket.timeout:
+            print("❌ Clock-in got no answer while streams were open")
+            return False
+        elapsed = time.perf_counter() - started
+        print(f"⏱️ Clock-in answered {status} in {elapsed * 1000:.0f} ms")
+        if status != 200:
+            print("❌ Clock-in failed while streams were open")
+            return False
+
+        print("✅ Streams leave threads for API calls!")
+        return True
+    finally:
+        for sock in sockets:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        server.shutdown()
+        server.server_close()
+        db.execute_query("DELETE FROM users WHERE id = ANY(%s)", (user_ids,))
+        db.execute_query("DELETE FROM organizations WHERE org_type = 'company' AND name = %s", (company,))
+
+if __name__ == "__main__":
+    test_stream_capacity(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Transaction test script
+Checks that db.transaction() commits and rolls back as a unit, that a nested
+block rolls back only to its savepoint, that on_commit callbacks run only
+after a commit, and that a request's queries share one pooled connection.
+Requires a database initialized with init_db.py
+"""
+
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _emails(db, tag):
+    rows = db.execute_query("SELECT email FROM users WHERE email LIKE %s ORDER BY email",
+                            (tag + '-%',), fetch=True, primary=True)
+    return [r['email'].split('@')[0][len(tag) + 1:] for r in rows]
+
+def _insert(db, tag, name):
+    db.execute_query("INSERT INTO users (email, password_hash, role, full_name) VALUES (%s, 'x', 'intern', 'Tx Test')",
+                     (f"{tag}-{name}@chronotrack.test",))
+
+def test_transactions():
+    """Commit, rollback, savepoints, on_commit and per-request connections"""
+    print("🧪 Testing transactions...")
+    
+    from flask import Flask
+    from database import db
+    
+    tag = f"tx-test-{datetime.now().timestamp()}"
+    try:
+        committed = []
+        with db.transaction():
+            _insert(db, tag, 'a')
+            db.on_commit(lambda: committed.append('a'))
+            try:
+                with db.transaction():
+                    _insert(db, tag, 'b')
+                    db.on_commit(lambda: committed.append('b'))
+                    raise ValueError("undo b")
+            except ValueError:
+                pass
+            with db.transaction():
+                _insert(db, tag, 'c')
+        if _emails(db, tag) != ['a', 'c'] or committed != ['a']:
+            print(f"❌ Savepoint rollback kept {_emails(db, tag)}, callbacks {committed}")
+            return False
+        print("✅ Nested blocks roll back to their savepoint")
+        
+        try:
+            with db.transaction():
+                _insert(db, tag, 'd')
+                db.on_commit(lambda: committed.append('d'))
+                _insert(db, tag, 'a')  # duplicate email
+        except Exception:
+            pass
+        if _emails(db, tag) != ['a', 'c'] or committed != ['a']:
+            print(f"❌ Failed transaction left {_emails(db, tag)}")
+            return False
+        print("✅ A failed transaction rolls back as a whole")
+        
+        app = Flask(__name__)
+        db.init_app(app)
+        
+        @app.route('/tx-test')
+        def tx_test():
+            db.execute_query("SELECT 1", fetch=True, primary=True)
+            with db.transaction():
+                _insert(db, tag, 'e')
+            db.execute_one("SELECT 1 AS one", primary=True)
+            return 'ok'
+        
+        checkouts = db.pool_stats()['checkouts']
+        in_use = db.pool_stats()['in_use']
+        app.test_client().get('/tx-test')
+        used = db.pool_stats()['checkouts'] - checkouts
+        if used != 1 or db.pool_stats()['in_use'] != in_use:
+            print(f"❌ Request took {used} connections, {db.pool_stats()['in_use'] - in_use} left checked out")
+            return False
+        print("✅ A request uses one connection and returns it")
+        return True
+    finally:
+        db.execute_query("DELETE FROM users WHERE email LIKE %s", (tag + '-%',))
+
+if __name__ == "__main__":
+    test_transactions()
@@ -0,0 +1,206 @@
+import os
+import time
+import uuid
+import threading
+
+import jwt
+from dotenv import load_dotenv
+
+from database import db
+
+load_dotenv()
+
+ACCESS_TOKEN_TTL = int(os.getenv('ACCESS_TOKEN_TTL', 900))  # seconds
+REFRESH_TOKEN_TTL = int(os.getenv('REFRESH_TOKEN_TTL', 30 * 24 * 3600))
+TOKEN_REVOCATION_POLL = float(os.getenv('TOKEN_REVOCATION_POLL', 5))  # seconds between revocation syncs
+
+# Claims copied from the user row into access tokens, so routes can authorize without it
+USER_CLAIMS = ('email', 'role', 'company', 'school', 'company_id', 'school_id', 'email_verified')
+
+
+class TokenError(Exception):
+    """A bearer token is missing, malformed, expired or revoked"""
+
+
+class RevocationList:
+    """Revoked token ids and user-wide cut-offs, mirrored in memory.
+
+    Revocations are written to token_revocations and applied locally at
+    once; a background thread pulls rows written by other workers every
+    TOKEN_REVOCATION_POLL seconds. Checking a token is two dict lookups.
+    A row either revokes one token (jti) or every token of a user issued
+    before revoked_before (password reset, stolen refresh token).
+    """
+
+    def __init__(self, poll_interval=TOKEN_REVOCATION_POLL):
+        self.poll_interval = poll_interval
+        self._tokens = {}  # jti -> expiry (unix time)
+        self._users = {}   # user_id -> (revoked_before, expiry) in unix time
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def is_revoked(self, claims):
+        if self._thread is None:
+            self.start()
+        if claims['jti'] in self._tokens:
+            return True
+        cutoff = self._users.get(claims['user_id'])
+        return cutoff is not None and claims['iat'] <= cutoff[0]
+
+    def revoke_token(self, jti, user_id, expires_at):
+        """Revoke one token until it would have expired anyway"""
+        self._apply(jti, user_id, None, expires_at)
+        self._store(jti, user_id, None, expires_at)
+
+    def revoke_user(self, user_id):
+        """Revoke every token issued to a user so far"""
+        now = time.time()
+        expires_at = now + max(ACCESS_TOKEN_TTL, REFRESH_TOKEN_TTL)
+        self._apply(None, user_id, now, expires_at)
+        self._store(None, user_id, now, expires_at)
+
+    def _store(self, jti, user_id, revoked_before, expires_at):
+        db.execute_query("""
+            INSERT INTO token_revocations (jti, user_id, revoked_before, expires_at)
+            VALUES (%s, %s, to_timestamp(%s), to_timestamp(%s))
+        """, (jti, user_id, revoked_before, expires_at))
+
+    def _apply(self, jti, user_id, revoked_before, expires_at):
+        with self._lock:
+            if jti is not None:
+                self._tokens[jti] = expires_at
+            elif revoked_before > self._users.get(user_id, (0, 0))[0]:
+                self._users[user_id] = (revoked_before, expires_at)
+
+    def sync(self):
+        """Pull revocations written since the last sync and forget expired ones"""
+        rows = db.execute_query("""
+            SELECT id, jti, user_id,
+                   EXTRACT(EPOCH FROM revoked_before)::float8 AS revoked_before,
+                   EXTRACT(EPOCH FROM expires_at)::float8 AS expires_at
+            FROM token_revocations
+            WHERE id > %s AND expires_at > now()
+            ORDER BY id
+        """, (self._last_id,), fetch=True)
+        for row in rows:
+            self._apply(row['jti'], row['user_id'], row['revoked_before'], row['expires_at'])
+            self._last_id = max(self._last_id, row['id'])
+        now = time.time()
+        with self._lock:
+            self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+            self._users = {uid: cut for uid, cut in self._users.items() if cut[1] > now}
+
+    def prune(self):
+        """Delete rows for tokens that have expired anyway"""
+        return db.execute_query("DELETE FROM token_revocations WHERE expires_at < now()")
+
+    def start(self):
+        """Load the list and keep it in sync in a daemon thread"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='token-revocations', daemon=True)
+        try:
+            self.sync()
+        except Exception as e:
+            # The thread keeps retrying; until then only local revocations are known
+            print(f"Token revocation sync failed: {e}")
+        self._thread.start()
+
+    def _run(self):
+        syncs = 0
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.sync()
+                syncs += 1
+                if syncs % 720 == 0:
+                    self.prune()
+            except Exception as e:
+                print(f"Token revocation sync failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {'tokens': len(self._tokens), 'users': len(self._users), 'last_id': self._last_id}
+
+
+revocations = RevocationList()
+
+
+class TokenAuth:
+    """Signed access and refresh tokens for API clients (mobile apps, kiosks).
+
+    Access tokens live ACCESS_TOKEN_TTL seconds and carry the user's role,
+    organization and verification state, so protected routes authorize them
+    without a database round trip. Refresh tokens are exchanged for a new
+    pair (re-reading the user) and rotated on every use; presenting a
+    rotated refresh token again revokes all of the user's tokens.
+    """
+
+    def __init__(self, secret_key=None):
+        self.secret_key = secret_key
+
+    def init_app(self, app):
+        self.secret_key = app.config['JWT_SECRET_KEY']
+
+    def _encode(self, user, token_type, ttl, claims=()):
+        now = time.time()
+        payload = {
+            'sub': str(user['id']),
+            'user_id': user['id'],
+            'type': token_type,
+            'jti': uuid.uuid4().hex,
+            'iat': now,
+            'exp': int(now + ttl),
+        }
+        payload.update({claim: user.get(claim) for claim in claims})
+        return jwt.encode(payload, self.secret_key, algorithm='HS256')
+
+    def issue(self, user):
+        """A fresh access/refresh token pair for a user row"""
+        return {
+            'access_token': self._encode(user, 'access', ACCESS_TOKEN_TTL, USER_CLAIMS),
+            'refresh_token': self._encode(user, 'refresh', REFRESH_TOKEN_TTL),
+            'token_type': 'Bearer',
+            'expires_in': ACCESS_TOKEN_TTL,
+        }
+
+    def decode(self, token, token_type='access'):
+        """Verified claims of a token, or TokenError"""
+        try:
+            claims = jwt.decode(token, self.secret_key, algorithms=['HS256'])
+        except jwt.ExpiredSignatureError:
+            raise TokenError("Token has expired")
+        except jwt.InvalidTokenError:
+            raise TokenError("Invalid token")
+        if claims.get('type') != token_type:
+            raise TokenError(f"Expected an {token_type} token")
+        if revocations.is_revoked(claims):
+            if token_type == 'refresh':
+                # A rotated refresh token came back: assume it leaked
+                revocations.revoke_user(claims['user_id'])
+            raise TokenError("Token has been revoked")
+        return claims
+
+    def refresh(self, refresh_token, load_user):
+        """Rotate a refresh token; ``load_user(user_id)`` supplies current claims"""
+        claims = self.decode(refresh_token, 'refresh')
+        user = load_user(claims['user_id'])
+        if not user:
+            raise TokenError("User no longer exists")
+        revocations.revoke_token(claims['jti'], claims['user_id'], claims['exp'])
+        return self.issue(user)
+
+    def revoke(self, claims):
+        revocations.revoke_token(claims['jti'], claims['user_id'], claims['exp'])
+
+    @staticmethod
+    def user_from_claims(claims):
+        """The user fields routes read, taken from an access token"""
+        user = {claim: claims.get(claim) for claim in USER_CLAIMS}
+        user['id'] = claims['user_id']
+        return user
+
+
+token_auth = TokenAuth()
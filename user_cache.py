@@ -0,0 +1,143 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from flask import g, has_app_context
+
+
+class UserCache:
+    """Bounded LRU cache of user rows with a per-entry TTL.
+
+    Entries are copied on the way in and out so callers can never mutate
+    the shared row. Every invalidation bumps an epoch; a load that started
+    before an invalidation is not stored, so a slow reader cannot put a
+    stale row back after a concurrent update.
+    """
+
+    def __init__(self, max_size=1024, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (expires_at, row)
+        self._lock = threading.Lock()
+        self._epoch = 0
+
+        self.request_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def epoch(self):
+        return self._epoch
+
+    def count_request_hit(self):
+        with self._lock:
+            self.request_hits += 1
+
+    def get(self, user_id):
+        """Return a copy of the cached row, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, row = entry
+            if expires_at <= now:
+                del self._entries[user_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+        return dict(row)
+
+    def set(self, user_id, row, epoch=None):
+        """Store a row unless an invalidation happened since ``epoch``"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl, dict(row))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        """Drop a user's row after it changed"""
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Snapshot of cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'request_hits': self.request_hits,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+user_cache = UserCache(
+    max_size=int(os.getenv('USER_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('USER_CACHE_TTL', 30))
+)
+
+
+def _request_memo():
+    """Per-request dict of user rows on flask.g, or None outside a request"""
+    if not has_app_context():
+        return None
+    memo = g.get('_user_rows')
+    if memo is None:
+        memo = g._user_rows = {}
+    return memo
+
+
+def get_user(user_id, loader):
+    """Look a user up in the request memo, then the process cache, then ``loader``"""
+    memo = _request_memo()
+    if memo is not None and user_id in memo:
+        user_cache.count_request_hit()
+        return memo[user_id]
+
+    user = user_cache.get(user_id)
+    if user is None:
+        epoch = user_cache.epoch
+        user = loader(user_id)
+        # Unverified accounts are about to change on another worker, so only
+        # verified rows (the ones dashboards poll with) live in the process cache
+        if user is not None and user.get('email_verified'):
+            user_cache.set(user_id, user, epoch=epoch)
+
+    if memo is not None:
+        memo[user_id] = user
+    return user
+
+
+def invalidate_user(user_id):
+    """Forget a user's row in this request and in the process cache"""
+    user_cache.invalidate(user_id)
+    memo = _request_memo()
+    if memo is not None:
+        memo.pop(user_id, None)
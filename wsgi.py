@@ -0,0 +1,15 @@
+"""
+Production WSGI entry point for ChronoTrack
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module neither connects to the database nor starts threads,
+so the app can be preloaded in the gunicorn master and forked. Each worker
+opens its own pools on its first query, and gunicorn.conf.py starts its
+background services; other servers should call start_background_services()
+once in every worker process.
+"""
+
+from app import app, start_background_services
+
+__all__ = ['app', 'start_background_services']